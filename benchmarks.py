@@ -0,0 +1,364 @@
+"""Měření výkonu horkých cest simulátoru a nahrávače proti uloženému baseline.
+
+Každý případ se nejdřív jednou zahřeje (cache písem, textů, klipů), pak se
+měří `repeat`-krát a uloží se medián a minimum. Levné případy se opakují
+v dávce, dokud dávka netrvá aspoň MIN_BATCH_SEC (jako `timeit`); případy,
+které potřebují čerstvý stav (např. `Recorder.stop`), mají přípravu mimo
+měřený čas. Během měření je vypnutý garbage collector.
+
+Vše běží bez okna a bez zvukového zařízení: SDL ovladače "dummy" (panel
+se kreslí do Surface v paměti, mixer jen zahazuje vzorky), nahrávka je
+syntetická (synthetic.py) a do `Recorder` se posílá přes jeho audio
+callback stejně, jako by ji posílal ovladač. Případy nad oknem nahrávače (`_draw_waveform`,
+`on_trim_silence`) potřebují Tk a displej; bez displeje se přeskočí
+a změří se aspoň jejich výpočetní jádro (pyramida špiček, detekce řeči).
+
+Výsledky se porovnají s `benchmarks_baseline.json` (`--update` ho přepíše);
+případ pomalejší o víc než `tolerance` je regrese a skript skončí kódem 1.
+Baseline platí jen pro stroj, na kterém vznikl:
+
+    python benchmarks.py [--update] [--baseline=benchmarks_baseline.json] [--only=draw,play_sound]
+                         [--line=2] [--size=1280x720] [--repeat=7] [--tolerance=0.25] [--take-sec=60]
+"""
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("MHD_HK_EVENT_LOG", "")
+os.environ.setdefault("MHD_HK_LOG_ECHO", "0")
+
+import numpy as np
+import pygame
+
+from headless import SimClock
+import main
+from main import BusSimulatorSimpleLine
+from synthetic import TAKE_SAMPLERATE, synthetic_take
+
+BASELINE_PATH = "benchmarks_baseline.json"
+DEFAULT_REPEAT = 7
+# o kolik může být medián pomalejší než baseline, než se hlásí regrese
+DEFAULT_TOLERANCE = 0.25
+# nejkratší dávka levného případu (s), aby se neměřil šum časovače
+MIN_BATCH_SEC = 0.05
+PHYSICS_DT = 0.5
+DEFAULT_TAKE_SEC = 60
+# bloky, v jakých audio ovladač volá callback nahrávače
+CALLBACK_FRAMES = 512
+# ořez ticha v okně běží synchronně jen do record.TRIM_WORKER_SEC
+TRIM_TAKE_SEC = 20
+# šířka plátna waveformu v okně nahrávače (px)
+WAVEFORM_WIDTH = 600
+
+
+class Case:
+    """Jeden měřený případ: `run(stav)` se měří, `setup()` (volitelné) připraví stav mimo měření."""
+
+    def __init__(self, name, unit, run, setup=None):
+        self.name = name
+        self.unit = unit
+        self.run = run
+        self.setup = setup
+
+
+def _time_batch(run, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        run(None)
+    return time.perf_counter() - start
+
+
+def measure(case, repeat=DEFAULT_REPEAT):
+    """Vrátí {"median", "min", "runs", "number"}; časy jsou v sekundách na jednu operaci."""
+    gc_enabled = gc.isenabled()
+    try:
+        if case.setup is None:
+            case.run(None)
+            number = 1
+            while True:
+                gc.collect()
+                gc.disable()
+                elapsed = _time_batch(case.run, number)
+                gc.enable()
+                if elapsed >= MIN_BATCH_SEC or number >= 1 << 20:
+                    break
+                number *= 2
+            samples = []
+            for _ in range(repeat):
+                gc.collect()
+                gc.disable()
+                samples.append(_time_batch(case.run, number) / number)
+                gc.enable()
+        else:
+            number = 1
+            case.run(case.setup())
+            samples = []
+            for _ in range(repeat):
+                state = case.setup()
+                gc.collect()
+                gc.disable()
+                start = time.perf_counter()
+                case.run(state)
+                samples.append(time.perf_counter() - start)
+                gc.enable()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {"median": statistics.median(samples), "min": min(samples), "runs": repeat, "number": number}
+
+
+def simulator_cases(line_id="2", size=None, seed=0):
+    """Případy simulátoru nad jednou instancí bez okna; vrátí (případy, simulátor)."""
+    clock = SimClock()
+    random.seed(seed)
+    sim = BusSimulatorSimpleLine(line_id=line_id, direction="tam", telemetry="", control="", profile="",
+                                 cprofile="", mjpeg="", headless=True, clock=clock, size=size, hot_reload=False)
+    # seznam zastávek bez animace posunu: každý snímek kreslí stejný stav
+    sim.scroll_sec = 0
+
+    def physics_hour(_):
+        for _ in range(int(3600 / PHYSICS_DT)):
+            sim.update_physics(PHYSICS_DT)
+            clock.elapsed += PHYSICS_DT
+
+    def draw_view(view):
+        def run(_):
+            sim.view = view
+            sim.draw()
+        return run
+
+    sound = next((s[2] for s in sim.trasa_segmenty if s[2]), None)
+    cases = [
+        Case("load_line_definition", "volání", lambda _: main.load_line_definition(line_id)),
+        Case("prebuild_route", "volání", lambda _: sim.prebuild_route()),
+        Case("_compute_schedule_times", "volání", lambda _: sim._compute_schedule_times()),
+        Case("update_physics", "sim. hodina", physics_hour),
+        Case("draw[panel]", "snímek", draw_view("panel")),
+        Case("draw[route]", "snímek", draw_view("route")),
+        # klip z cache (hlasitost + přehrání) a klip čtený znovu z disku
+        Case("play_sound", "volání", lambda _: sim.play_sound("sys", "gong")),
+    ]
+    if sound:
+        def cold_sound(_):
+            sim._sounds.clear()
+            sim.play_sound("stops", sound)
+        cases.append(Case("play_sound[cold]", "volání", cold_sound))
+    return cases, sim
+
+
+def callback_blocks(take, frames=CALLBACK_FRAMES):
+    """Nahrávka rozdělená na bloky (n, 1), v jakých ji posílá zvukový ovladač."""
+    return [take[i:i + frames].reshape(-1, 1) for i in range(0, take.shape[0], frames)]
+
+
+def armed_recorder(path=None, samplerate=TAKE_SAMPLERATE):
+    """`record.Recorder` ve stavu nahrávání bez zvukového zařízení; s `path` zapisuje na disk."""
+    import record
+    rec = record.Recorder(samplerate=samplerate)
+    if path:
+        rec.buffer = record.DiskCaptureSink(path, rec.samplerate, rec.channels)
+    else:
+        rec.buffer = record.CaptureBuffer(rec.channels, capacity=rec.samplerate * record.CAPTURE_INITIAL_SEC)
+    rec.levels = record.LevelRing()
+    rec._recording = True
+    return rec
+
+
+def feed_recorder(rec, blocks):
+    """Doručí bloky přes audio callback nahrávače, jako by je posílal ovladač."""
+    for block in blocks:
+        rec._callback(block, block.shape[0], None, None)
+
+
+def recorder_cases(take_sec=DEFAULT_TAKE_SEC):
+    """Případy nahrávače; vrátí (případy, přeskočené [(název, důvod)], úklid)."""
+    try:
+        import record
+    except ImportError as e:
+        names = ["Recorder.stop", "Recorder.stop[disk]", "_draw_waveform", "on_trim_silence"]
+        return [], [(name, f"nelze načíst record.py ({e})") for name in names], lambda: None
+
+    take = synthetic_take(take_sec)
+    blocks = callback_blocks(take)
+    paths = []
+
+    def captured(to_disk):
+        def setup():
+            path = None
+            if to_disk:
+                path = record.new_take_path("bench")
+                paths.append(path)
+            rec = armed_recorder(path)
+            feed_recorder(rec, blocks)
+            return rec
+        return setup
+
+    def waveform_columns(_):
+        pyramid = record.PeakPyramid(take)
+        pyramid.columns(0, pyramid.samples, WAVEFORM_WIDTH)
+
+    trim_take = synthetic_take(min(take_sec, TRIM_TAKE_SEC), seed=1)
+    cases = [
+        Case("Recorder.stop", "volání", lambda rec: rec.stop(), setup=captured(False)),
+        Case("Recorder.stop[disk]", "volání", lambda rec: rec.stop(), setup=captured(True)),
+        Case("PeakPyramid", "nahrávka", waveform_columns),
+        Case("detect_voice_bounds", "nahrávka",
+             lambda _: record.detect_voice_bounds(trim_take, TAKE_SAMPLERATE, 0.05)),
+    ]
+    skipped = []
+
+    window = None
+    try:
+        window = record.RecordWindow()
+        window.withdraw()
+    except record.tk.TclError as e:
+        reason = f"bez displeje ({e})"
+        skipped += [("_draw_waveform", reason), ("on_trim_silence", reason)]
+    if window is not None:
+        def draw_waveform(_):
+            # překreslení po změně výřezu: sloupce z pyramidy, čára na plátně, vykreslení Tk
+            window._wave_cols = None
+            window._draw_waveform()
+            window.update_idletasks()
+
+        def trim_setup():
+            window._set_take(trim_take)
+            window.silence_threshold_var.set(5)
+
+        window._set_take(take)
+        cases += [
+            Case("_draw_waveform", "snímek", draw_waveform),
+            Case("on_trim_silence", "volání", lambda _: window.on_trim_silence(), setup=trim_setup),
+        ]
+
+    def cleanup():
+        if window is not None:
+            window.destroy()
+        for path in paths:
+            record.remove_take(path)
+
+    return cases, skipped, cleanup
+
+
+def selected(name, only):
+    """Případ patří do výběru `--only` celým názvem nebo názvem bez varianty ("draw" = draw[panel], draw[route])."""
+    return not only or name in only or name.split("[")[0] in only
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def machine_info():
+    return {"machine": platform.node(), "platform": platform.platform(), "python": platform.python_version(),
+            "pygame": pygame.version.ver, "numpy": np.__version__}
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Vrátí {název: (poměr k baseline nebo None, stav)}; stav je "ok", "regrese", "zrychlení" nebo "nové"."""
+    stored = (baseline or {}).get("results", {})
+    verdicts = {}
+    for name, result in results.items():
+        base = stored.get(name)
+        if not base or not base.get("median"):
+            verdicts[name] = (None, "nové")
+            continue
+        ratio = result["median"] / base["median"]
+        if ratio > 1.0 + tolerance:
+            verdicts[name] = (ratio, "regrese")
+        elif ratio < 1.0 / (1.0 + tolerance):
+            verdicts[name] = (ratio, "zrychlení")
+        else:
+            verdicts[name] = (ratio, "ok")
+    return verdicts
+
+
+def format_time(seconds):
+    if seconds >= 1.0:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+
+def run(only=None, line_id="2", size=None, repeat=DEFAULT_REPEAT, take_sec=DEFAULT_TAKE_SEC):
+    """Změří vybrané případy; vrátí ({název: výsledek}, [(název, důvod přeskočení)])."""
+    cases, sim = simulator_cases(line_id, size)
+    rec_cases, skipped, cleanup = recorder_cases(take_sec)
+    cases += rec_cases
+    results = {}
+    try:
+        for case in cases:
+            if not selected(case.name, only):
+                continue
+            result = measure(case, repeat)
+            result["unit"] = case.unit
+            results[case.name] = result
+            print(f"  {case.name:<26} {format_time(result['median']):>12} / {case.unit}")
+    finally:
+        cleanup()
+        sim.log.close()
+    return results, [(name, reason) for name, reason in skipped if selected(name, only)]
+
+
+if __name__ == "__main__":
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            options[key] = value or "1"
+    baseline_path = options.get("baseline", BASELINE_PATH)
+    tolerance = float(options.get("tolerance", DEFAULT_TOLERANCE))
+    only = [x for x in options.get("only", "").split(",") if x] or None
+    started = time.perf_counter()
+    results, skipped = run(only, line_id=options.get("line", "2"), size=options.get("size"),
+                           repeat=int(options.get("repeat", DEFAULT_REPEAT)),
+                           take_sec=float(options.get("take-sec", DEFAULT_TAKE_SEC)))
+    elapsed = time.perf_counter() - started
+    pygame.quit()
+    for name, reason in skipped:
+        print(f"⚠️ {name}: přeskočeno, {reason}")
+
+    baseline = load_baseline(baseline_path)
+    if "update" in options:
+        data = baseline if baseline and only else {"results": {}}
+        data.update(machine_info(), created=datetime.datetime.now().isoformat(timespec="seconds"))
+        data["results"].update(results)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"Uloženo {len(results)} výsledků do {baseline_path} za {elapsed:.1f} s")
+        sys.exit(0)
+    if baseline is None:
+        print(f"Baseline {baseline_path} neexistuje, vytvořte ho přepínačem --update")
+        sys.exit(0)
+    if baseline.get("machine") != platform.node():
+        print(f"⚠️ Baseline vznikl na jiném stroji ({baseline.get('machine')}), srovnání je jen orientační")
+
+    verdicts = compare(results, baseline, tolerance)
+    stored = baseline.get("results", {})
+    regressions = 0
+    print(f"{'případ':<26} {'nyní':>12} {'baseline':>12} {'poměr':>7}")
+    for name, result in results.items():
+        ratio, status = verdicts[name]
+        base = stored.get(name, {}).get("median")
+        line = (f"{name:<26} {format_time(result['median']):>12} "
+                f"{format_time(base) if base else '-':>12} {f'{ratio:.2f}×' if ratio else '-':>7}")
+        if status == "regrese":
+            regressions += 1
+            print(f"❌ {line}  regrese")
+        else:
+            print(f"   {line}  {status}")
+    print(f"Změřeno {len(results)} případů za {elapsed:.1f} s, regresí: {regressions} (tolerance {tolerance * 100:.0f} %)")
+    sys.exit(1 if regressions else 0)
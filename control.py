@@ -0,0 +1,150 @@
+"""Lokální řídicí rozhraní simulátoru (pro integrační testy a výcvik).
+
+Server běží v samostatném vlákně s vlastní asyncio smyčkou a poslouchá na
+localhost TCP portu nebo na Unix socketu. Protokol je řádkový (UTF-8), jeden
+příkaz na řádek, odpověď je vždy jeden řádek začínající `OK` nebo `ERR`:
+
+    GOTO <n>                 skok na zastávku s indexem n (0 = výchozí)
+    BREAK <důvod> [s]        vyvolá poruchu s daným důvodem a dobou opravy
+    ANNOUNCE NEXT|CURRENT    vynutí hlášení příští / aktuální zastávky
+    PAUSE / RESUME           pozastaví / obnoví simulaci
+    SCALE <x>                nastaví časové měřítko (TIME_SCALE)
+    STATUS                   vrátí stručný stav vozu
+    VIEW [PANEL|ROUTE|MAP]   přepne zobrazení (bez argumentu na další)
+    HELP                     seznam příkazů
+
+Přijaté příkazy se ukládají do fronty (`collections.deque` – append/popleft
+jsou atomické, takže fronta nepotřebuje zámek). Hlavní smyčka simulátoru ji
+vybírá jednou za snímek přes `drain()`; odpověď klient dostane až po
+provedení příkazu, tedy nejpozději o jeden snímek později. Pokud je fronta
+prázdná, stojí kontrola v hlavní smyčce jen jeden test pravdivosti.
+"""
+import asyncio
+import os
+import threading
+from collections import deque
+
+COMMANDS = ("GOTO", "BREAK", "ANNOUNCE", "PAUSE", "RESUME", "SCALE", "STATUS", "VIEW")
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+
+def parse_address(address):
+    """Vrátí ('unix', cesta) nebo ('tcp', (host, port)) z textu adresy.
+
+    Podporované tvary: "unix:/cesta/k/socketu", "host:port", "port".
+    """
+    address = (address or DEFAULT_ADDRESS).strip()
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, sep, port = address.rpartition(":")
+    if not sep:
+        host, port = "127.0.0.1", address
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+def _resolve(fut, reply):
+    # klient se mezitím mohl odpojit (future je zrušený)
+    if not fut.done():
+        fut.set_result(reply)
+
+
+class ControlServer:
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.kind, self.target = parse_address(address)
+        # fronta (příkaz, argumenty, future) čekajících na hlavní smyčku
+        self.pending = deque()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    def start(self, timeout=5.0):
+        self._thread = threading.Thread(target=self._run, name="mhdhk-control", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        asyncio.set_event_loop(loop)
+        try:
+            if self.kind == "unix":
+                if os.path.exists(self.target):
+                    os.unlink(self.target)
+                coro = asyncio.start_unix_server(self._handle, path=self.target)
+            else:
+                host, port = self.target
+                coro = asyncio.start_server(self._handle, host, port)
+            self._server = loop.run_until_complete(coro)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            loop.close()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            try:
+                loop.run_until_complete(self._server.wait_closed())
+            except Exception:
+                pass
+            loop.close()
+            if self.kind == "unix":
+                try:
+                    os.unlink(self.target)
+                except Exception:
+                    pass
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("utf-8", "replace").split()
+                if not parts:
+                    continue
+                cmd = parts[0].upper()
+                if cmd == "HELP":
+                    reply = "OK " + " ".join(COMMANDS)
+                elif cmd not in COMMANDS:
+                    reply = f"ERR neznámý příkaz {parts[0]}"
+                else:
+                    fut = self._loop.create_future()
+                    self.pending.append((cmd, parts[1:], fut))
+                    reply = await fut
+                writer.write((reply + "\n").encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    def drain(self, handler):
+        """Provede všechny čekající příkazy v hlavním vlákně.
+
+        handler(cmd, args) vrací text odpovědi; výjimka se klientovi vrátí jako ERR.
+        """
+        pending = self.pending
+        while pending:
+            cmd, args, fut = pending.popleft()
+            try:
+                reply = handler(cmd, args) or "OK"
+            except Exception as e:
+                reply = f"ERR {e}"
+            self._loop.call_soon_threadsafe(_resolve, fut, reply)
+
+    def close(self):
+        loop = self._loop
+        if loop is not None and self._thread is not None and self._thread.is_alive():
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout=2.0)
+        self._thread = None
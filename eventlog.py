@@ -0,0 +1,143 @@
+"""Strukturovaný událostní log s bufferem v paměti.
+
+`EventLog.emit()` jen vytvoří záznam a vloží ho do dvou front v paměti
+(`collections.deque` s pevnou kapacitou) – neotevírá soubor, nepíše na
+stdout a nečeká na zámek, takže ho lze volat z herní smyčky. Pozadové vlákno
+jednou za `flush_interval` zapíše nové záznamy dávkově do souboru JSON Lines
+(soubor zůstává otevřený) a volitelně je vypíše i na konzoli.
+
+Posledních `capacity` záznamů lze procházet za běhu přes `query()`, uložený
+log po skončení přes `read_events()`.
+"""
+import atexit
+import datetime
+import json
+import threading
+import time
+from collections import deque, namedtuple
+
+Event = namedtuple("Event", ["ts", "vehicle", "kind", "fields"])
+
+
+def format_event(ev):
+    """Čitelná podoba záznamu pro konzoli."""
+    stamp = datetime.datetime.fromtimestamp(ev.ts).strftime("%H:%M:%S.%f")[:-3]
+    fields = " ".join(f"{k}={v}" for k, v in ev.fields.items())
+    return f"{stamp} [{ev.vehicle}] {ev.kind} {fields}".rstrip()
+
+
+def _match(ev, kind, since, vehicle, fields):
+    if kind is not None and ev.kind != kind:
+        return False
+    if since is not None and ev.ts < since:
+        return False
+    if vehicle is not None and ev.vehicle != vehicle:
+        return False
+    for key, value in fields.items():
+        if ev.fields.get(key) != value:
+            return False
+    return True
+
+
+class EventLog:
+    def __init__(self, path=None, vehicle="", capacity=10000, flush_interval=0.5, echo=False):
+        self.path = path
+        self.vehicle = str(vehicle)
+        self.echo = echo
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        # posledních N záznamů pro dotazy za běhu
+        self._ring = deque(maxlen=capacity)
+        # záznamy čekající na zápis; při zahlcení se zahazují nejstarší
+        self._pending = deque(maxlen=capacity)
+        self._file = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()  # jen mezi flush() z vlákna a z close()
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        if self.path:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="mhdhk-eventlog", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def emit(self, kind, **fields):
+        ev = Event(time.time(), self.vehicle, kind, fields)
+        self._ring.append(ev)
+        pending = self._pending
+        if len(pending) == pending.maxlen:
+            self.dropped += 1
+        pending.append(ev)
+        return ev
+
+    def query(self, kind=None, since=None, vehicle=None, **fields):
+        """Vrátí záznamy z paměťového bufferu odpovídající filtru."""
+        return [ev for ev in list(self._ring) if _match(ev, kind, since, vehicle, fields)]
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending = self._pending
+            if not pending:
+                return
+            batch = []
+            while pending:
+                batch.append(pending.popleft())
+            if self._file is not None:
+                try:
+                    self._file.write("".join(
+                        json.dumps(ev._asdict(), ensure_ascii=False, default=str) + "\n" for ev in batch))
+                    self._file.flush()
+                except Exception:
+                    pass
+            if self.echo:
+                try:
+                    print("\n".join(format_event(ev) for ev in batch), flush=True)
+                except Exception:
+                    pass
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = None
+
+
+def read_events(path, kind=None, since=None, vehicle=None, **fields):
+    """Načte záznamy z JSON Lines logu a vyfiltruje je stejně jako `EventLog.query()`."""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                raw = json.loads(line)
+                ev = Event(raw["ts"], raw.get("vehicle", ""), raw["kind"], raw.get("fields", {}))
+            except Exception:
+                continue
+            if _match(ev, kind, since, vehicle, fields):
+                events.append(ev)
+    return events
+
+
+if __name__ == "__main__":
+    # python eventlog.py <soubor.jsonl> [kind] – výpis uloženého logu
+    import sys
+    for ev in read_events(sys.argv[1], kind=sys.argv[2] if len(sys.argv) >= 3 else None):
+        print(format_event(ev))
@@ -0,0 +1,187 @@
+"""Simulace bez okna a ukládání snímků panelu do PNG.
+
+Simulátor se spustí se SDL ovladačem "dummy" a kreslí do `pygame.Surface`
+v paměti. Smyčka nečeká na vykreslení obrazovky ani na reálný čas: fyzika
+se posouvá pevným krokem `dt`, hodiny na panelu i jízdní řád jdou podle
+simulovaného času od pevného startu, takže stejné parametry dají stejné
+snímky. Snímek se uloží při změně zastávky, změně stavu vozu a/nebo
+v pevném intervalu simulovaného času.
+
+Hlavní smyčka jen zkopíruje pixely (`pygame.image.tobytes`); kódování PNG
+(zlib uvolňuje GIL) běží v ThreadPoolExecutoru. Počet rozpracovaných snímků
+je omezený, aby fronta nerostla rychleji, než ji pracovníci stíhají.
+Ke snímkům se zapisuje `index.jsonl` (soubor, čas, zastávka, stav, důvod).
+
+    python headless.py <linka> [tam|zpet] [--out=frames] [--duration=3600] [--every=0]
+                       [--events=stop,state] [--dt=0.5] [--scale=1] [--seed=0] [--workers=N] [--size=800x480]
+"""
+import datetime
+import json
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# událostní log jen v paměti a bez výpisu na konzoli (tisíce snímků za sekundu)
+os.environ.setdefault("MHD_HK_EVENT_LOG", "")
+os.environ.setdefault("MHD_HK_LOG_ECHO", "0")
+
+import pygame
+
+from main import BusSimulatorSimpleLine
+
+DEFAULT_START = datetime.datetime(2025, 1, 6, 8, 0, 0)
+DEFAULT_DT = 0.5
+DEFAULT_EVENTS = ("stop", "state")
+PNG_LEVEL = 6
+
+
+def encode_png(rgb, width, height, level=PNG_LEVEL):
+    """PNG (RGB, 8 bitů) z řádků pixelů; filtr 0, komprese zlib."""
+    stride = width * 3
+    raw = b"".join(b"\0" + rgb[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, level))
+            + chunk(b"IEND", b""))
+
+
+def _write_png(path, rgb, width, height):
+    with open(path, "wb") as f:
+        f.write(encode_png(rgb, width, height))
+    return path
+
+
+class SimClock:
+    """Simulované hodiny pro panel: pevný start + uběhlé sekundy."""
+
+    def __init__(self, start=DEFAULT_START):
+        self.start = start
+        self.elapsed = 0.0
+
+    def __call__(self):
+        return self.start + datetime.timedelta(seconds=self.elapsed)
+
+
+class FrameWriter:
+    """Ukládá snímky na pozadí; `max_pending` omezuje počet rozpracovaných PNG."""
+
+    def __init__(self, out_dir, workers=None, max_pending=None):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        workers = workers or os.cpu_count() or 2
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mhdhk-png")
+        self._pending = deque()
+        self._max_pending = max_pending or workers * 4
+        self._index = open(os.path.join(out_dir, "index.jsonl"), "w", encoding="utf-8")
+        self.count = 0
+
+    def save(self, surface, name, **meta):
+        width, height = surface.get_size()
+        rgb = pygame.image.tobytes(surface, "RGB")
+        while len(self._pending) >= self._max_pending:
+            self._pending.popleft().result()
+        path = os.path.join(self.out_dir, name)
+        self._pending.append(self._pool.submit(_write_png, path, rgb, width, height))
+        self._index.write(json.dumps(dict(meta, file=name), ensure_ascii=False) + "\n")
+        self.count += 1
+        return path
+
+    def close(self):
+        while self._pending:
+            self._pending.popleft().result()
+        self._pool.shutdown()
+        self._index.close()
+
+
+class HeadlessRunner:
+    """Běh simulace bez okna s ukládáním snímků při zvolených událostech."""
+
+    def __init__(self, line_id="2", direction="tam", out_dir="frames", dt=DEFAULT_DT, time_scale=1.0,
+                 every=0.0, events=DEFAULT_EVENTS, seed=0, start=DEFAULT_START, workers=None,
+                 size=None):
+        self.dt = dt
+        self.every = every
+        self.events = set(events)
+        self.clock = SimClock(start)
+        # poruchy se plánují náhodně už v konstruktoru simulátoru
+        random.seed(seed)
+        self.sim = BusSimulatorSimpleLine(line_id=line_id, direction=direction, telemetry="", control="",
+                                          profile="", cprofile="", mjpeg="", headless=True, clock=self.clock,
+                                          size=size)
+        self.sim.time_scale = time_scale
+        self.writer = FrameWriter(out_dir, workers)
+        self.prefix = f"{line_id}_{direction}"
+
+    def _dump(self, reason):
+        sim = self.sim
+        sim.draw()
+        name = f"{self.prefix}_{self.writer.count:05d}_{reason}.png"
+        self.writer.save(sim.screen, name, t=round(self.clock.elapsed, 3), reason=reason,
+                         smer_tam=sim.smer_tam, stop=sim.gui_stop_index, state=sim.state,
+                         bus_abs_pos=round(sim.bus_abs_pos, 3))
+
+    def run(self, duration):
+        """Simuluje `duration` sekund (hodiny panelu) a vrátí počet uložených snímků."""
+        sim = self.sim
+        steps = int(duration / self.dt)
+        next_dump = 0.0
+        last_stop = None
+        last_state = None
+        try:
+            for _ in range(steps + 1):
+                stop_key = (sim.smer_tam, sim.gui_stop_index)
+                if "stop" in self.events and stop_key != last_stop:
+                    self._dump("stop")
+                elif "state" in self.events and sim.state != last_state:
+                    self._dump("state")
+                elif self.every and self.clock.elapsed >= next_dump:
+                    self._dump("interval")
+                if self.every and self.clock.elapsed >= next_dump:
+                    next_dump += self.every
+                last_stop = stop_key
+                last_state = sim.state
+                sim.update_physics(self.dt)
+                self.clock.elapsed += self.dt
+        finally:
+            self.writer.close()
+        return self.writer.count
+
+    def close(self):
+        self.sim.log.close()
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    args = []
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            options[key] = value or "1"
+        else:
+            args.append(arg)
+    line_id = args[0] if args else "2"
+    direction = args[1] if len(args) >= 2 else "tam"
+    events = [e for e in options.get("events", ",".join(DEFAULT_EVENTS)).split(",") if e]
+    workers = options.get("workers")
+    runner = HeadlessRunner(line_id, direction, out_dir=options.get("out", "frames"),
+                            dt=float(options.get("dt", DEFAULT_DT)), time_scale=float(options.get("scale", 1.0)),
+                            every=float(options.get("every", 0.0)), events=events,
+                            seed=int(options.get("seed", 0)), workers=int(workers) if workers else None,
+                            size=options.get("size"))
+    started = time.perf_counter()
+    count = runner.run(float(options.get("duration", 3600.0)))
+    elapsed = time.perf_counter() - started
+    runner.close()
+    print(f"Uloženo {count} snímků do {options.get('out', 'frames')} za {elapsed:.1f} s")
@@ -0,0 +1,185 @@
+"""Rozvržení panelu nezávislé na rozlišení.
+
+Návrh panelu je nakreslený pro 1280×720. `PanelLayout` z něj pro konkrétní
+rozlišení jednou spočítá všechny obdélníky, body a velikosti písma; při
+kreslení snímku se už nic nepřepočítává a nový layout vzniká jen při změně
+velikosti okna.
+
+Svislé rozměry i písmo se škálují jednotně (`scale` = menší z poměrů šířky
+a výšky), aby se text vešel do pruhů; prvky u pravého a dolního okraje se
+kotví k okraji, takže širší panel (pásek 800×480, 21:9) jen získá místo
+pro delší názvy a vyšší panel víc zobrazených zastávek.
+
+Layout si drží i vyrenderované texty a předkreslené statické části (pozadí)
+pro své rozlišení; písma se sdílejí mezi layouty, takže návrat na dříve
+použitou velikost je levný. Po zahřátí tak snímek ve 4K stojí stejně blitů
+a žádné renderování textu navíc oproti 720p.
+"""
+import pygame
+
+BASE_W, BASE_H = 1280, 720
+FONT_NAME = 'Arial'
+DEBUG_FONT_NAME = 'Consolas'
+MIN_FONT_SIZE = 8
+# kolik vyrenderovaných textů se drží, než se cache vyprázdní (hodiny generují nové stále)
+LABEL_CACHE_MAX = 512
+
+# role písma -> (návrhová velikost, tučné, název)
+FONT_ROLES = {
+    "line": (70, True, FONT_NAME),
+    "dest": (65, True, FONT_NAME),
+    "time": (60, True, FONT_NAME),
+    "stop_list": (50, True, FONT_NAME),
+    "footer": (55, True, FONT_NAME),
+    "dp": (28, True, FONT_NAME),
+    "prompt": (40, True, FONT_NAME),
+    "prompt_btn": (32, True, FONT_NAME),
+    "debug": (15, False, DEBUG_FONT_NAME),
+    "diagram": (34, True, FONT_NAME),
+    "diagram_page": (24, True, FONT_NAME),
+    "map": (22, True, FONT_NAME),
+}
+
+_fonts = {}
+
+
+def get_font(name, size, bold=True):
+    """Sdílená cache písem: SysFont je drahý (hledá soubor fontu), volá se jednou na velikost."""
+    key = (name, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+    return font
+
+
+def parse_size(text):
+    """Vrátí (šířka, výška) z textu "800x480"; prázdný text = návrhová velikost."""
+    if not text:
+        return BASE_W, BASE_H
+    w, _, h = text.lower().partition("x")
+    return max(1, int(w)), max(1, int(h))
+
+
+class PanelLayout:
+    def __init__(self, width, height):
+        self.size = (width, height)
+        self.width, self.height = width, height
+        self.scale = s = min(width / BASE_W, height / BASE_H)
+
+        def v(value):
+            return int(round(value * s))
+
+        self.v = v
+        self.fonts = {role: get_font(name, max(MIN_FONT_SIZE, v(size)), bold)
+                      for role, (size, bold, name) in FONT_ROLES.items()}
+
+        # hlavička: číslo linky, šipka, cílová stanice, červená linka, box s časem
+        self.line_pos = (v(30), v(15))
+        self.header_arrow = [(v(110), v(35)), (v(110), v(75)), (v(150), v(55))]
+        self.dest_pos = (v(170), v(20))
+        self.header_line_y = v(100)
+        self.header_line_w = max(1, v(5))
+        self.time_box = pygame.Rect(width - v(200), v(100), v(200), v(80))
+
+        # patička se jménem aktuální zastávky
+        footer_h = v(120)
+        self.footer = pygame.Rect(0, height - footer_h, width, footer_h)
+        self.footer_label_x = v(190)
+
+        # svislá trasa se šipkou a oválem aktuální zastávky
+        self.line_x = v(120)
+        self.line_bottom = self.footer.y + v(60)
+        self.line_top = v(160)
+        self.line_w = max(1, v(10))
+        self.route_arrow = [(self.line_x, self.line_top - v(20)),
+                            (self.line_x - v(15), self.line_top + v(10)),
+                            (self.line_x + v(15), self.line_top + v(10))]
+        ellipse_w, ellipse_h = v(70), v(44)
+        self.current_oval = pygame.Rect(self.line_x - ellipse_w // 2, self.line_bottom - ellipse_h // 2,
+                                        ellipse_w, ellipse_h)
+
+        # seznam následujících zastávek: kolik se jich vejde nad aktuální
+        self.stops_start_y = self.line_bottom - v(110)
+        self.stops_spacing = max(1, v(100))
+        self.stops_to_show = max(1, int((self.stops_start_y - self.line_top) // self.stops_spacing) + 1)
+        self.stop_oval_size = (v(50), v(30))
+        self.stop_label_x = self.line_x + ellipse_w // 2 + v(20)
+        self.stop_label_max_w = max(v(40), width - self.stop_label_x - v(20))
+        self.sched_gap = v(10)
+        # okno seznamu na obrazovce (řádky příštích zastávek mezi šipkou a patičkou)
+        window_top = max(self.stops_start_y - (self.stops_to_show - 1) * self.stops_spacing - self.stops_spacing // 2,
+                         self.route_arrow[1][1] + 1)
+        window_bottom = min(self.stops_start_y + self.stops_spacing // 2, self.footer.y)
+        self.stop_list_window = pygame.Rect(0, window_top, width, max(1, window_bottom - window_top))
+
+        self.debug_pos = (width - v(300), height - v(20))
+
+        # celotrasové schéma (route_diagram.py) pod hlavičkou, číslo stránky vpravo dole
+        diagram_top = self.time_box.bottom + v(16)
+        self.diagram_area = pygame.Rect(v(30), diagram_top, max(1, width - v(60)), max(1, height - diagram_top - v(50)))
+        self.diagram_page_pos = (width - v(30), height - v(30))
+
+        # mapa (route_map.py) mezi hlavičkou a patičkou
+        map_top = self.header_line_y + self.header_line_w
+        self.map_area = pygame.Rect(0, map_top, width, max(1, self.footer.y - map_top))
+        self.map_message_pos = (v(40), map_top + v(40))
+
+        # dotaz na ukončení uprostřed panelu
+        self.prompt_box = pygame.Rect(0, 0, v(760), v(240))
+        self.prompt_box.center = (width // 2, height // 2)
+        self.prompt_label_y = self.prompt_box.y + v(40)
+        self.prompt_buttons = []
+        for answer, text, offset in ((True, "Ano (Enter)", -170), (False, "Ne (Esc)", 170)):
+            btn = pygame.Rect(0, 0, v(260), v(70))
+            btn.center = (self.prompt_box.centerx + v(offset), self.prompt_box.bottom - v(65))
+            self.prompt_buttons.append((answer, text, btn))
+        self.prompt_border = max(1, v(5))
+        self.prompt_radius = max(1, v(8))
+
+        self._labels = {}
+        self._assets = {}
+
+    def text(self, role, text, color):
+        """Vyrenderovaný text (cache pro toto rozlišení)."""
+        key = (role, text, color)
+        surf = self._labels.get(key)
+        if surf is None:
+            if len(self._labels) >= LABEL_CACHE_MAX:
+                self._labels.clear()
+            surf = self._labels[key] = self.fonts[role].render(text, True, color)
+        return surf
+
+    def fit_text(self, role, text, color, max_w):
+        """Text zkrácený výpustkou na `max_w` pixelů (výsledek se cachuje jako ostatní texty)."""
+        key = (role, text, color, max_w)
+        surf = self._labels.get(key)
+        if surf is not None:
+            return surf
+        font = self.fonts[role]
+        surf = self.text(role, text, color)
+        if surf.get_width() > max_w:
+            # jednoduché oříznutí s elipsou — zkus odhadnout počet znaků
+            approx_chars = max(3, int(len(text) * (max_w / surf.get_width())) - 1)
+            short = text[:approx_chars].rstrip()
+            # doplň tečku pokud se ještě nevejde
+            while font.size(short + '…')[0] > max_w and len(short) > 3:
+                short = short[:-1]
+            surf = font.render(short + '…', True, color)
+        self._labels[key] = surf
+        return surf
+
+    def asset(self, name, build):
+        """Předkreslená část panelu; `build(layout)` se volá jednou pro toto rozlišení."""
+        surf = self._assets.get(name)
+        if surf is None:
+            surf = self._assets[name] = build(self)
+        return surf
+
+    def surface(self, size=None, alpha=False):
+        """Prázdná Surface ve formátu displeje (rychlý blit), bez okna obyčejná."""
+        surf = pygame.Surface(size or self.size, pygame.SRCALPHA if alpha else 0)
+        try:
+            surf = surf.convert_alpha() if alpha else surf.convert()
+        except pygame.error:
+            pass
+        return surf
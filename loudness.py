@@ -0,0 +1,277 @@
+"""Dávková analýza hlasitosti klipů v audio/ a tabulka zisků pro simulátor.
+
+Klipy v `audio/sys` a `audio/stops` vznikaly při různých úrovních nahrávání.
+Nástroj je paralelně dekóduje (pydub/ffmpeg běží v samostatných procesech,
+WAV bez pydub přes modul `wave`), změří integrovanou hlasitost podle
+ITU-R BS.1770 (K-váhování, bloky 400 ms, absolutní a relativní hradlo) a
+true peak (4× převzorkování přes FFT) a vypíše report.
+
+Výsledkem je `audio/gain_table.json` s lineární hlasitostí pro každý klip,
+kterou simulátor nastaví přes `Sound.set_volume()` při přehrání, takže se
+nic nemusí překódovat. Tabulka umí jen zeslabovat (pygame neumí hlasitost
+nad 1.0); klipy tišší než cíl lze přepínačem `--apply` znovu exportovat
+normalizované (s omezením true peak).
+
+    python loudness.py [--target=-20] [--peak=-1] [--apply] [--workers=N] [--json=report.json] [složka ...]
+"""
+import argparse
+import json
+import os
+import sys
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from pydub import AudioSegment
+except Exception:
+    AudioSegment = None
+try:
+    from scipy.signal import lfilter
+except Exception:
+    lfilter = None
+
+if getattr(sys, 'frozen', False):
+    BASE_DIR = sys._MEIPASS
+else:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_DIR = os.path.join(BASE_DIR, "audio")
+GAIN_TABLE_PATH = os.path.join(AUDIO_DIR, "gain_table.json")
+AUDIO_EXTENSIONS = (".mp3", ".wav")
+
+DEFAULT_TARGET_LUFS = -20.0
+DEFAULT_PEAK_DBTP = -1.0
+# BS.1770: bloky 400 ms s překryvem 75 %, hradla -70 LUFS a -10 LU
+BLOCK_SEC = 0.4
+BLOCK_HOP_SEC = 0.1
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+TRUE_PEAK_OVERSAMPLE = 4
+SILENCE_DB = -120.0
+
+
+def decode(path):
+    """Načte klip jako float32 pole (vzorky, kanály) a vzorkovací frekvenci."""
+    if AudioSegment is not None:
+        seg = AudioSegment.from_file(path)
+        data = np.array(seg.get_array_of_samples(), dtype=np.float32).reshape(-1, seg.channels)
+        return data / float(1 << (8 * seg.sample_width - 1)), seg.frame_rate
+    if not path.lower().endswith(".wav"):
+        raise RuntimeError("Chybí pydub. Nainstalujte: pip install pydub (a mít ffmpeg v PATH)")
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise RuntimeError("Bez pydub jsou podporované jen 16bitové WAV")
+        raw = w.readframes(w.getnframes())
+        data = np.frombuffer(raw, dtype="<i2").reshape(-1, w.getnchannels())
+        return data.astype(np.float32) / 32768.0, w.getframerate()
+
+
+# úroveň (vůči impulzu), pod kterou se dozvuk filtru zanedbá (−120 dB)
+TAIL_LEVEL = 1e-6
+
+
+def _biquad(b, a, data):
+    # Bez scipy: filtrace násobením spektrem přenosu H(e^jw). Doplnění nulami
+    # musí pokrýt dozvuk IIR, jinak se kruhovou konvolucí přičte k začátku:
+    # délka podle největšího pólu, než dozvuk klesne pod TAIL_LEVEL (horní
+    # propust RLB ~2500 vzorků při 44,1 kHz, úměrně víc při vyšších frekvencích).
+    n = data.shape[0]
+    radius = float(np.max(np.abs(np.roots(a)))) if len(a) > 1 else 0.0
+    tail = int(np.ceil(np.log(TAIL_LEVEL) / np.log(radius))) if 0.0 < radius < 1.0 else 0
+    size = 1 << int(np.ceil(np.log2(n + tail + 1)))
+    z = np.exp(-1j * np.pi * np.arange(size // 2 + 1) / (size // 2))
+    h = np.polyval(b[::-1], z) / np.polyval(a[::-1], z)
+    spec = np.fft.rfft(data, size, axis=0) * h[:, None]
+    return np.fft.irfft(spec, size, axis=0)[:n]
+
+
+def k_weighting(samplerate):
+    """Koeficienty (b, a) dvou biquadů K-váhování pro danou frekvenci (BS.1770-4)."""
+    # 1) shelving +4 dB (model hlavy)
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = np.tan(np.pi * f0 / samplerate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = (np.array([(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]),
+             np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]))
+    # 2) horní propust (RLB)
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / samplerate)
+    a0 = 1.0 + k / q + k * k
+    highpass = (np.array([1.0, -2.0, 1.0]),
+                np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]))
+    return shelf, highpass
+
+
+def integrated_loudness(data, samplerate):
+    """Integrovaná hlasitost v LUFS (mono/stereo, váhy kanálů 1.0)."""
+    weighted = data.astype(np.float64)
+    for b, a in k_weighting(samplerate):
+        weighted = lfilter(b, a, weighted, axis=0) if lfilter is not None else _biquad(b, a, weighted)
+    block = int(round(BLOCK_SEC * samplerate))
+    hop = int(round(BLOCK_HOP_SEC * samplerate))
+    n = weighted.shape[0]
+    # střední kvadrát všech bloků najednou z kumulativní sumy
+    csum = np.concatenate((np.zeros((1, weighted.shape[1])), np.cumsum(weighted * weighted, axis=0)))
+    if n >= block:
+        starts = np.arange(0, n - block + 1, hop)
+        z = (csum[starts + block] - csum[starts]) / block
+    else:
+        z = csum[-1:] / max(1, n)
+    power = z.sum(axis=1)
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10.0 * np.log10(power)
+    gated = power[levels > ABSOLUTE_GATE]
+    if gated.size == 0:
+        return SILENCE_DB
+    relative = -0.691 + 10.0 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = power[(levels > ABSOLUTE_GATE) & (levels > relative)]
+    return float(-0.691 + 10.0 * np.log10(gated.mean()))
+
+
+def true_peak(data):
+    """True peak v dBTP z 4× převzorkovaného signálu (interpolace nulami ve spektru)."""
+    n = data.shape[0]
+    if n == 0:
+        return SILENCE_DB
+    spec = np.fft.rfft(data, axis=0)
+    up = np.fft.irfft(spec, n * TRUE_PEAK_OVERSAMPLE, axis=0) * TRUE_PEAK_OVERSAMPLE
+    peak = max(float(np.abs(up).max()), float(np.abs(data).max()))
+    return 20.0 * np.log10(peak) if peak > 0 else SILENCE_DB
+
+
+def clip_key(path):
+    """Klíč v tabulce zisků: kategorie (složka) a název bez přípony, např. "stops/adalbertinum"."""
+    folder, fname = os.path.split(os.path.abspath(path))
+    return f"{os.path.basename(folder)}/{os.path.splitext(fname)[0]}"
+
+
+def find_clips(folders):
+    # u dvojic name.mp3 + name.wav rozhoduje MP3 – stejně jako při přehrávání v main.py
+    clips = {}
+    for folder in folders:
+        for fname in sorted(os.listdir(folder)):
+            base, ext = os.path.splitext(fname)
+            ext = ext.lower()
+            if ext not in AUDIO_EXTENSIONS:
+                continue
+            key = os.path.join(folder, base)
+            if key not in clips or ext == ".mp3":
+                clips[key] = os.path.join(folder, fname)
+    return sorted(clips.values())
+
+
+def analyze(path):
+    data, sr = decode(path)
+    return {
+        "path": path,
+        "duration": data.shape[0] / float(sr),
+        "lufs": integrated_loudness(data, sr),
+        "true_peak": true_peak(data),
+    }
+
+
+def analyze_all(paths, workers=None):
+    """Změří všechny klipy paralelně; chyby vrací v položce "error"."""
+    def _safe(path):
+        try:
+            return analyze(path)
+        except Exception as e:
+            return {"path": path, "error": str(e)}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2) as pool:
+        return list(pool.map(_safe, paths))
+
+
+def plan_gains(results, target=DEFAULT_TARGET_LUFS, peak_limit=DEFAULT_PEAK_DBTP):
+    """Doplní k výsledkům potřebný zisk (dB) a lineární hlasitost pro tabulku (max 1.0)."""
+    for r in results:
+        if "error" in r or r["lufs"] <= SILENCE_DB:
+            continue
+        gain = target - r["lufs"]
+        # zesílení nesmí dostat true peak nad limit
+        gain = min(gain, peak_limit - r["true_peak"])
+        r["gain_db"] = gain
+        r["volume"] = min(1.0, 10.0 ** (gain / 20.0))
+    return results
+
+
+def apply_gain(path, gain_db):
+    """Znovu exportuje klip s daným ziskem (stejný název a formát)."""
+    if AudioSegment is None:
+        raise RuntimeError("Chybí pydub. Nainstalujte: pip install pydub (a mít ffmpeg v PATH)")
+    fmt = os.path.splitext(path)[1].lower().lstrip(".")
+    seg = AudioSegment.from_file(path).apply_gain(gain_db)
+    tmp_path = path + ".tmp"
+    seg.export(tmp_path, format=fmt)
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_gain_table(results, path=GAIN_TABLE_PATH, target=DEFAULT_TARGET_LUFS):
+    gains = {clip_key(r["path"]): round(r["volume"], 4) for r in results if "volume" in r}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"target_lufs": target, "gains": gains}, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return gains
+
+
+def format_report(results, target):
+    lines = [f"{'klip':<40}{'délka':>8}{'LUFS':>9}{'dBTP':>8}{'zisk':>8}{'hlas.':>7}"]
+    for r in sorted(results, key=lambda r: r.get("lufs", SILENCE_DB)):
+        name = clip_key(r["path"])
+        if "error" in r:
+            lines.append(f"{name:<40}  chyba: {r['error']}")
+            continue
+        gain = f"{r['gain_db']:+.1f}" if "gain_db" in r else "-"
+        volume = f"{r['volume']:.2f}" if "volume" in r else "-"
+        lines.append(f"{name:<40}{r['duration']:>7.2f}s{r['lufs']:>9.1f}{r['true_peak']:>8.1f}{gain:>8}{volume:>7}")
+    measured = [r["lufs"] for r in results if "lufs" in r and r["lufs"] > SILENCE_DB]
+    if measured:
+        lines.append(f"Cíl {target:.1f} LUFS; rozsah {min(measured):.1f} až {max(measured):.1f} LUFS, "
+                     f"medián {float(np.median(measured)):.1f} LUFS.")
+    boost = sum(1 for r in results if r.get("gain_db", 0.0) > 0.05)
+    if boost:
+        lines.append(f"{boost} klipů je tišších než cíl; tabulka je nezesílí, pomůže --apply.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analýza a normalizace hlasitosti klipů v audio/")
+    parser.add_argument("folders", nargs="*", help="složky s klipy (výchozí audio/sys a audio/stops)")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET_LUFS, help="cílová hlasitost v LUFS")
+    parser.add_argument("--peak", type=float, default=DEFAULT_PEAK_DBTP, help="maximální true peak v dBTP")
+    parser.add_argument("--workers", type=int, default=None, help="počet paralelních dekodérů")
+    parser.add_argument("--apply", action="store_true", help="znovu exportovat klipy normalizované na cíl")
+    parser.add_argument("--json", default="", help="uložit report i jako JSON")
+    parser.add_argument("--table", default=GAIN_TABLE_PATH, help="cesta k tabulce zisků")
+    args = parser.parse_args(argv)
+
+    folders = args.folders or [os.path.join(AUDIO_DIR, "sys"), os.path.join(AUDIO_DIR, "stops")]
+    paths = find_clips([f for f in folders if os.path.isdir(f)])
+    if not paths:
+        print("❌ Nenalezeny žádné klipy.")
+        return 1
+    results = plan_gains(analyze_all(paths, args.workers), args.target, args.peak)
+    print(format_report(results, args.target))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.apply:
+        jobs = [r for r in results if abs(r.get("gain_db", 0.0)) > 0.05]
+        with ThreadPoolExecutor(max_workers=args.workers or os.cpu_count() or 2) as pool:
+            futures = [(r, pool.submit(apply_gain, r["path"], r["gain_db"])) for r in jobs]
+        for r, fut in futures:
+            if fut.exception() is not None:
+                print(f"❌ {clip_key(r['path'])}: {fut.exception()}")
+                continue
+            # normalizovaný klip už další zeslabení nepotřebuje
+            r["volume"] = 1.0
+        print(f"Normalizováno {len(jobs)} klipů.")
+    gains = write_gain_table(results, args.table, args.target)
+    print(f"Tabulka zisků ({len(gains)} klipů): {args.table}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,15 @@
 import json
+import math
 import os
 import sys
-import time
 import datetime
 import pygame
-import tkinter as tk
-from tkinter import messagebox
 import random
 
+from layout import PanelLayout, get_font, parse_size
+
 # --- KONFIGURACE BAREV A ROZMĚRŮ ---
-W, H = 1280, 720
+W, H = 1280, 720                 # návrhové rozlišení panelu (viz layout.py)
 BG_COLOR = (255, 255, 255)      # Bílé pozadí
 HEADER_LINE_COLOR = (200, 0, 0) # Červená linka nahoře
 TIME_BG_COLOR = (220, 20, 20)   # Červený box pro čas
@@ -17,6 +17,7 @@ YELLOW_BAR_COLOR = (240, 210, 0)# Žlutý pruh dole
 TEXT_BLACK = (0, 0, 0)
 TEXT_WHITE = (255, 255, 255)
 ROUTE_RED = (200, 0, 0)         # Červená barva trasy
+OVERLAY_SHADE = (0, 0, 0, 150)  # Ztmavení panelu pod dotazem na ukončení
 
 # --- SEMAFOR BARVY ---
 # --- CESTY K SOUBORŮM ---
@@ -28,6 +29,8 @@ else:
 AUDIO_DIR = os.path.join(BASE_DIR, "audio")
 SYS_AUDIO_DIR = os.path.join(AUDIO_DIR, "sys")
 STOPS_AUDIO_DIR = os.path.join(AUDIO_DIR, "stops")
+# hlasitosti klipů z analýzy loudness.py (klíč "sys/gong", "stops/<soubor>")
+GAIN_TABLE_PATH = os.path.join(AUDIO_DIR, "gain_table.json")
 
 # --- SIMULACE PODLE ČASU ---
 # Nepočítáme vzdálenost a rychlost, ale jedeme podle
@@ -41,6 +44,11 @@ TIME_SCALE = 1.0          # 1 reálná sekunda = 1 s simulovaného času (reáln
 NEXT_STOP_ANNOUNCE_BEFORE_SEC = 60.0    # "příští zastávka"
 CURRENT_STOP_ANNOUNCE_BEFORE_SEC = 10.0 # aktuální zastávka
 
+# plynulý posun seznamu zastávek při příjezdu na další zastávku (s), 0 = skok
+STOP_LIST_SCROLL_SEC = 0.6
+# kolik řádků zastávek se nejméně předkreslí do pásu pro posun (kratší linky celé najednou)
+STOP_STRIP_ROWS = 32
+
 # Náhodné poruchy troleje (volitelné)
 ENABLE_RANDOM_BREAKS = False
 TROLLEY_BREAK_PROB_PER_LEG = 0.03
@@ -48,6 +56,32 @@ TROLLEY_REPAIR_MIN_SEC = 20.0
 TROLLEY_REPAIR_MAX_SEC = 60.0
 TROLLEY_BREAK_REASONS = ["porucha_trolej", "strom_na_vedeni", "nehoda_automobil", "porucha_vozu"]
 
+# Telemetrie panelu ve sdílené paměti pro externí displeje (viz telemetry.py).
+# Hodnota = jméno bloku sdílené paměti, prázdná = vypnuto.
+TELEMETRY_NAME = os.environ.get("MHD_HK_TELEMETRY", "")
+# Lokální řídicí server (viz control.py): "host:port" nebo "unix:/cesta", prázdné = vypnuto
+CONTROL_ADDRESS = os.environ.get("MHD_HK_CONTROL", "")
+# MJPEG stream panelu přes HTTP (viz mjpeg.py): "host:port" ("1" = výchozí), prázdné = vypnuto
+MJPEG_ADDRESS = os.environ.get("MHD_HK_MJPEG", "")
+# Velikost panelu "šířkaxvýška" (např. 800x480, 3840x2160); prázdné = W x H. Okno lze i zvětšovat myší.
+PANEL_SIZE = os.environ.get("MHD_HK_SIZE", "")
+# Výchozí zobrazení: "panel" (4 příští zastávky), "route" (celá trasa, viz route_diagram.py)
+# nebo "map" (mapa podle lines/<id>.geojson, viz route_map.py); klávesa V je střídá
+PANEL_VIEW = os.environ.get("MHD_HK_VIEW", "panel")
+VIEWS = ("panel", "route", "map")
+# Načtení změněných linek (lines/*.json, *.geojson), klipů a tabulky zisků za běhu (viz watcher.py); 0 = vypnuto
+HOT_RELOAD = os.environ.get("MHD_HK_HOT_RELOAD", "1") != "0"
+# Strukturovaný událostní log (viz eventlog.py): do souboru jen s MHD_HK_EVENT_LOG=<soubor.jsonl>,
+# jinak jen buffer posledních záznamů v paměti (log nikde neroste)
+EVENT_LOG_PATH = os.environ.get("MHD_HK_EVENT_LOG", "")
+# výpis událostí na konzoli (z pozadového vlákna logu, ne z herní smyčky)
+EVENT_LOG_ECHO = os.environ.get("MHD_HK_LOG_ECHO", "1") != "0"
+# Profil fází snímku (viz profiler.py): cesta pro Chrome trace ("1" = výchozí), prázdné = vypnuto
+PROFILE_TRACE = os.environ.get("MHD_HK_PROFILE", "")
+PROFILE_TRACE_DEFAULT = "profile_trace.json"
+# volitelný výstup cProfile při ukončení
+PROFILE_CPROFILE = os.environ.get("MHD_HK_CPROFILE", "")
+
 if getattr(sys, 'frozen', False):
     # běží zabalené PyInstaller --onefile
     BASE_DIR = sys._MEIPASS
@@ -57,6 +91,15 @@ LINES_DIR = os.path.join(BASE_DIR, "lines")
 ICON_PATH = os.path.join(BASE_DIR, "logo.png")
 
 
+def load_gain_table(path=GAIN_TABLE_PATH):
+    """Načte tabulku hlasitostí klipů; chybějící nebo vadná tabulka = prázdný slovník."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {str(k): float(v) for k, v in json.load(f).get("gains", {}).items()}
+    except Exception:
+        return {}
+
+
 def load_line_definition(line_id: str):
     """Načte definici linky z JSON souboru v adresáři 'lines'."""
     filename = f"{line_id}.json"
@@ -70,9 +113,36 @@ def load_line_definition(line_id: str):
         trasa_segmenty.append((s.get("name", ""), s.get("distance", 0), s.get("audio", "")))
     return data, trasa_segmenty
 
+def _command_arg(args, index, kind, usage):
+    """Argument příkazu řídicího serveru převedený na `kind`; chybí-li nebo je vadný, chyba s návodem."""
+    try:
+        return kind(args[index])
+    except (IndexError, ValueError):
+        raise ValueError(usage) from None
+
 class BusSimulatorSimpleLine:
-    def __init__(self, line_id: str = "2", direction: str = "tam"):
+    def __init__(self, line_id: str = "2", direction: str = "tam", telemetry: str = None,
+                 control: str = None, profile: str = None, cprofile: str = None,
+                 headless: bool = False, clock=None, mjpeg: str = None, size: str = None,
+                 view: str = None, hot_reload: bool = None):
         print("--- INICIALIZACE SIMULÁTORU ---")
+        # Bez okna (viz headless.py): SDL dummy ovladač a kreslení do Surface v paměti
+        self.headless = headless
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        # zdroj času pro hodiny na panelu a jízdní řád (headless dosadí simulované hodiny)
+        self.now = clock or datetime.datetime.now
+        # Profil fází snímku; None = vypnuto (v herní smyčce pak jen testy na None)
+        self._profiler = None
+        trace_path = PROFILE_TRACE if profile is None else profile
+        cprofile_path = PROFILE_CPROFILE if cprofile is None else cprofile
+        if trace_path or cprofile_path:
+            from profiler import FrameProfiler
+            if trace_path in ("1", "true"):
+                trace_path = PROFILE_TRACE_DEFAULT
+            self._profiler = FrameProfiler(trace_path=trace_path or None, cprofile_path=cprofile_path or None)
+            print(f"⏱️ Profil snímků: trace={trace_path or '-'}, cProfile={cprofile_path or '-'}")
         # na Windows nastavíme AppUserModelID, aby se taskbar správně pároval s ikonou
         if sys.platform == 'win32':
             try:
@@ -106,27 +176,43 @@ class BusSimulatorSimpleLine:
         except: 
             print("❌ Zvukový systém: CHYBA (Audio nebude hrát)")
 
-        self.screen = pygame.display.set_mode((W, H))
+        width, height = parse_size(PANEL_SIZE if size is None else size)
+        if headless:
+            self.screen = pygame.Surface((width, height))
+        else:
+            self.screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
         self.clock = pygame.time.Clock()
-        
-        # --- FONTY ---
-        self.font_line = pygame.font.SysFont('Arial', 70, bold=True)
-        self.font_dest = pygame.font.SysFont('Arial', 65, bold=True)
-        self.font_time = pygame.font.SysFont('Arial', 60, bold=True)
-        self.font_stop_list = pygame.font.SysFont('Arial', 50, bold=True) 
-        self.font_footer = pygame.font.SysFont('Arial', 55, bold=True)
-        # malé písmo pro plánované časy (bude dynamicky zmenšeno, aby se vešlo do oválu)
-        self.font_dp = pygame.font.SysFont('Arial', 28, bold=True)
+
+        # --- ROZVRŽENÍ A FONTY ---
+        # obdélníky, velikosti písma a cache textů pro aktuální rozlišení (přepočet jen při resize)
+        self.layout = PanelLayout(width, height)
+        self.view = (PANEL_VIEW if view is None else view).lower()
+        if self.view not in VIEWS:
+            print(f"❌ Neznámé zobrazení '{self.view}', používám panel")
+            self.view = "panel"
+        # předkreslená celotrasová schémata podle (směr, rozlišení)
+        self._route_diagrams = {}
+        # geometrie linky pro mapu (None = nenačteno, False = není k dispozici) a dlaždicová mapa
+        self._geometry = None
+        self._map = None
+        # pás předkreslených zastávek a stav animace posunu seznamu
+        self.scroll_sec = STOP_LIST_SCROLL_SEC
+        self._strip = None
+        self._scroll_stops = None
+        self._scroll_from = 0.0
+        self._scroll_to = 0
+        self._scroll_start = None
+        self._scroll_pos = 0.0
 
         def _render_text_fit(text, max_w, max_h, font_name='Arial', bold=True, start_size=28):
             # Vrátí surface s textem, který se vejde do max_w x max_h, snižuje velikost písma.
             for size in range(start_size, 8, -1):
-                f = pygame.font.SysFont(font_name, size, bold=bold)
+                f = get_font(font_name, size, bold=bold)
                 surf = f.render(text, True, TEXT_WHITE)
                 if surf.get_width() <= max_w - 6 and surf.get_height() <= max_h - 4:
                     return surf
             # fallback - použij poslední vytvořený
-            return pygame.font.SysFont(font_name, 10, bold=bold).render(text, True, TEXT_WHITE)
+            return get_font(font_name, 10, bold=bold).render(text, True, TEXT_WHITE)
 
         # helper uložíme jako atribut instance
         self._render_text_fit = _render_text_fit
@@ -135,6 +221,20 @@ class BusSimulatorSimpleLine:
         self.smer_tam = (direction == "tam")
         self.line_id = line_id
 
+        # Událostní log: zápis do bufferu v paměti, na disk/konzoli dávkově z vlákna
+        from eventlog import EventLog
+        self.log = EventLog(EVENT_LOG_PATH or None, vehicle=line_id, echo=EVENT_LOG_ECHO)
+        try:
+            self.log.start()
+        except Exception as e:
+            print(f"❌ Událostní log: nelze otevřít {EVENT_LOG_PATH} ({e})")
+            self.log = EventLog(None, vehicle=line_id, echo=EVENT_LOG_ECHO).start()
+
+        # hlasitosti klipů z loudness.py (bez tabulky hrají všechny naplno)
+        self.gain_table = load_gain_table()
+        # načtené klipy (kategorie, jméno) -> pygame.mixer.Sound; None = soubor neexistuje
+        self._sounds = {}
+
         # Načtení definice linky z JSON
         try:
             line_data, self.trasa_segmenty = load_line_definition(line_id)
@@ -160,14 +260,16 @@ class BusSimulatorSimpleLine:
 
         pygame.display.set_caption(caption)
 
-        # připravit cestu k ikonce pro případné Tk root dialogy
-        self._icon_path = ICON_PATH if os.path.exists(ICON_PATH) else None
+        # Dotaz na ukončení se kreslí přímo do panelu (simulace mezitím běží dál)
+        self.quit_prompt = False
+        self._quit_buttons = {}
+        self._quit_shade = None
 
         self.prebuild_route()
 
         # plánovaný čas odjezdu z první zastávky (aktuální čas)
         try:
-            self.departure_time = datetime.datetime.now()
+            self.departure_time = self.now()
         except Exception:
             self.departure_time = datetime.datetime.today()
         # spočítat plánované časy příjezdů pro každou zastávku
@@ -180,6 +282,9 @@ class BusSimulatorSimpleLine:
         # bus_abs_pos = čas od začátku směru v sekundách simulovaného času
         self.bus_abs_pos = 0.0
         self.speed = 0.0  # ponecháno jen pro debug, fakticky se nepoužívá
+        # časové měřítko a pauza (lze měnit za běhu přes řídicí server)
+        self.time_scale = TIME_SCALE
+        self.paused = False
         self.stop_index = 0     
         self.gui_stop_index = 0 
         
@@ -230,6 +335,58 @@ class BusSimulatorSimpleLine:
         except Exception:
             pass
 
+        # Telemetrie pro externí displeje (zapisuje se jen při změně stavu panelu)
+        self._telemetry = None
+        self._telemetry_key = None
+        telemetry_name = TELEMETRY_NAME if telemetry is None else telemetry
+        if telemetry_name:
+            try:
+                from telemetry import TelemetryPublisher, DEFAULT_NAME
+                if telemetry_name in ("1", "true"):
+                    telemetry_name = DEFAULT_NAME
+                self._telemetry = TelemetryPublisher(telemetry_name)
+                print(f"📡 Telemetrie: sdílená paměť '{telemetry_name}'")
+            except Exception as e:
+                print(f"❌ Telemetrie: nelze vytvořit sdílenou paměť ({e})")
+        self._publish_telemetry()
+
+        # Řídicí server pro ovládání zvenčí (příkazy se vybírají jednou za snímek)
+        self._control = None
+        control_address = CONTROL_ADDRESS if control is None else control
+        if control_address:
+            try:
+                from control import ControlServer
+                server = ControlServer(control_address)
+                server.start()
+                self._control = server
+                print(f"🎛️ Řídicí server: {control_address}")
+            except Exception as e:
+                print(f"❌ Řídicí server: nelze spustit ({e})")
+
+        # MJPEG stream panelu (kóduje se jen při změně snímku a s připojeným klientem)
+        self._mjpeg = None
+        mjpeg_address = MJPEG_ADDRESS if mjpeg is None else mjpeg
+        if mjpeg_address:
+            try:
+                from mjpeg import MjpegStreamer, DEFAULT_ADDRESS
+                if mjpeg_address in ("1", "true"):
+                    mjpeg_address = DEFAULT_ADDRESS
+                self._mjpeg = MjpegStreamer(mjpeg_address).start()
+                print(f"📺 MJPEG stream: http://{self._mjpeg.host}:{self._mjpeg.port}/")
+            except Exception as e:
+                print(f"❌ MJPEG stream: nelze spustit ({e})")
+
+        # Sledování změn linek a klipů (bez okna vypnuto, snímky mají být opakovatelné)
+        self._watcher = None
+        if (HOT_RELOAD and not headless) if hot_reload is None else hot_reload:
+            try:
+                from watcher import FileWatcher
+                self._watcher = FileWatcher([LINES_DIR, SYS_AUDIO_DIR, STOPS_AUDIO_DIR, AUDIO_DIR],
+                                            (".json", ".geojson", ".mp3", ".wav")).start()
+                print(f"🔁 Načítání změn za běhu: {self._watcher.mode}")
+            except Exception as e:
+                print(f"❌ Načítání změn za běhu: nelze spustit ({e})")
+
     def prebuild_route(self):
         self.stops = []
         current_dist = 0.0
@@ -296,12 +453,9 @@ class BusSimulatorSimpleLine:
                 possible = [r for r in TROLLEY_BREAK_REASONS if r != 'porucha_trolej']
             reason = random.choice(possible) if possible else 'porucha'
             self._scheduled_breaks.append({'abs_pos': pos, 'repair_time': repair_t, 'reason': reason, 'triggered': False})
-        # vždy vypiš info do konzole (i když je seznam prázdný)
-        try:
-            items = [f"{b['abs_pos']:.1f}s:{b['reason']}" for b in self._scheduled_breaks]
-            print(f"[DEBUG] Naplánované poruchy pro linku {self.line_id}: {len(self._scheduled_breaks)} -> {items}")
-        except Exception:
-            print(f"[DEBUG] Naplánované poruchy pro linku {self.line_id}: {len(self._scheduled_breaks)}")
+        # vždy zaloguj (i když je seznam prázdný)
+        self.log.emit("breaks_scheduled", smer_tam=self.smer_tam,
+                      breaks=[[round(b['abs_pos'], 1), b['reason']] for b in self._scheduled_breaks])
 
     def _compute_schedule_times(self):
         """Vypočítá plánované časy příjezdu (`sched_dt` a `sched_str`) pro každou zastávku
@@ -309,7 +463,7 @@ class BusSimulatorSimpleLine:
         """
         if not hasattr(self, 'departure_time') or self.departure_time is None:
             try:
-                self.departure_time = datetime.datetime.now()
+                self.departure_time = self.now()
             except Exception:
                 self.departure_time = datetime.datetime.today()
         for s in self.stops:
@@ -323,20 +477,44 @@ class BusSimulatorSimpleLine:
                 s['sched_str'] = ''
 
     def play_sound(self, category, filename):
-        if not pygame.mixer.get_init(): return 0.0
+        prof = self._profiler
+        if prof is None:
+            return self._play_sound(category, filename)
+        start = prof.now()
+        try:
+            return self._play_sound(category, filename)
+        finally:
+            prof.add("play_sound", start)
+
+    def _load_sound(self, category, filename):
         base_path = SYS_AUDIO_DIR if category == 'sys' else STOPS_AUDIO_DIR
         path_mp3 = os.path.join(base_path, f"{filename}.mp3")
         path_wav = os.path.join(base_path, f"{filename}.wav")
         target_path = path_mp3 if os.path.exists(path_mp3) else (path_wav if os.path.exists(path_wav) else None)
-        
-        if target_path:
+        if target_path is None:
+            return None
+        return pygame.mixer.Sound(target_path)
+
+    def _play_sound(self, category, filename):
+        if not pygame.mixer.get_init(): return 0.0
+        # klip se čte z disku jen poprvé; po změně souboru ho watcher z cache vyhodí
+        key = ('sys' if category == 'sys' else 'stops', filename)
+        try:
+            sound = self._sounds[key]
+        except KeyError:
             try:
-                sound = pygame.mixer.Sound(target_path)
-                length = sound.get_length()
-                sound.play()
-                return length
-            except: return 0.0
-        return 0.0
+                sound = self._load_sound(category, filename)
+            except Exception:
+                sound = None
+            self._sounds[key] = sound
+        if sound is None:
+            return 0.0
+        try:
+            sound.set_volume(self.gain_table.get(f"{category}/{filename}", 1.0))
+            length = sound.get_length()
+            sound.play()
+            return length
+        except: return 0.0
 
     def _queue_line_delay_announce(self, reason_key: str):
         """Slozi a naplni audio_playlist hlasku ve formatu:
@@ -362,20 +540,37 @@ class BusSimulatorSimpleLine:
         # 4) prave duvod
         self.audio_playlist.append(('sys', reason_file))
         # také loguj textovou podobu hlášení pro ladění
-        try:
-            print(f"[ANN] linka_cislo cislo_{self.line_id} se_zpozdi_z_duvodu {reason_file}")
-        except Exception:
-            pass
+        self.log.emit("announce_delay", clips=["linka_cislo", f"cislo_{self.line_id}", "se_zpozdi_z_duvodu", reason_file])
+
+    def _queue_next_stop_announce(self):
+        self.audio_playlist.append(('sys', 'gong'))
+        self.audio_playlist.append(('sys', 'pristi_zastavka'))
+        self.audio_playlist.append(('stops', self.stops[self.stop_index]['file']))
+
+    def _queue_current_stop_announce(self):
+        self.audio_playlist.append(('sys', 'gong'))
+        self.audio_playlist.append(('stops', self.stops[self.stop_index]['file']))
+        if self.stop_index == len(self.stops) - 1:
+            self.audio_playlist.append(('sys', 'konecna'))
 
     def check_current_stop_announcement(self, time_to_go):
         if not self.current_stop_announced and time_to_go <= CURRENT_STOP_ANNOUNCE_BEFORE_SEC:
             self.current_stop_announced = True
             self.gui_stop_index = self.stop_index
-            print(f"📢 [INFO] 25m do cíle -> Hlásím aktuální zastávku.")
-            self.audio_playlist.append(('sys', 'gong'))
-            self.audio_playlist.append(('stops', self.stops[self.stop_index]['file']))
-            if self.stop_index == len(self.stops) - 1:
-                self.audio_playlist.append(('sys', 'konecna'))
+            self.log.emit("announce_current", stop=self.stops[self.stop_index]['nazev'], time_to_go=round(time_to_go, 1))
+            self._queue_current_stop_announce()
+
+    def _start_break(self, reason, repair_time):
+        """Přepne vůz do poruchy a zařadí hlášení o zpoždění."""
+        self._break_active = True
+        self.state = 'BROKEN'
+        self.timer = 0.0
+        self.repair_timer = repair_time
+        self.break_reason = reason
+        self.log.emit("break", reason=reason, repair=round(repair_time, 1), abs_pos=round(self.bus_abs_pos, 1))
+        # upozorni cestující: složená hláška
+        self.audio_playlist.append(('sys', 'gong'))
+        self._queue_line_delay_announce(self.break_reason)
 
     def update_physics(self, dt):
         # Audio fronta
@@ -395,7 +590,7 @@ class BusSimulatorSimpleLine:
         # --- LOGIKA JÍZDY PODLE ČASU ---
 
         if self.state == "DRIVING":
-            sim_dt = dt * TIME_SCALE
+            sim_dt = dt * self.time_scale
 
             leg_total_time = target_time - self.leg_start_pos
             time_traveled = self.bus_abs_pos - self.leg_start_pos
@@ -407,10 +602,9 @@ class BusSimulatorSimpleLine:
                 if time_traveled >= (leg_total_time * 0.25):
                     self.next_stop_announced = True
                     self.gui_stop_index = self.stop_index
-                    self.audio_playlist.append(('sys', 'gong'))
-                    self.audio_playlist.append(('sys', 'pristi_zastavka'))
-                    self.audio_playlist.append(('stops', self.stops[self.stop_index]['file']))
-                    print(f"📢 [INFO] Průjezd čtvrtiny úseku ({time_traveled:.1f}/{leg_total_time:.1f}s) - hlásím příští zastávku.")
+                    self._queue_next_stop_announce()
+                    self.log.emit("announce_next", stop=self.stops[self.stop_index]['nazev'],
+                                  traveled=round(time_traveled, 1), leg=round(leg_total_time, 1))
             # Zkontroluj naplánované poruchy vytvořené při startu/otočení směru.
             try:
                 if self._scheduled_breaks and not self._break_active:
@@ -419,14 +613,7 @@ class BusSimulatorSimpleLine:
                             continue
                         if self.bus_abs_pos >= br.get('abs_pos', 0.0):
                             br['triggered'] = True
-                            self._break_active = True
-                            self.state = 'BROKEN'
-                            self.timer = 0.0
-                            self.repair_timer = br.get('repair_time', 10.0)
-                            self.break_reason = br.get('reason', 'porucha')
-                            # upozorni cestující: složená hláška
-                            self.audio_playlist.append(('sys', 'gong'))
-                            self._queue_line_delay_announce(self.break_reason)
+                            self._start_break(br.get('reason', 'porucha'), br.get('repair_time', 10.0))
                             # zaznamenej pozici poruchy a pocet poruch v tomto smeru
                             try:
                                 abs_pos = float(br.get('abs_pos', 0.0))
@@ -436,7 +623,6 @@ class BusSimulatorSimpleLine:
                                     self._breaks_direction = self.smer_tam
                             except Exception:
                                 pass
-                            print(f"[DEBUG] Line {self.line_id} BROKEN: reason={self.break_reason}, repair={self.repair_timer:.1f}s, abs_pos={abs_pos:.1f}")
                             break
             except Exception:
                 pass
@@ -457,7 +643,7 @@ class BusSimulatorSimpleLine:
         # --- STANDARDNÍ STAVY ZASTÁVKY ---
         elif self.state == "BRAKING":
             # v časové verzi slouží jako rychlý dojezd
-            sim_dt = dt * TIME_SCALE
+            sim_dt = dt * self.time_scale
             self.bus_abs_pos += sim_dt
             if self.bus_abs_pos >= target_time:
                 self.bus_abs_pos = target_time
@@ -516,44 +702,19 @@ class BusSimulatorSimpleLine:
                 # připravit trasu pro opačný směr a POTÉ otevřít dveře pro nástup.
                 if self.stop_index == len(self.stops) - 1:
                     try:
-                        # přepnout směr a připravit novou trasu
-                        self.smer_tam = not self.smer_tam
-                        self.prebuild_route()
+                        # přepnout směr a připravit novou trasu, jízdní řád a cíl
+                        self.set_direction(not self.smer_tam)
                         self.bus_abs_pos = 0.0
                         self.stop_index = 0
                         self.gui_stop_index = 0
                         # reset poruch pro novy smer a naplanuj nove
                         self._breaks_done = 0
-                        self._break_positions = []
                         self._breaks_direction = None
+                        self._break_positions = []
                         try:
                             self._generate_scheduled_breaks()
                         except Exception:
                             pass
-                        # aktualizuj plánovaný čas odjezdu a přepočítej časy
-                        try:
-                            self.departure_time = datetime.datetime.now()
-                        except Exception:
-                            self.departure_time = datetime.datetime.today()
-                        try:
-                            self._compute_schedule_times()
-                        except Exception:
-                            pass
-                        # aktualizuj titulek a cílovou stanici
-                        try:
-                            if self.trasa_segmenty:
-                                if self.smer_tam:
-                                    self.dest_name = self.trasa_segmenty[-1][0].upper()
-                                else:
-                                    self.dest_name = self.trasa_segmenty[0][0].upper()
-                            dir_text = "TAM" if self.smer_tam else "ZPĚT"
-                            caption = f"{self.line_id} | {getattr(self, 'desc', '')} (směr: {dir_text})" if getattr(self, 'desc', '') else f"Linka {self.line_id} (směr: {dir_text})"
-                            try:
-                                pygame.display.set_caption(caption)
-                            except Exception:
-                                pass
-                        except Exception:
-                            pass
                     except Exception:
                         pass
                     # Otevřít dveře pro nástup v novém směru
@@ -570,162 +731,592 @@ class BusSimulatorSimpleLine:
                     self.leg_start_pos = self.bus_abs_pos
                     self.timer = 0
 
-    def get_time_string(self):
-        now = datetime.datetime.now()
-        colon = ":" if (time.time() % 1) > 0.5 else " "
-        return f"{now.strftime('%H')}{colon}{now.strftime('%M')}"
-
-    def draw_straight_route(self):
-        footer_y = H - 120
-        line_x = 120
-        line_bottom = footer_y + 60 
-        line_top = 160
-
-        pygame.draw.line(self.screen, ROUTE_RED, (line_x, line_bottom), (line_x, line_top), 10)
-        arrow_tip = (line_x, line_top - 20)
-        arrow_left = (line_x - 15, line_top + 10)
-        arrow_right = (line_x + 15, line_top + 10)
-        pygame.draw.polygon(self.screen, ROUTE_RED, [arrow_tip, arrow_left, arrow_right])
-
-        # Aktuální zastávka
-        ellipse_w, ellipse_h = 70, 44
-        # vycentrovat hlavní ovál přesně na osu
-        pygame.draw.ellipse(self.screen, TEXT_BLACK, 
-                    (line_x - ellipse_w//2, line_bottom - ellipse_h//2, ellipse_w, ellipse_h))
-
-        stops_to_show = 4
-        start_y = line_bottom - 110
-        spacing_y = 100
-
-        for i in range(stops_to_show):
-            view_idx = self.gui_stop_index + 1 + i
-            if view_idx < len(self.stops):
-                stop = self.stops[view_idx]
-                current_y = start_y - (i * spacing_y)
-                if current_y < 150: break
-
-                e_w, e_h = 50, 30
-                # ovál vykreslíme tak, aby byl vycentrován na linii
-                oval_rect = (line_x - e_w//2, current_y - e_h//2, e_w, e_h)
-                pygame.draw.ellipse(self.screen, TEXT_BLACK, oval_rect)
-
-                # název zastávky zarovnaný na pevnou pozici (vpravo od osy), oříznutí dlouhých názvů
-                name = stop.get("nazev", "")
-                # pevná levá pozice pro začátek názvů
-                label_x = line_x + (ellipse_w // 2) + 20
-                # maximální šířka pro štítek
-                max_label_w = max(40, W - label_x - 20)
-                lbl = self.font_stop_list.render(name, True, TEXT_BLACK)
-                if lbl.get_width() > max_label_w:
-                    # jednoduché oříznutí s elipsou — zkus odhadnout počet znaků
-                    approx_chars = max(3, int(len(name) * (max_label_w / lbl.get_width())) - 1)
-                    short = name[:approx_chars].rstrip()
-                    # doplň tečku pokud se ještě nevejde
-                    while self.font_stop_list.render(short + '…', True, TEXT_BLACK).get_width() > max_label_w and len(short) > 3:
-                        short = short[:-1]
-                    short = short + '…'
-                    lbl = self.font_stop_list.render(short, True, TEXT_BLACK)
-                self.screen.blit(lbl, (label_x, current_y - lbl.get_height()//2))
-
-                # vykresli plánovaný čas příjezdu VEDLE oválu (brand barva, stejny font jako jmena)
-                sched = stop.get('sched_str', '')
-                if sched:
-                    # použijeme stejný font jako pro seznam zastávek, barva brand (ROUTE_RED)
-                    try:
-                        # menší font pro plánované časy
-                        lbl_time = self.font_dp.render(sched, True, ROUTE_RED)
-                        # umístit vlevo od oválu s malou mezerou
-                        left_x = line_x - (e_w // 2) - 10 - lbl_time.get_width()
-                        self.screen.blit(lbl_time, (left_x, current_y - lbl_time.get_height()//2))
-                    except Exception:
-                        # fallback: jednoduché renderování menším fontem bíle uvnitř oválu
-                        max_w, max_h = e_w, e_h
-                        surf_time = self._render_text_fit(sched, max_w, max_h, font_name='Arial', bold=True, start_size=28)
-                        oval_cx = line_x
-                        oval_cy = current_y
-                        self.screen.blit(surf_time, (oval_cx - surf_time.get_width()//2, oval_cy - surf_time.get_height()//2))
-
-    def draw(self):
-        self.screen.fill(BG_COLOR)
+    def set_direction(self, smer_tam):
+        """Nastaví směr: trasu, plánované časy od aktuálního času, cílovou stanici a titulek okna."""
+        self.smer_tam = smer_tam
+        self.prebuild_route()
+        # aktualizuj plánovaný čas odjezdu a přepočítej časy
+        try:
+            self.departure_time = self.now()
+        except Exception:
+            self.departure_time = datetime.datetime.today()
+        try:
+            self._compute_schedule_times()
+        except Exception:
+            pass
+        self._update_destination()
 
-        lbl_num = self.font_line.render(self.line_id, True, TEXT_BLACK)
-        self.screen.blit(lbl_num, (30, 15))
-        
-        arrow_poly = [(110, 35), (110, 75), (150, 55)]
-        pygame.draw.polygon(self.screen, ROUTE_RED, arrow_poly)
+    def _update_destination(self):
+        """Cílová stanice a titulek okna podle směru a definice linky."""
+        try:
+            if self.trasa_segmenty:
+                if self.smer_tam:
+                    self.dest_name = self.trasa_segmenty[-1][0].upper()
+                else:
+                    self.dest_name = self.trasa_segmenty[0][0].upper()
+            dir_text = "TAM" if self.smer_tam else "ZPĚT"
+            caption = f"{self.line_id} | {getattr(self, 'desc', '')} (směr: {dir_text})" if getattr(self, 'desc', '') else f"Linka {self.line_id} (směr: {dir_text})"
+            try:
+                pygame.display.set_caption(caption)
+            except Exception:
+                pass
+        except Exception:
+            pass
 
-        lbl_dest = self.font_dest.render(self.dest_name, True, TEXT_BLACK)
-        self.screen.blit(lbl_dest, (170, 20))
+    def _match_stop(self, old_stops, index):
+        """Index zastávky v nové trase odpovídající `old_stops[index]` (podle jména, nejbližší výskyt)."""
+        if index >= len(old_stops):
+            return len(self.stops)
+        name = old_stops[index]["nazev"]
+        matches = [j for j, stop in enumerate(self.stops) if stop["nazev"] == name]
+        if matches:
+            return min(matches, key=lambda j: abs(j - index))
+        return min(index, len(self.stops))
+
+    def reload_line(self):
+        """Znovu načte definici linky a přestaví trasu; jízda pokračuje na stejném místě úseku."""
+        try:
+            line_data, segments = load_line_definition(self.line_id)
+        except Exception as e:
+            print(f"❌ Linka {self.line_id}: nelze znovu načíst ({e})")
+            return False
+        old_stops = self.stops
+        old_total = old_stops[-1]["dist"] if old_stops else 0.0
+        target = self.stop_index
+        self.trasa_segmenty = segments
+        self.desc = line_data.get("description", "")
+        self.prebuild_route()
+        try:
+            self._compute_schedule_times()
+        except Exception:
+            pass
+        self._update_destination()
+
+        # stejné logické místo: cílová zastávka podle jména a stejný podíl ujetého úseku
+        new_target = self._match_stop(old_stops, target)
+
+        def remap(t):
+            if not self.stops:
+                return 0.0
+            if 0 < target < len(old_stops) and 0 < new_target < len(self.stops):
+                a, b = old_stops[target - 1]["dist"], old_stops[target]["dist"]
+                f = min(max((t - a) / (b - a), 0.0), 1.0) if b > a else 1.0
+                na, nb = self.stops[new_target - 1]["dist"], self.stops[new_target]["dist"]
+                return na + (nb - na) * f
+            return self.stops[min(new_target, len(self.stops) - 1)]["dist"]
+
+        self.bus_abs_pos = remap(self.bus_abs_pos)
+        self.leg_start_pos = remap(self.leg_start_pos)
+        self.stop_index = new_target
+        self.gui_stop_index = self._match_stop(old_stops, self.gui_stop_index)
+        new_total = self.stops[-1]["dist"] if self.stops else 0.0
+        if old_total > 0:
+            for br in self._scheduled_breaks:
+                br['abs_pos'] = br.get('abs_pos', 0.0) * new_total / old_total
+
+        # zneplatnit jen to, co na definici linky závisí
+        self._route_diagrams.clear()
+        self._geometry = None
+        self._map = None
+        self._telemetry_key = None
+        self.log.emit("line_reloaded", line=self.line_id, stops=len(self.stops), stop_index=self.stop_index,
+                      abs_pos=round(self.bus_abs_pos, 1))
+        return True
+
+    def _on_file_changed(self, path):
+        """Reakce na změněný soubor z watcheru: znovu načte jen dotčenou linku, klip nebo tabulku."""
+        folder, name = os.path.split(os.path.abspath(path))
+        stem, ext = os.path.splitext(name)
+        if folder == os.path.abspath(LINES_DIR):
+            if stem != self.line_id:
+                return
+            if ext == ".json":
+                self.reload_line()
+            elif ext == ".geojson":
+                self._geometry = None
+                self._map = None
+                self.log.emit("geometry_reloaded", line=self.line_id)
+        elif os.path.abspath(path) == os.path.abspath(GAIN_TABLE_PATH):
+            self.gain_table = load_gain_table(GAIN_TABLE_PATH)
+            self.log.emit("gain_table_reloaded", clips=len(self.gain_table))
+        elif ext in (".mp3", ".wav") and folder in (os.path.abspath(SYS_AUDIO_DIR), os.path.abspath(STOPS_AUDIO_DIR)):
+            category = 'sys' if folder == os.path.abspath(SYS_AUDIO_DIR) else 'stops'
+            if self._sounds.pop((category, stem), False) is not False:
+                self.log.emit("clip_reloaded", clip=f"{category}/{stem}")
+
+    def _apply_control_command(self, cmd, args):
+        """Provede příkaz z řídicího serveru (volá se v hlavní smyčce) a vrátí odpověď."""
+        if cmd == "GOTO":
+            n = _command_arg(args, 0, int, "GOTO <n>")
+            if not 0 <= n < len(self.stops):
+                raise ValueError(f"zastávka {n} mimo rozsah 0..{len(self.stops) - 1}")
+            self.stop_index = n
+            self.gui_stop_index = n
+            self.bus_abs_pos = self.stops[n]["dist"]
+            self.leg_start_pos = self.bus_abs_pos
+            self.next_stop_announced = True
+            self.current_stop_announced = True
+            self._break_active = False
+            self.state = "STOPPED"
+            self.timer = 0.0
+            self.current_wait_limit = getattr(self, 'stop_wait_before_open', 1.5)
+            # poruchy naplánované před novou pozicí už nespouštěj
+            for br in self._scheduled_breaks:
+                if br.get('abs_pos', 0.0) <= self.bus_abs_pos:
+                    br['triggered'] = True
+            return f"OK {self.stops[n]['nazev']}"
+        if cmd == "BREAK":
+            if self.state != "DRIVING":
+                raise ValueError(f"poruchu lze vyvolat jen za jízdy (stav {self.state})")
+            reason = args[0] if args else random.choice(TROLLEY_BREAK_REASONS)
+            if len(args) >= 2:
+                repair = _command_arg(args, 1, float, "BREAK <důvod> [s]")
+            else:
+                repair = random.uniform(TROLLEY_REPAIR_MIN_SEC, TROLLEY_REPAIR_MAX_SEC)
+            self._start_break(reason, repair)
+            return f"OK {reason} {repair:.1f}s"
+        if cmd == "ANNOUNCE":
+            which = (args[0] if args else "NEXT").upper()
+            if self.stop_index >= len(self.stops):
+                raise ValueError("není co hlásit")
+            if which == "NEXT":
+                self._queue_next_stop_announce()
+            elif which == "CURRENT":
+                self._queue_current_stop_announce()
+            else:
+                raise ValueError(f"neznámé hlášení {which}")
+            return "OK"
+        if cmd == "PAUSE":
+            self.paused = True
+            return "OK"
+        if cmd == "RESUME":
+            self.paused = False
+            return "OK"
+        if cmd == "SCALE":
+            scale = _command_arg(args, 0, float, "SCALE <x>")
+            if not 0 < scale < float("inf"):
+                raise ValueError("měřítko musí být kladné")
+            self.time_scale = scale
+            return f"OK {scale:g}"
+        if cmd == "VIEW":
+            self.set_view(args[0].lower() if args else None)
+            return f"OK {self.view}"
+        if cmd == "STATUS":
+            return (f"OK stop={self.stop_index} gui={self.gui_stop_index} state={self.state} "
+                    f"t={self.bus_abs_pos:.1f} scale={self.time_scale:g} paused={int(self.paused)}")
+        raise ValueError(f"neznámý příkaz {cmd}")
+
+    def _publish_telemetry(self):
+        """Zapíše stav panelu do sdílené paměti, pokud se od posledního zápisu změnil."""
+        if self._telemetry is None:
+            return
+        break_reason = getattr(self, 'break_reason', '') if self._break_active else ''
+        # poloha po celých sekundách, aby bus_abs_pos v záznamu za jízdy nezastarala (zápis nejvýš 1× za sim. s)
+        key = (self.gui_stop_index, self.stop_index, self.state, self.smer_tam, break_reason, len(self.stops),
+               int(self.bus_abs_pos))
+        if key == self._telemetry_key:
+            return
+        self._telemetry_key = key
+        if self.gui_stop_index < len(self.stops):
+            stop = self.stops[self.gui_stop_index]
+            stop_name = stop.get("nazev", "")
+            sched = stop.get("sched_str", "")
+        else:
+            stop_name, sched = "KONEČNÁ", ""
+        try:
+            self._telemetry.publish(self.gui_stop_index, self.stop_index, len(self.stops), self.smer_tam,
+                                    self._break_active, self.bus_abs_pos, self.line_id, stop_name, sched,
+                                    self.state, break_reason)
+        except Exception as e:
+            print(f"❌ Telemetrie: zápis selhal ({e})")
+            self._telemetry = None
 
-        pygame.draw.line(self.screen, HEADER_LINE_COLOR, (0, 100), (W, 100), 5)
+    def _frame_key(self):
+        """Vše, na čem závisí vzhled panelu; stejný klíč = stejný snímek."""
+        return (self.gui_stop_index, self.smer_tam, self.state, self.dest_name, self.get_time_string(),
+                round(self.bus_abs_pos, 1) if self.view == "map" else int(self.bus_abs_pos), self.quit_prompt, self.view,
+                round(self._scroll_pos, 3))
 
-        time_box_w, time_box_h = 200, 80
-        pygame.draw.rect(self.screen, TIME_BG_COLOR, (W - time_box_w, 100, time_box_w, time_box_h))
-        lbl_time = self.font_time.render(self.get_time_string(), True, TEXT_WHITE)
-        self.screen.blit(lbl_time, (W - time_box_w + (time_box_w - lbl_time.get_width())//2, 100 + (time_box_h - lbl_time.get_height())//2))
+    def get_time_string(self):
+        now = self.now()
+        colon = ":" if now.microsecond > 500000 else " "
+        return f"{now.strftime('%H')}{colon}{now.strftime('%M')}"
 
-        footer_height = 120
-        footer_y = H - footer_height
-        pygame.draw.rect(self.screen, YELLOW_BAR_COLOR, (0, footer_y, W, footer_height))
+    def resize(self, width, height):
+        """Přepočítá rozvržení pro novou velikost panelu (volá se jen při změně velikosti okna)."""
+        if (width, height) == self.layout.size:
+            return
+        if self.headless:
+            self.screen = pygame.Surface((width, height))
+        else:
+            self.screen = pygame.display.get_surface()
+            if self.screen is None or self.screen.get_size() != (width, height):
+                self.screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+        self.layout = PanelLayout(width, height)
+        self._route_diagrams.clear()
+
+    def set_view(self, view=None):
+        """Přepne zobrazení panel/celá trasa/mapa; bez argumentu přejde na další."""
+        if view is None:
+            view = VIEWS[(VIEWS.index(self.view) + 1) % len(VIEWS)]
+        if view not in VIEWS:
+            raise ValueError(f"neznámé zobrazení {view}")
+        self.view = view
+        self.log.emit("view", view=view)
+
+    def _build_header_background(self, layout):
+        """Pozadí s hlavičkou (šipka, červená linka) – základ obou zobrazení."""
+        surf = layout.surface()
+        surf.fill(BG_COLOR)
+        pygame.draw.polygon(surf, ROUTE_RED, layout.header_arrow)
+        pygame.draw.line(surf, HEADER_LINE_COLOR, (0, layout.header_line_y), (layout.width, layout.header_line_y),
+                         layout.header_line_w)
+        return surf
+
+    def _build_background(self, layout):
+        """Statické části panelu (pruhy, box času, osa trasy se šipkou, ovál aktuální zastávky)."""
+        surf = self._build_header_background(layout)
+        pygame.draw.rect(surf, YELLOW_BAR_COLOR, layout.footer)
+        pygame.draw.line(surf, ROUTE_RED, (layout.line_x, layout.line_bottom), (layout.line_x, layout.line_top),
+                         layout.line_w)
+        pygame.draw.polygon(surf, ROUTE_RED, layout.route_arrow)
+        # vycentrovat hlavní ovál přesně na osu
+        pygame.draw.ellipse(surf, TEXT_BLACK, layout.current_oval)
+        return surf
+
+    def _draw_stop_row(self, surf, stop, current_y):
+        """Jeden řádek seznamu: ovál na ose, název vpravo a plánovaný čas vlevo."""
+        layout = self.layout
+        line_x = layout.line_x
+        e_w, e_h = layout.stop_oval_size
+
+        # ovál vykreslíme tak, aby byl vycentrován na linii
+        oval_rect = (line_x - e_w//2, current_y - e_h//2, e_w, e_h)
+        pygame.draw.ellipse(surf, TEXT_BLACK, oval_rect)
+
+        # název zastávky zarovnaný na pevnou pozici (vpravo od osy), oříznutí dlouhých názvů
+        lbl = layout.fit_text("stop_list", stop.get("nazev", ""), TEXT_BLACK, layout.stop_label_max_w)
+        surf.blit(lbl, (layout.stop_label_x, current_y - lbl.get_height()//2))
+
+        # vykresli plánovaný čas příjezdu VEDLE oválu (brand barva, menší font)
+        sched = stop.get('sched_str', '')
+        if sched:
+            try:
+                lbl_time = layout.text("dp", sched, ROUTE_RED)
+                # umístit vlevo od oválu s malou mezerou
+                left_x = line_x - (e_w // 2) - layout.sched_gap - lbl_time.get_width()
+                surf.blit(lbl_time, (left_x, current_y - lbl_time.get_height()//2))
+            except Exception:
+                # fallback: jednoduché renderování menším fontem bíle uvnitř oválu
+                surf_time = self._render_text_fit(sched, e_w, e_h, font_name='Arial', bold=True,
+                                                  start_size=layout.fonts["dp"].get_height())
+                surf.blit(surf_time, (line_x - surf_time.get_width()//2, current_y - surf_time.get_height()//2))
+
+    def _stop_strip(self, first, last):
+        """Pás s předkreslenými řádky zastávek (aspoň first..last) na bílém pozadí s osou trasy.
+
+        Zastávky jdou v pásu zdola nahoru jako na panelu; vytváří se znovu jen po
+        změně směru/rozvržení nebo když posun vyjede z předkreslených řádků.
+        Vrací (první zastávka, poslední zastávka, y řádku poslední zastávky, Surface)."""
+        layout = self.layout
+        strip = self._strip
+        if strip is not None and strip[0] is self.stops and strip[1] is layout and strip[2] <= first and last <= strip[3]:
+            return strip[2:]
+        base = max(0, first)
+        top = min(len(self.stops) - 1, max(last, base + STOP_STRIP_ROWS - 1))
+        spacing = layout.stops_spacing
+        pad = spacing
+        surf = layout.surface((layout.width, 2 * pad + (top - base) * spacing))
+        surf.fill(BG_COLOR)
+        pygame.draw.line(surf, ROUTE_RED, (layout.line_x, 0), (layout.line_x, surf.get_height()), layout.line_w)
+        for j in range(base, top + 1):
+            self._draw_stop_row(surf, self.stops[j], pad + (top - j) * spacing)
+        self._strip = (self.stops, layout, base, top, pad, surf)
+        return self._strip[2:]
+
+    def _stop_list_position(self):
+        """Poloha seznamu v zastávkách: při příjezdu na další zastávku plynule (ease-in-out)
+        přejde ze staré hodnoty na novou podle času, takže nezávisí na snímkové frekvenci."""
+        target = self.gui_stop_index
+        if target != self._scroll_to or self._scroll_stops is not self.stops:
+            if self.scroll_sec > 0 and target == self._scroll_to + 1 and self._scroll_stops is self.stops:
+                self._scroll_from = self._scroll_pos
+                self._scroll_start = self.now()
+            else:
+                # skok (GOTO, změna směru) bez animace
+                self._scroll_from = target
+            self._scroll_to = target
+            self._scroll_stops = self.stops
+        pos = float(target)
+        if self._scroll_from != target:
+            t = (self.now() - self._scroll_start).total_seconds() / self.scroll_sec
+            if t < 1.0:
+                t = max(t, 0.0)
+                pos = self._scroll_from + (target - self._scroll_from) * t * t * (3.0 - 2.0 * t)
+            else:
+                self._scroll_from = target
+        self._scroll_pos = pos
+        return pos
 
+    def draw_straight_route(self):
+        """Seznam příštích zastávek: výřez předkresleného pásu jedním blitem (i během posunu)."""
+        layout = self.layout
+        pos = self._stop_list_position()
+        first = int(pos) + 1
+        if first >= len(self.stops):
+            return
+        last = min(len(self.stops) - 1, int(math.ceil(pos)) + layout.stops_to_show)
+        base, top, pad, surf = self._stop_strip(first, last)
+        spacing = layout.stops_spacing
+        # posun pásu vůči obrazovce: zastávka j je na y = stops_start_y - (j - pos - 1) * spacing
+        offset = layout.stops_start_y + (pos + 1 - top) * spacing - pad
+        window = layout.stop_list_window
+        self.screen.blit(surf, window.topleft, pygame.Rect(0, window.y - int(round(offset)), window.w, window.h))
+
+    def _route_diagram(self):
+        """Celotrasové schéma aktuálního směru (vytvoří se jednou pro směr a rozlišení)."""
+        key = (self.smer_tam, self.layout.size)
+        diagram = self._route_diagrams.get(key)
+        if diagram is None:
+            from route_diagram import RouteDiagram
+            diagram = RouteDiagram(self.layout, [stop["nazev"] for stop in self.stops], self.layout.diagram_area)
+            self._route_diagrams[key] = diagram
+        return diagram
+
+    def _build_map_background(self, layout):
+        surf = self._build_header_background(layout)
+        pygame.draw.rect(surf, YELLOW_BAR_COLOR, layout.footer)
+        return surf
+
+    def _map_renderer(self):
+        """Dlaždicová mapa linky pro aktuální rozvržení; None, pokud linka nemá geometrii."""
+        if self._geometry is None:
+            from route_map import RouteGeometry
+            path = os.path.join(LINES_DIR, f"{self.line_id}.geojson")
+            try:
+                self._geometry = RouteGeometry.load(path, len(self.trasa_segmenty)) or False
+            except Exception as e:
+                print(f"❌ Mapa: nelze načíst {path} ({e})")
+                self._geometry = False
+        if self._geometry is False:
+            return None
+        if self._map is None or self._map.layout is not self.layout:
+            from route_map import MapRenderer
+            self._map = MapRenderer(self._geometry, self.layout)
+        return self._map
+
+    def draw_map_view(self):
+        """Mapa se středem na voze; poloha z bus_abs_pos podle geometrie trasy."""
+        layout = self.layout
+        self.screen.blit(layout.asset("map_background", self._build_map_background), (0, 0))
+        renderer = self._map_renderer()
+        if renderer is None:
+            lbl = layout.text("diagram", f"Linka {self.line_id} nemá geometrii trasy (lines/{self.line_id}.geojson)", TEXT_BLACK)
+            self.screen.blit(lbl, layout.map_message_pos)
+        else:
+            stops = self.stops
+            renderer.draw(self.screen, layout.map_area, self.smer_tam, [stop["dist"] for stop in stops],
+                          self.bus_abs_pos, [stop["nazev"] for stop in stops], self.gui_stop_index)
+        self._draw_footer(layout)
+        self._draw_header(layout)
+        self._draw_debug(layout)
+
+    def _draw_footer(self, layout):
         if self.gui_stop_index < len(self.stops):
             current_stop_name = self.stops[self.gui_stop_index]["nazev"]
         else:
             current_stop_name = "KONEČNÁ"
-        
-        lbl_footer = self.font_footer.render(current_stop_name, True, TEXT_BLACK)
-        self.screen.blit(lbl_footer, (190, footer_y + (footer_height - lbl_footer.get_height())//2))
 
-        self.draw_straight_route()
+        footer = layout.footer
+        lbl_footer = layout.text("footer", current_stop_name, TEXT_BLACK)
+        self.screen.blit(lbl_footer, (layout.footer_label_x, footer.y + (footer.h - lbl_footer.get_height())//2))
 
-        # Debug
+    def _draw_header(self, layout):
+        self.screen.blit(layout.text("line", self.line_id, TEXT_BLACK), layout.line_pos)
+        self.screen.blit(layout.text("dest", self.dest_name, TEXT_BLACK), layout.dest_pos)
+
+        # box času se kreslí až přes seznam zastávek (na malých panelech do něj zasahuje okno seznamu)
+        box = layout.time_box
+        pygame.draw.rect(self.screen, TIME_BG_COLOR, box)
+        lbl_time = layout.text("time", self.get_time_string(), TEXT_WHITE)
+        self.screen.blit(lbl_time, (box.x + (box.w - lbl_time.get_width())//2, box.y + (box.h - lbl_time.get_height())//2))
+
+    def _draw_debug(self, layout):
         state_display = self.state
         if state_display == "WAITING_FOR_LIGHT": state_display = "ČEKÁM NA SEMAFOR"
         if state_display == "YIELDING": state_display = "PŘEDNOST (KRUHÁČ)"
-        
-        lbl_debug = pygame.font.SysFont('Consolas', 15).render(f"t={int(self.bus_abs_pos)} s | {state_display}", True, (150,150,150))
-        self.screen.blit(lbl_debug, (W-300, H-20))
+
+        lbl_debug = layout.text("debug", f"t={int(self.bus_abs_pos)} s | {state_display}", (150,150,150))
+        self.screen.blit(lbl_debug, layout.debug_pos)
+
+    def draw_route_view(self):
+        """Celá trasa aktuálního směru; stránka s aktuální zastávkou z předkreslené cache."""
+        layout = self.layout
+        self.screen.blit(layout.asset("header_background", self._build_header_background), (0, 0))
+        self._draw_header(layout)
+
+        diagram = self._route_diagram()
+        diagram.set_current(self.gui_stop_index)
+        page = diagram.page_of(self.gui_stop_index)
+        self.screen.blit(diagram.page_surface(page), layout.diagram_area)
+        if diagram.pages > 1:
+            lbl_page = layout.text("diagram_page", f"{page + 1}/{diagram.pages}", ROUTE_RED)
+            self.screen.blit(lbl_page, lbl_page.get_rect(bottomright=layout.diagram_page_pos))
+
+        self._draw_debug(layout)
+
+    def draw(self):
+        layout = self.layout
+        if self.view == "route":
+            self.draw_route_view()
+            return
+        if self.view == "map":
+            self.draw_map_view()
+            return
+        self.screen.blit(layout.asset("background", self._build_background), (0, 0))
+        self._draw_footer(layout)
+
+        prof = self._profiler
+        if prof is None:
+            self.draw_straight_route()
+        else:
+            start = prof.now()
+            self.draw_straight_route()
+            prof.add("draw_route", start)
+        self._draw_header(layout)
+
+        # Debug
+        self._draw_debug(layout)
+
+    def draw_quit_prompt(self):
+        """Vykreslí dotaz na ukončení simulace přes panel (Ano = Enter, Ne = Esc)."""
+        layout = self.layout
+        if self._quit_shade is None or self._quit_shade.get_size() != self.screen.get_size():
+            self._quit_shade = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
+            self._quit_shade.fill(OVERLAY_SHADE)
+        self.screen.blit(self._quit_shade, (0, 0))
+
+        box = layout.prompt_box
+        pygame.draw.rect(self.screen, BG_COLOR, box)
+        pygame.draw.rect(self.screen, ROUTE_RED, box, layout.prompt_border)
+        lbl = layout.text("prompt", "Opravdu chcete ukončit simulaci linky?", TEXT_BLACK)
+        self.screen.blit(lbl, (box.centerx - lbl.get_width() // 2, layout.prompt_label_y))
+
+        self._quit_buttons = {}
+        for answer, text, btn in layout.prompt_buttons:
+            pygame.draw.rect(self.screen, ROUTE_RED if answer else TEXT_BLACK, btn, border_radius=layout.prompt_radius)
+            lbl_btn = layout.text("prompt_btn", text, TEXT_WHITE)
+            self.screen.blit(lbl_btn, lbl_btn.get_rect(center=btn.center))
+            self._quit_buttons[answer] = btn
+
+    def handle_quit_prompt_event(self, event):
+        """Zpracuje událost při zobrazeném dotazu; vrátí True/False po odpovědi, jinak None."""
+        if event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_a, pygame.K_y):
+                return True
+            if event.key in (pygame.K_ESCAPE, pygame.K_n):
+                return False
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            for answer, rect in self._quit_buttons.items():
+                if rect.collidepoint(event.pos):
+                    return answer
+        return None
 
     def run(self):
         print("--- START SIMULACE ---")
         running = True
-        root = None
+        prof = self._profiler
         while running:
+            if prof is not None:
+                prof.end_frame()
+                start = prof.now()
             dt = self.clock.tick(60) / 1000.0 
+            if prof is not None:
+                prof.begin_frame()
+                prof.add("idle", start)
+                start = prof.now()
             for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    # potvrzení ukončení simulace
-                    if root is None:
-                        root = tk.Tk()
-                        # pokud máme logo, nastav ho jako ikonu okna dialogu
-                        try:
-                            if self._icon_path and os.path.exists(self._icon_path):
-                                img = tk.PhotoImage(master=root, file=self._icon_path)
-                                root.iconphoto(False, img)
-                                root._icon_image = img
-                        except Exception:
-                            pass
-                        root.withdraw()
-                    if messagebox.askyesno("Ukončit simulaci", "Opravdu chcete ukončit simulaci linky?"):
+                if event.type == pygame.VIDEORESIZE:
+                    self.resize(event.w, event.h)
+                elif event.type == pygame.QUIT:
+                    # potvrzení ukončení simulace (překryvný dotaz, simulace běží dál)
+                    self.quit_prompt = True
+                elif self.quit_prompt:
+                    answer = self.handle_quit_prompt_event(event)
+                    if answer is True:
                         running = False
-            self.update_physics(dt)
+                    elif answer is False:
+                        self.quit_prompt = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_v:
+                    self.set_view()
+            if self._control is not None and self._control.pending:
+                self._control.drain(self._apply_control_command)
+            if self._watcher is not None and self._watcher.pending:
+                self._watcher.drain(self._on_file_changed)
+            if prof is not None:
+                prof.add("events", start)
+                start = prof.now()
+            if not self.paused:
+                self.update_physics(dt)
+            self._publish_telemetry()
+            if prof is not None:
+                prof.add("physics", start)
+                start = prof.now()
             self.draw()
+            if self.quit_prompt:
+                self.draw_quit_prompt()
+            if self._mjpeg is not None and self._mjpeg.clients:
+                self._mjpeg.offer(self.screen, self._frame_key())
+            if prof is not None:
+                prof.add("draw", start)
+                start = prof.now()
             pygame.display.flip()
+            if prof is not None:
+                prof.add("flip", start)
+        if prof is not None:
+            prof.end_frame()
+            prof.close()
         pygame.quit()
-        if root is not None:
-            root.destroy()
+        if self._telemetry is not None:
+            self._telemetry.close()
+            self._telemetry = None
+        if self._control is not None:
+            self._control.close()
+            self._control = None
+        if self._mjpeg is not None:
+            self._mjpeg.close()
+            self._mjpeg = None
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+        self.log.close()
         print("--- KONEC SIMULACE ---")
 
 if __name__ == "__main__":
     # Případ, kdy je main.py spuštěn přímo (např. ze start.py nebo z příkazové řádky).
     # Lze předat ID linky a směr přes argumenty, jinak se použije výchozí linka 2, směr TAM.
+    # Volitelné přepínače ve tvaru --klic nebo --klic=hodnota (např. --profile=trace.json,
+    # --cprofile=sim.prof, --telemetry=mhdhk_panel, --control=127.0.0.1:8765, --mjpeg=0.0.0.0:8080,
+    # --size=800x480, --view=route).
     line_id = "2"
     direction = "tam"
 
-    if len(sys.argv) >= 2:
-        line_id = sys.argv[1]
-    if len(sys.argv) >= 3:
-        direction = sys.argv[2]
-
-    app = BusSimulatorSimpleLine(line_id=line_id, direction=direction)
+    args = []
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            options[key] = value or "1"
+        else:
+            args.append(arg)
+    if len(args) >= 1:
+        line_id = args[0]
+    if len(args) >= 2:
+        direction = args[1]
+
+    app = BusSimulatorSimpleLine(line_id=line_id, direction=direction,
+                                 telemetry=options.get("telemetry"), control=options.get("control"),
+                                 profile=options.get("profile"), cprofile=options.get("cprofile"),
+                                 mjpeg=options.get("mjpeg"), size=options.get("size"),
+                                 view=options.get("view"))
     app.run()
\ No newline at end of file
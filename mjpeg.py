@@ -0,0 +1,203 @@
+"""Lokální MJPEG/HTTP stream panelu pro tablety a dispečink.
+
+Server běží ve vlastních vláknech (`ThreadingHTTPServer`, jedno vlákno na
+klienta) a nabízí:
+
+    /          jednoduchou stránku s živým obrazem
+    /stream    multipart/x-mixed-replace MJPEG stream
+    /frame.jpg aktuální snímek
+
+Hlavní smyčka simulátoru volá po vykreslení `offer(surface, key)`. Pokud
+není připojen žádný klient, snímek se od posledního kódování nezměnil
+(`key`) nebo kodér ještě pracuje, vrátí se hned. Jinak se pixely obrazovky
+zkopírují jedním `memcpy` přes buffer view do předalokovaného bufferu a
+kódovací vlákno z něj bez další kopie vytvoří Surface a uloží JPEG.
+
+Každý klient posílá vždy nejnovější hotový JPEG; pomalý klient tedy
+přeskakuje snímky jen sám za sebe a hlavní smyčka na něj nikdy nečeká.
+"""
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pygame
+
+DEFAULT_ADDRESS = "127.0.0.1:8080"
+BOUNDARY = b"mhdhkframe"
+JPEG_NAMEHINT = "panel.jpg"  # podle přípony pygame.image.save volí formát
+# jak dlouho čeká vlákno klienta na nový snímek, než zkontroluje ukončení serveru (s)
+CLIENT_WAIT_SEC = 1.0
+
+PAGE = b"""<!doctype html>
+<html><head><meta charset="utf-8"><title>MHD HK panel</title>
+<style>html,body{margin:0;background:#000;height:100%}img{width:100%;height:100%;object-fit:contain}</style>
+</head><body><img src="/stream" alt="panel"></body></html>
+"""
+
+
+def parse_address(address):
+    """Vrátí (host, port) z textu "host:port" nebo "port"."""
+    address = (address or DEFAULT_ADDRESS).strip()
+    host, sep, port = address.rpartition(":")
+    if not sep:
+        host, port = "127.0.0.1", address
+    return host or "127.0.0.1", int(port)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "mhdhk-mjpeg"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        streamer = self.server.streamer
+        path = self.path.split("?", 1)[0]
+        if path == "/":
+            self._send(200, "text/html; charset=utf-8", PAGE)
+        elif path == "/frame.jpg":
+            last, _ = streamer.wait_frame(0, timeout=0)
+            streamer.attach()
+            try:
+                seq, jpeg = streamer.wait_frame(last)
+                if jpeg is None:
+                    self._send(503, "text/plain; charset=utf-8", "Snímek zatím není k dispozici".encode("utf-8"))
+                else:
+                    self._send(200, "image/jpeg", jpeg)
+            finally:
+                streamer.detach()
+        elif path == "/stream":
+            self._stream(streamer)
+        else:
+            self._send(404, "text/plain; charset=utf-8", b"not found")
+
+    def _send(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, streamer):
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=" + BOUNDARY.decode("ascii"))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        streamer.attach()
+        last = 0
+        try:
+            while not streamer.closed:
+                seq, jpeg = streamer.wait_frame(last)
+                if jpeg is None or seq == last:
+                    continue
+                # mezi odesláním snímků se mezilehlé snímky pro tohoto klienta zahodí
+                last = seq
+                self.wfile.write(b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                                 + str(len(jpeg)).encode("ascii") + b"\r\n\r\n" + jpeg + b"\r\n")
+                self.wfile.flush()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            streamer.detach()
+
+
+class MjpegStreamer:
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.host, self.port = parse_address(address)
+        self.clients = 0
+        self.closed = False
+        self._clients_lock = threading.Lock()
+        # nejnovější zakódovaný snímek (pořadové číslo, JPEG) + podmínka pro čekající klienty
+        self._frame = (0, None)
+        self._frame_cond = threading.Condition()
+        # předalokovaný buffer pixelů a stav kodéru
+        self._pixels = None
+        self._size = None
+        self._format = None
+        self._key = None
+        self._busy = False
+        self._wake = threading.Event()
+        self._server = None
+        self._threads = []
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.streamer = self
+        for target, name in ((self._server.serve_forever, "mhdhk-mjpeg-http"), (self._encode_loop, "mhdhk-mjpeg-enc")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def attach(self):
+        with self._clients_lock:
+            if not self.clients:
+                # bez klientů se nekódovalo, uložený snímek může být zastaralý
+                self._key = None
+            self.clients += 1
+
+    def detach(self):
+        with self._clients_lock:
+            self.clients -= 1
+
+    def offer(self, surface, key):
+        """Nabídne právě vykreslený snímek; volá hlavní smyčka, nikdy neblokuje."""
+        if not self.clients or self._busy or key == self._key:
+            return False
+        size = surface.get_size()
+        if self._pixels is None or self._size != size:
+            if surface.get_bitsize() != 32 or surface.get_masks()[:3] != (0xFF0000, 0xFF00, 0xFF):
+                # neobvyklý formát displeje: převod na RGB (kopie navíc)
+                self._format = "RGB"
+            else:
+                self._format = "BGRA"
+            self._size = size
+            self._pixels = bytearray(size[0] * size[1] * len(self._format))
+        if self._format == "BGRA" and surface.get_pitch() == size[0] * 4:
+            self._pixels[:] = memoryview(surface.get_buffer())
+        else:
+            self._pixels[:] = pygame.image.tobytes(surface, "RGB" if self._format == "RGB" else "BGRA")
+        self._key = key
+        self._busy = True
+        self._wake.set()
+        return True
+
+    def _encode_loop(self):
+        while not self.closed:
+            if not self._wake.wait(CLIENT_WAIT_SEC):
+                continue
+            self._wake.clear()
+            if self.closed:
+                break
+            try:
+                surf = pygame.image.frombuffer(self._pixels, self._size, self._format)
+                out = io.BytesIO()
+                pygame.image.save(surf, out, JPEG_NAMEHINT)
+                jpeg = out.getvalue()
+            except Exception:
+                jpeg = None
+            finally:
+                self._busy = False
+            if jpeg is not None:
+                with self._frame_cond:
+                    self._frame = (self._frame[0] + 1, jpeg)
+                    self._frame_cond.notify_all()
+
+    def wait_frame(self, last_seq, timeout=CLIENT_WAIT_SEC):
+        """Vrátí (pořadí, JPEG) snímku novějšího než `last_seq`, po timeoutu poslední známý."""
+        with self._frame_cond:
+            if self._frame[0] == last_seq and timeout:
+                self._frame_cond.wait(timeout)
+            return self._frame
+
+    def close(self):
+        self.closed = True
+        self._wake.set()
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
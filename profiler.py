@@ -0,0 +1,137 @@
+"""Volitelné měření doby jednotlivých fází snímku simulátoru.
+
+Zapíná se proměnnou prostředí `MHD_HK_PROFILE` nebo přepínačem `--profile`
+v `main.py`. Pokud je vypnuté, simulátor drží místo profileru `None` a v
+herní smyčce stojí jen několik testů `is not None`.
+
+Profiler si pro každou fázi (events, physics, play_sound, draw, draw_route,
+flip, ...) pamatuje časy posledních `window` snímků a z nich počítá
+p50/p95/p99, dále drží `worst` nejpomalejších snímků s rozpisem fází a
+posledních `trace_frames` snímků jako události pro Chrome trace
+(chrome://tracing, Perfetto). Volitelně běží i cProfile a při ukončení se
+uloží jeho výstup.
+"""
+import heapq
+import json
+import time
+from collections import deque
+
+FRAME = "frame"
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class FrameProfiler:
+    def __init__(self, trace_path=None, cprofile_path=None, window=600, worst=20, trace_frames=3000):
+        self.trace_path = trace_path
+        self.cprofile_path = cprofile_path
+        self.window = window
+        self.worst_count = worst
+        self.now = time.perf_counter_ns
+        self._epoch = self.now()
+        self._frame_no = 0
+        self._frame_start = None
+        self._spans = []
+        self._samples = {}
+        self._worst = []
+        self._trace = deque(maxlen=trace_frames)
+        self._cprofile = None
+        if cprofile_path:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def begin_frame(self):
+        self._frame_start = self.now()
+        self._spans = []
+
+    def add(self, name, start):
+        """Zaznamená fázi `name`, která začala v čase `start` (z `now()`) a právě skončila."""
+        self._spans.append((name, start, self.now()))
+
+    def end_frame(self):
+        start = self._frame_start
+        if start is None:
+            return
+        end = self.now()
+        self._frame_no += 1
+        spans = self._spans
+        spans.append((FRAME, start, end))
+        totals = {}
+        for name, s, e in spans:
+            totals[name] = totals.get(name, 0) + (e - s)
+        for name, ns in totals.items():
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(ns)
+        item = (totals[FRAME], self._frame_no, totals)
+        if len(self._worst) < self.worst_count:
+            heapq.heappush(self._worst, item)
+        elif item[0] > self._worst[0][0]:
+            heapq.heapreplace(self._worst, item)
+        self._trace.append(spans)
+        self._frame_start = None
+
+    def stats(self):
+        """Vrátí {fáze: {p50, p95, p99, max, mean}} v milisekundách za posledních `window` snímků."""
+        result = {}
+        for name, samples in self._samples.items():
+            values = sorted(samples)
+            result[name] = {
+                "p50": _percentile(values, 50) / 1e6,
+                "p95": _percentile(values, 95) / 1e6,
+                "p99": _percentile(values, 99) / 1e6,
+                "max": values[-1] / 1e6,
+                "mean": sum(values) / len(values) / 1e6,
+            }
+        return result
+
+    def worst_frames(self):
+        """Nejpomalejší snímky od nejhoršího: [(číslo snímku, {fáze: ms})]."""
+        return [(no, {k: v / 1e6 for k, v in totals.items()})
+                for _, no, totals in sorted(self._worst, reverse=True)]
+
+    def chrome_trace(self):
+        events = []
+        for spans in self._trace:
+            for name, s, e in spans:
+                events.append({
+                    "name": name, "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+                    "ts": (s - self._epoch) / 1000.0, "dur": (e - s) / 1000.0,
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def report(self):
+        lines = [f"Profil snímků (posledních {min(self._frame_no, self.window)} z {self._frame_no}):",
+                 f"{'fáze':<12}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  [ms]"]
+        for name, st in sorted(self.stats().items(), key=lambda kv: -kv[1]["p95"]):
+            lines.append(f"{name:<12}{st['p50']:>9.2f}{st['p95']:>9.2f}{st['p99']:>9.2f}{st['max']:>9.2f}")
+        worst = self.worst_frames()[:5]
+        if worst:
+            lines.append("Nejhorší snímky:")
+            for no, totals in worst:
+                parts = ", ".join(f"{k}={v:.1f}" for k, v in sorted(totals.items(), key=lambda kv: -kv[1]) if k != FRAME)
+                lines.append(f"  #{no}: {totals[FRAME]:.1f} ms ({parts})")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            try:
+                self._cprofile.dump_stats(self.cprofile_path)
+            except Exception as e:
+                print(f"❌ Profil: nelze uložit cProfile ({e})")
+            self._cprofile = None
+        if self.trace_path:
+            try:
+                with open(self.trace_path, "w", encoding="utf-8") as f:
+                    json.dump(self.chrome_trace(), f)
+            except Exception as e:
+                print(f"❌ Profil: nelze uložit trace ({e})")
+        print(self.report())
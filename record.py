@@ -1,26 +1,33 @@
+import glob
+import math
 import os
+import struct
 import sys
+import tempfile
 import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from eventlog import EventLog
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 
-# Nahrávání / audio processing
+# Nahrávání / audio processing (numpy zvlášť, aby šlo zpracovávat i bez zvukového zařízení)
 try:
-    import sounddevice as sd
     import numpy as np
-except Exception as e:
-    sd = None
+except Exception:
     np = None
+try:
+    import sounddevice as sd
+except Exception:
+    sd = None
 
 # Pro export do MP3 použijeme pydub (vyžaduje ffmpeg v PATH)
 try:
     from pydub import AudioSegment
 except Exception:
     AudioSegment = None
-try:
-    import simpleaudio as sa
-except Exception:
-    sa = None
 
 if getattr(sys, 'frozen', False):
     BASE_DIR = sys._MEIPASS
@@ -31,13 +38,32 @@ SYS_AUDIO_DIR = os.path.join(AUDIO_DIR, "sys")
 STOPS_AUDIO_DIR = os.path.join(AUDIO_DIR, "stops")
 LINES_DIR = os.path.join(BASE_DIR, "lines")
 
+# Nahrávky zapisované přímo na disk (přežijí i pád aplikace)
+TAKES_DIR = os.path.join(tempfile.gettempdir(), "mhdhk_takes")
+# značka vedle nahrávky, kterou se nepodařilo smazat (zahozená, ne ztracená)
+DISCARD_SUFFIX = ".discard"
+
 APP_TITLE = "MHD HK – Recorder"
-LOG_PATH = os.path.join(BASE_DIR, "record.log")
+# Soubor logu jen na vyžádání (MHD_HK_RECORD_LOG=<soubor.jsonl>), jinak se drží jen v paměti
+LOG_PATH = os.environ.get("MHD_HK_RECORD_LOG", "")
+
+# Do otevření okna (a při importu z jiných skriptů) log jen plní buffer v paměti;
+# vlákno a soubor vytvoří až _start_event_log()
+_EVENT_LOG = EventLog(None, vehicle="recorder")
+
+def _start_event_log():
+    # Log se zapisuje dávkově z pozadového vlákna (soubor se neotevírá při každé zprávě)
+    if LOG_PATH and _EVENT_LOG.path is None:
+        _EVENT_LOG.path = LOG_PATH
+    try:
+        _EVENT_LOG.start()
+    except Exception:
+        _EVENT_LOG.path = None
+        _EVENT_LOG.start()
 
 def _log(msg):
     try:
-        with open(LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(msg + "\n")
+        _EVENT_LOG.emit("log", msg=msg)
     except Exception:
         pass
 
@@ -74,12 +100,560 @@ def safe_action(fn):
                 pass
     return _wrap
 
+# Počet vzorků na jeden bod obálky (min/max) počítané už při nahrávání
+ENVELOPE_BLOCK = 256
+# Počáteční kapacita bufferu nahrávky (s); dál roste geometricky
+CAPTURE_INITIAL_SEC = 30
+
+class CaptureBuffer:
+    """Předalokovaný buffer nahrávky, do kterého zapisuje audio callback.
+
+    Kapacita roste geometricky (zdvojnásobením), takže zápis je amortizovaně
+    O(1) a callback běžně nic nealokuje. Zároveň se průběžně počítá obálka
+    (min/max po blocích ENVELOPE_BLOCK vzorků), přepočítávají se jen bloky
+    zasažené novými vzorky.
+    """
+
+    def __init__(self, channels=1, capacity=44100 * CAPTURE_INITIAL_SEC, block=ENVELOPE_BLOCK):
+        self.channels = channels
+        self.block = block
+        self.length = 0
+        capacity = max(block, int(capacity))
+        self._data = np.empty((capacity, channels), dtype=np.float32)
+        self._env_max = np.zeros(capacity // block + 1, dtype=np.float32)
+        self._env_min = np.zeros(capacity // block + 1, dtype=np.float32)
+
+    def _grow(self, needed):
+        cap = self._data.shape[0]
+        while cap < needed:
+            cap *= 2
+        data = np.empty((cap, self.channels), dtype=np.float32)
+        data[:self.length] = self._data[:self.length]
+        env_max = np.zeros(cap // self.block + 1, dtype=np.float32)
+        env_min = np.zeros(cap // self.block + 1, dtype=np.float32)
+        n_env = self.envelope_length
+        env_max[:n_env] = self._env_max[:n_env]
+        env_min[:n_env] = self._env_min[:n_env]
+        # čtenáři v UI vlákně si drží odkazy na staré pole, proto jen přepnout reference
+        self._env_max, self._env_min = env_max, env_min
+        self._data = data
+
+    def write(self, indata):
+        start = self.length
+        end = start + indata.shape[0]
+        if end > self._data.shape[0]:
+            self._grow(end)
+        data = self._data
+        data[start:end] = indata
+        B = self.block
+        b0 = start // B          # první (možná rozpracovaný) blok
+        b_full = end // B        # bloky před tímto indexem jsou kompletní
+        if b_full > b0:
+            blocks = data[b0 * B:b_full * B].reshape(b_full - b0, B * self.channels)
+            np.max(blocks, axis=1, out=self._env_max[b0:b_full])
+            np.min(blocks, axis=1, out=self._env_min[b0:b_full])
+        if end % B:
+            tail = data[b_full * B:end]
+            self._env_max[b_full] = tail.max()
+            self._env_min[b_full] = tail.min()
+        self.length = end
+
+    @property
+    def envelope_length(self):
+        return -(-self.length // self.block)
+
+    def envelope(self):
+        """Obálka dosud nahraných dat: (max, min) jako pohledy bez kopie."""
+        n = self.envelope_length
+        return self._env_max[:n], self._env_min[:n]
+
+    def view(self):
+        """Nahraná data jako pohled do bufferu (bez kopie); mono => 1D pole."""
+        data = self._data[:self.length]
+        if self.channels == 1:
+            return data[:, 0]
+        return data
+
+    def read(self, start, end):
+        return self.view()[start:end]
+
+    def finish(self):
+        return self.view() if self.length else None
+
+
+# Hlavička WAV s daty float32 (WAVE_FORMAT_IEEE_FLOAT); data začínají na bajtu 44
+WAV_HEADER_SIZE = 44
+# Jak často (s) zapisovač přepíše velikosti v hlavičce, aby byl soubor čitelný i po pádu
+WAV_HEADER_UPDATE_SEC = 1.0
+
+def _wav_float_header(data_bytes, samplerate, channels):
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 3, channels, samplerate, samplerate * channels * 4, channels * 4, 32,
+        b"data", data_bytes,
+    )
+
+def load_take(path):
+    """Namapuje float32 WAV zapsaný DiskCaptureSink (i neukončený po pádu) do paměti.
+
+    Vrací (data, samplerate); délka se bere z velikosti souboru, ne z hlavičky.
+    """
+    with open(path, "rb") as f:
+        header = f.read(WAV_HEADER_SIZE)
+    fields = struct.unpack("<4sI4s4sIHHIIHH4sI", header)
+    if fields[0] != b"RIFF" or fields[5] != 3:
+        raise ValueError(f"{path} není float32 WAV nahrávka")
+    channels, samplerate = fields[6], fields[7]
+    frames = (os.path.getsize(path) - WAV_HEADER_SIZE) // (4 * channels)
+    if frames <= 0:
+        return None, samplerate
+    data = np.memmap(path, dtype=np.float32, mode="r", offset=WAV_HEADER_SIZE, shape=(frames, channels))
+    return (data[:, 0] if channels == 1 else data), samplerate
+
+
+def new_take_path(prefix="take"):
+    return os.path.join(TAKES_DIR, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.wav")
+
+def _take_owner(path):
+    """PID procesu, který nahrávku zapisuje (poslední část jména z new_take_path), nebo None."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    pid = stem.rsplit("_", 1)[-1]
+    return int(pid) if pid.isdigit() else None
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            # PROCESS_QUERY_LIMITED_INFORMATION; odepřený přístup = proces existuje
+            handle = kernel32.OpenProcess(0x1000, False, pid)
+            if not handle:
+                return kernel32.GetLastError() == 5
+            code = ctypes.c_ulong()
+            ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            kernel32.CloseHandle(handle)
+            return not ok or code.value == 259  # STILL_ACTIVE
+        except Exception:
+            return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def orphaned_takes():
+    """Nahrávky v TAKES_DIR, jejichž proces už neběží (od nejnovější).
+
+    Soubory běžících instancí (druhý nahrávač, relace, benchmark) ani soubory
+    s neznámým jménem se nevracejí, takže se jich úklid ani obnova nedotkne.
+    Nahrávky zahozené přes remove_take, které nešlo smazat, se nenabízejí,
+    ale smažou se.
+    """
+    _purge_discarded_takes()
+    try:
+        paths = glob.glob(os.path.join(TAKES_DIR, "*.wav"))
+        paths.sort(key=os.path.getmtime, reverse=True)
+    except Exception:
+        return []
+    orphans = []
+    for path in paths:
+        if os.path.exists(path + DISCARD_SUFFIX):
+            continue
+        pid = _take_owner(path)
+        if pid is not None and not _process_alive(pid):
+            orphans.append(path)
+    return orphans
+
+def _purge_discarded_takes():
+    # zahozené nahrávky, které se minule nepodařilo smazat, se smažou, jakmile je nic nedrží
+    for marker in glob.glob(os.path.join(TAKES_DIR, "*.wav" + DISCARD_SUFFIX)):
+        path = marker[:-len(DISCARD_SUFFIX)]
+        pid = _take_owner(path)
+        if pid is not None and _process_alive(pid):
+            continue
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+            os.remove(marker)
+        except Exception:
+            pass
+
+def remove_take(path):
+    """Smaže nahrávku; když to nejde, označí ji jako zahozenou, aby se nenabízela k obnovení."""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except Exception:
+        # na Windows nejde smazat soubor s otevřeným memory-map; smaže se při příštím úklidu
+        try:
+            open(path + DISCARD_SUFFIX, "w").close()
+        except Exception:
+            pass
+
+
+class DiskCaptureSink:
+    """Nahrávání přímo do WAV souboru na disku s konstantní spotřebou paměti.
+
+    Audio callback jen zkopíruje blok do recyklovaného bufferu a vloží ho do
+    fronty (deque, bez zámku). Zapisovací vlákno bloky připojuje do souboru,
+    počítá obálku (stejně jako CaptureBuffer) a průběžně aktualizuje hlavičku.
+    Data pro náhled a ořez se čtou přes memory-map souboru.
+    """
+
+    def __init__(self, path, samplerate, channels=1, block=ENVELOPE_BLOCK):
+        self.path = path
+        self.samplerate = int(samplerate)
+        self.channels = channels
+        self.block = block
+        self.length = 0
+        self._queue = deque()
+        self._free = deque()
+        self._closed = False
+        self._env_max = np.zeros(4096, dtype=np.float32)
+        self._env_min = np.zeros(4096, dtype=np.float32)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(_wav_float_header(0, self.samplerate, channels))
+        self._thread = threading.Thread(target=self._run, name="mhdhk-take-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, indata):
+        # volá audio callback: žádný zámek, v ustáleném stavu žádná alokace
+        n = indata.shape[0]
+        try:
+            buf = self._free.pop()
+        except IndexError:
+            buf = None
+        if buf is None or buf.shape[0] < n:
+            buf = np.empty((max(n, 2048), self.channels), dtype=np.float32)
+        buf[:n] = indata
+        self._queue.append((buf, n))
+
+    def _run(self):
+        last_header = time.monotonic()
+        while True:
+            wrote = self._drain()
+            if self._closed and not self._queue:
+                break
+            now = time.monotonic()
+            if now - last_header >= WAV_HEADER_UPDATE_SEC:
+                self._update_header()
+                last_header = now
+            if not wrote:
+                time.sleep(0.02)
+        self._update_header()
+        self._file.close()
+
+    def _drain(self):
+        queue = self._queue
+        batch = []
+        while queue:
+            buf, n = queue.popleft()
+            self._file.write(memoryview(buf[:n]).cast("B"))
+            batch.append((buf, n))
+        if not batch:
+            return False
+        # `length` čtou jiná vlákna přes read(): posouvá se až za vzorky, které jsou v souboru
+        self._file.flush()
+        for buf, n in batch:
+            self._add_envelope(buf[:n])
+            self.length += n
+            self._free.append(buf)
+        return True
+
+    def _add_envelope(self, x):
+        B = self.block
+        L = self.length
+        needed = -(-(L + x.shape[0]) // B) + 1
+        if needed > self._env_max.shape[0]:
+            cap = self._env_max.shape[0]
+            while cap < needed:
+                cap *= 2
+            env_max = np.zeros(cap, dtype=np.float32)
+            env_min = np.zeros(cap, dtype=np.float32)
+            env_max[:self._env_max.shape[0]] = self._env_max
+            env_min[:self._env_min.shape[0]] = self._env_min
+            self._env_max, self._env_min = env_max, env_min
+        pos = 0
+        if L % B:
+            # doplnit rozpracovaný blok
+            j = L // B
+            head = x[:B - L % B]
+            self._env_max[j] = max(self._env_max[j], head.max())
+            self._env_min[j] = min(self._env_min[j], head.min())
+            pos = head.shape[0]
+        rest = x[pos:]
+        j = -(-L // B)
+        n_full = rest.shape[0] // B
+        if n_full:
+            blocks = rest[:n_full * B].reshape(n_full, B * self.channels)
+            np.max(blocks, axis=1, out=self._env_max[j:j + n_full])
+            np.min(blocks, axis=1, out=self._env_min[j:j + n_full])
+        if rest.shape[0] % B:
+            tail = rest[n_full * B:]
+            self._env_max[j + n_full] = tail.max()
+            self._env_min[j + n_full] = tail.min()
+
+    def _update_header(self):
+        f = self._file
+        pos = f.tell()
+        f.seek(0)
+        f.write(_wav_float_header(self.length * self.channels * 4, self.samplerate, self.channels))
+        f.seek(pos)
+        f.flush()
+
+    @property
+    def envelope_length(self):
+        return -(-self.length // self.block)
+
+    def envelope(self):
+        n = self.envelope_length
+        return self._env_max[:n], self._env_min[:n]
+
+    def read(self, start, end):
+        """Výřez už zapsaných vzorků přes memory-map (bez načtení celé nahrávky)."""
+        end = min(end, self.length)
+        if end <= start:
+            return np.zeros(0, dtype=np.float32)
+        data = np.memmap(self.path, dtype=np.float32, mode="r",
+                         offset=WAV_HEADER_SIZE + start * self.channels * 4, shape=(end - start, self.channels))
+        return data[:, 0] if self.channels == 1 else data
+
+    def view(self):
+        return self.read(0, self.length)
+
+    def finish(self):
+        """Dopíše zbytek fronty, uzavře soubor a vrátí memory-map celé nahrávky."""
+        self._closed = True
+        self._thread.join()
+        return self.view() if self.length else None
+
+
+class LiveOverview:
+    """Přehled celé nahrávky na šířku plátna s konstantní cenou za překreslení.
+
+    Sloupec pokrývá `span` bodů obálky. Když se nahrávka přestane vejít,
+    sousední sloupce se sloučí a `span` se zdvojnásobí; při každém tiku se
+    do sloupců započítají jen nové body obálky.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.span = 1
+        self.count = 0
+        # +1 místo pro zdvojení posledního sloupce při slučování lichého počtu
+        self.col_max = np.zeros(width + 1, dtype=np.float32)
+        self.col_min = np.zeros(width + 1, dtype=np.float32)
+
+    def update(self, env_max, env_min):
+        n_env = env_max.shape[0]
+        while -(-n_env // self.span) > self.width:
+            # sloučit dvojice sloupců (lichý poslední sloupec se zdvojí)
+            count = self.count
+            if count % 2:
+                self.col_max[count] = self.col_max[count - 1]
+                self.col_min[count] = self.col_min[count - 1]
+                count += 1
+            half = count // 2
+            self.col_max[:half] = self.col_max[:count].reshape(half, 2).max(axis=1)
+            self.col_min[:half] = self.col_min[:count].reshape(half, 2).min(axis=1)
+            self.count = half
+            self.span *= 2
+        # přepočítat poslední (rozpracovaný) sloupec a doplnit nové
+        first = max(0, self.count - 1)
+        start = first * self.span
+        if start >= n_env:
+            return
+        offsets = np.arange(start, n_env, self.span)
+        last = first + offsets.shape[0]
+        self.col_max[first:last] = np.maximum.reduceat(env_max[start:n_env], offsets - start)
+        self.col_min[first:last] = np.minimum.reduceat(env_min[start:n_env], offsets - start)
+        self.count = last
+
+
+# Velikost kroku nejjemnější úrovně pyramidy špiček (vzorků)
+PYRAMID_BASE = 64
+
+class PeakPyramid:
+    """Pyramida min/max špiček nahrávky pro rychlé vykreslení waveformu.
+
+    Úroveň 0 má min/max po PYRAMID_BASE vzorcích, každá další úroveň slučuje
+    dvojice kroků předchozí. Pro libovolný výřez a šířku plátna se vybere
+    nejhrubší úroveň, jejíž krok je ještě menší než počet vzorků na pixel,
+    takže cena výpočtu sloupců nezávisí na délce nahrávky.
+    """
+
+    def __init__(self, data, base=PYRAMID_BASE):
+        mono = data if data.ndim == 1 else data[:, 0]
+        self.data = mono
+        self.samples = mono.shape[0]
+        self.base = base
+        self.levels = []
+        n_full = self.samples // base
+        mx = mono[:n_full * base].reshape(n_full, base).max(axis=1)
+        mn = mono[:n_full * base].reshape(n_full, base).min(axis=1)
+        if self.samples % base:
+            tail = mono[n_full * base:]
+            mx = np.append(mx, tail.max())
+            mn = np.append(mn, tail.min())
+        self.levels.append((mx, mn))
+        while mx.shape[0] > 1:
+            if mx.shape[0] % 2:
+                mx = np.append(mx, mx[-1])
+                mn = np.append(mn, mn[-1])
+            mx = mx.reshape(-1, 2).max(axis=1)
+            mn = mn.reshape(-1, 2).min(axis=1)
+            self.levels.append((mx, mn))
+
+    def columns(self, start, end, width):
+        """Vrátí (max, min) pro `width` sloupců pokrývajících vzorky [start, end)."""
+        start = max(0, int(start))
+        end = min(self.samples, int(end))
+        if end <= start or width <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+        width = min(width, end - start)
+        spp = (end - start) / float(width)
+        edges = start + (np.arange(width) * spp).astype(np.int64)
+        if spp < self.base:
+            # jemný zoom: přímo ze vzorků (nanejvýš width * PYRAMID_BASE vzorků)
+            seg = self.data[start:end]
+            idx = edges - start
+            return np.maximum.reduceat(seg, idx), np.minimum.reduceat(seg, idx)
+        level = min(len(self.levels) - 1, int(np.log2(spp / self.base)))
+        step = self.base << level
+        mx, mn = self.levels[level]
+        b0 = start // step
+        b1 = -(-end // step)
+        idx = np.maximum.accumulate(edges // step - b0)
+        return np.maximum.reduceat(mx[b0:b1], idx), np.minimum.reduceat(mn[b0:b1], idx)
+
+
+# Měřič vstupní úrovně: počet bloků v kruhovém bufferu, obnovování UI (ms),
+# spodní mez stupnice, úroveň přebuzení a jak dlouho zůstane indikace svítit
+LEVEL_RING = 64
+METER_INTERVAL_MS = 33
+METER_FLOOR_DB = -60.0
+METER_PEAK_FALL_DB = 0.8  # pokles ukazatele špičky za jeden tik
+CLIP_LEVEL = 0.99
+CLIP_HOLD_SEC = 1.5
+
+
+class LevelRing:
+    """Špička a střední kvadrát posledních bloků z callbacku nahrávání.
+
+    Jediný zapisovatel (audio callback) nejdřív vyplní slot a teprve potom
+    zvýší `count`; čtenář v UI bere jen sloty pod `count`, zámek proto není
+    potřeba. Zápis nealokuje pole – jen redukce nad pohledem na blok.
+    """
+
+    def __init__(self, size=LEVEL_RING):
+        self.size = size
+        self.peak = np.zeros(size, dtype=np.float32)
+        self.mean_sq = np.zeros(size, dtype=np.float32)
+        self.count = 0
+
+    def push(self, block):
+        flat = block.reshape(-1)
+        if not flat.shape[0]:
+            return
+        i = self.count % self.size
+        self.peak[i] = max(flat.max(), -flat.min())
+        self.mean_sq[i] = np.dot(flat, flat) / flat.shape[0]
+        self.count += 1
+
+    def read_since(self, last):
+        """(špička, RMS, nový count) bloků zapsaných od `last`; None, pokud nic nového."""
+        count = self.count
+        first = max(last, count - self.size)
+        if first >= count:
+            return None
+        peak = 0.0
+        total = 0.0
+        for n in range(first, count):
+            i = n % self.size
+            peak = max(peak, float(self.peak[i]))
+            total += float(self.mean_sq[i])
+        return peak, math.sqrt(total / (count - first)), count
+
+
+class LevelMeter:
+    """Vodorovný měřič úrovně vstupu: pruh RMS, ukazatel špičky a indikace přebuzení."""
+
+    def __init__(self, parent, width=200, height=12):
+        self.width = width
+        self.height = height
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg="#222", highlightthickness=0)
+        self._bar = self.canvas.create_rectangle(0, 0, 0, height, fill="#2fb344", outline="")
+        self._peak = self.canvas.create_line(-2, 0, -2, height, fill="#f5f5f5")
+        self._clip = self.canvas.create_rectangle(width - 8, 0, width, height, fill="#444", outline="")
+        self._last = 0
+        self._peak_db = METER_FLOOR_DB
+        self._clip_until = 0.0
+        self._timer = None
+
+    def grid(self, **kw):
+        self.canvas.grid(**kw)
+
+    def _x(self, db):
+        frac = (db - METER_FLOOR_DB) / -METER_FLOOR_DB
+        return max(0.0, min(1.0, frac)) * (self.width - 10)
+
+    def show(self, ring):
+        levels = ring.read_since(self._last)
+        if levels is None:
+            return
+        peak, rms, self._last = levels
+        rms_db = 20.0 * math.log10(rms) if rms > 0 else METER_FLOOR_DB
+        peak_db = 20.0 * math.log10(peak) if peak > 0 else METER_FLOOR_DB
+        self._peak_db = max(peak_db, self._peak_db - METER_PEAK_FALL_DB)
+        color = "#2fb344" if rms_db < -12.0 else ("#f59f00" if rms_db < -3.0 else "#d63939")
+        self.canvas.coords(self._bar, 0, 0, self._x(rms_db), self.height)
+        self.canvas.itemconfigure(self._bar, fill=color)
+        x = self._x(self._peak_db)
+        self.canvas.coords(self._peak, x, 0, x, self.height)
+        now = time.monotonic()
+        if peak >= CLIP_LEVEL:
+            self._clip_until = now + CLIP_HOLD_SEC
+        self.canvas.itemconfigure(self._clip, fill="#d63939" if now < self._clip_until else "#444")
+
+    def reset(self):
+        self._last = 0
+        self._peak_db = METER_FLOOR_DB
+        self._clip_until = 0.0
+        self.canvas.coords(self._bar, 0, 0, 0, self.height)
+        self.canvas.coords(self._peak, -2, 0, -2, self.height)
+        self.canvas.itemconfigure(self._clip, fill="#444")
+
+    def run(self, recorder):
+        """Překresluje měřič každých METER_INTERVAL_MS, dokud nahrávání běží."""
+        if self._timer is not None:
+            self.canvas.after_cancel(self._timer)
+        self.reset()
+        def _tick():
+            self._timer = None
+            if not recorder._recording or recorder.levels is None:
+                self.reset()
+                return
+            self.show(recorder.levels)
+            self._timer = self.canvas.after(METER_INTERVAL_MS, _tick)
+        self._timer = self.canvas.after(METER_INTERVAL_MS, _tick)
+
+
 class Recorder:
     def __init__(self, samplerate=44100, channels=1):
         self.samplerate = samplerate
         self.channels = channels
         self._recording = False
-        self._frames = []
+        self.buffer = None
+        self.levels = None
         self._stream = None
 
     def _detect_samplerate(self):
@@ -96,14 +670,19 @@ class Recorder:
             pass
         return self.samplerate
 
-    def start(self):
+    def start(self, path=None):
+        """Spustí nahrávání; s `path` se nahrávka zapisuje průběžně do WAV souboru na disk."""
         if sd is None or np is None:
             raise RuntimeError("Chybí knihovna sounddevice nebo numpy. Nainstalujte je: pip install sounddevice numpy")
-        self._frames = []
-        self._recording = True
         # Nastav samplerate podle zařízení, aby se předešlo zpomalenému/robotickému zvuku
         effective_sr = self._detect_samplerate()
         self.samplerate = effective_sr
+        if path:
+            self.buffer = DiskCaptureSink(path, self.samplerate, self.channels)
+        else:
+            self.buffer = CaptureBuffer(self.channels, capacity=self.samplerate * CAPTURE_INITIAL_SEC)
+        self.levels = LevelRing()
+        self._recording = True
         self._stream = sd.InputStream(samplerate=self.samplerate, channels=self.channels, dtype='float32', callback=self._callback)
         self._stream.start()
 
@@ -112,7 +691,9 @@ class Recorder:
             # Můžeme zalogovat, ale nepanikařit
             pass
         if self._recording:
-            self._frames.append(indata.copy())
+            # zápis do předalokovaného bufferu (bez alokace nového bloku)
+            self.buffer.write(indata)
+            self.levels.push(indata)
 
     def stop(self):
         if not self._recording:
@@ -122,18 +703,603 @@ class Recorder:
             self._stream.stop()
             self._stream.close()
             self._stream = None
-        if not self._frames:
+        if self.buffer is None:
             return None
-        data = np.concatenate(self._frames, axis=0)
-        # Pokud by zařízení poskytovalo více kanálů, sjednoť na požadovaný počet
-        if data.ndim == 2 and self.channels == 1:
-            # převod na mono průměrováním, aby nedošlo k fázovým artefaktům
-            data = data.mean(axis=1)
-        return data  # numpy array float32 [-1,1]
+        # pohled do bufferu / memory-map souboru bez závěrečného slučování bloků
+        return self.buffer.finish()  # numpy array float32 [-1,1]
+
+
+class PreviewPlayer:
+    """Přehrávání nahrávky přes callback sd.OutputStream bez kopie dat.
+
+    Callback čte výřezy přímo z float32 pole (i memory-map nahrávky z disku)
+    a násobí je aktuálním `gain`, takže změna hlasitosti je slyšet hned v
+    dalším bloku. Pozice se počítá z počtu snímků předaných zvukovému
+    zařízení, zmenšeného o výstupní latenci streamu.
+    """
+
+    def __init__(self, data, samplerate, gain=1.0):
+        self.data = data if data.ndim > 1 else data.reshape(-1, 1)
+        self.samplerate = samplerate
+        self.gain = gain
+        self.frames = 0
+        self.finished = False
+        self._stream = None
+
+    def start(self):
+        self._stream = sd.OutputStream(samplerate=self.samplerate, channels=self.data.shape[1], dtype='float32',
+                                       callback=self._callback, finished_callback=self._on_finished)
+        self._stream.start()
+
+    def _callback(self, outdata, frames, time, status):
+        pos = self.frames
+        chunk = self.data[pos:pos + frames]
+        n = chunk.shape[0]
+        out = outdata[:n]
+        np.multiply(chunk, self.gain, out=out)
+        np.clip(out, -1.0, 1.0, out=out)
+        self.frames = pos + n
+        if n < frames:
+            outdata[n:] = 0
+            raise sd.CallbackStop
+
+    def _on_finished(self):
+        self.finished = True
+
+    @property
+    def total_frames(self):
+        return self.data.shape[0]
+
+    @property
+    def position(self):
+        """Přehrávaný vzorek (odhad podle latence výstupu)."""
+        stream = self._stream
+        if self.finished or stream is None:
+            return self.frames
+        try:
+            lag = int(stream.latency * self.samplerate)
+        except Exception:
+            lag = 0
+        return max(0, self.frames - lag)
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self.finished = True
+
+class EditList:
+    """Nedestruktivní úpravy nahrávky nad jedinou kopií dat (piece table).
+
+    Stav je seznam úseků `(začátek, konec, zisk)` ve zdrojové nahrávce;
+    ořez, vystřižení i zisk jen vytvoří nový seznam, starý jde na zásobník
+    zpět. Zvuk se skládá až v `render()`: jeden úsek bez zisku je pohled do
+    zdroje (bez kopie), jinak vznikne jedno nové pole, které se drží jen
+    pro aktuální stav. Pozice v operacích jsou vzorky výsledné nahrávky.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.pieces = [(0, source.shape[0], 1.0)]
+        self._undo = []
+        self._redo = []
+        self._rendered = None
+        self._rendered_for = None
+
+    @property
+    def length(self):
+        return sum(end - start for start, end, _ in self.pieces)
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def _slice(self, start, end):
+        # úseky pokrývající rozsah [start, end) výsledku
+        out = []
+        pos = 0
+        for p_start, p_end, gain in self.pieces:
+            p_len = p_end - p_start
+            lo = max(start, pos)
+            hi = min(end, pos + p_len)
+            if lo < hi:
+                out.append((p_start + lo - pos, p_start + hi - pos, gain))
+            pos += p_len
+        return out
+
+    def _push(self, pieces):
+        self._undo.append(self.pieces)
+        self._redo.clear()
+        self.pieces = pieces
+
+    def trim(self, start, end):
+        """Ponechá jen vzorky [start, end)."""
+        self._push(self._slice(start, end))
+
+    def cut(self, start, end):
+        """Vystřihne vzorky [start, end) a napojí zbytek."""
+        self._push(self._slice(0, start) + self._slice(end, self.length))
+
+    def gain(self, factor, start=0, end=None):
+        """Vynásobí vzorky [start, end) lineárním ziskem."""
+        end = self.length if end is None else end
+        middle = [(s, e, g * factor) for s, e, g in self._slice(start, end)]
+        self._push(self._slice(0, start) + middle + self._slice(end, self.length))
+
+    def undo(self):
+        if not self._undo:
+            return False
+        self._redo.append(self.pieces)
+        self.pieces = self._undo.pop()
+        return True
+
+    def redo(self):
+        if not self._redo:
+            return False
+        self._undo.append(self.pieces)
+        self.pieces = self._redo.pop()
+        return True
+
+    def render(self):
+        """Výsledná nahrávka; pro nezměněný stav vrací stále stejný objekt."""
+        pieces = self.pieces
+        if self._rendered_for is pieces:
+            return self._rendered
+        if len(pieces) == 1 and pieces[0][2] == 1.0:
+            start, end, _ = pieces[0]
+            data = self.source[start:end]
+        else:
+            data = np.empty((self.length,) + self.source.shape[1:], dtype=np.float32)
+            pos = 0
+            for start, end, gain in pieces:
+                n = end - start
+                np.multiply(self.source[start:end], gain, out=data[pos:pos + n])
+                pos += n
+        self._rendered = data
+        self._rendered_for = pieces
+        return data
+
+
+# Ořez ticha: délka okna pro RMS, minimální souvislá řeč (kratší lupnutí se
+# ignoruje), doznění ponechané za koncem řeči a okraj před jejím začátkem (ms)
+TRIM_WINDOW_MS = 10
+TRIM_MIN_VOICE_MS = 40
+TRIM_HANGOVER_MS = 150
+TRIM_PAD_MS = 50
+# Nahrávky delší než tato mez (s) se zpracují v pracovním vlákně
+TRIM_WORKER_SEC = 30
+
+def frame_levels(data, samplerate, window_ms=TRIM_WINDOW_MS):
+    """Vrátí (rms, peak) po oknech `window_ms`; poslední neúplné okno se počítá také."""
+    mono = data if data.ndim == 1 else data[:, 0]
+    win = max(1, int(samplerate * window_ms / 1000.0))
+    n = mono.shape[0]
+    n_full = n // win
+    frames = mono[:n_full * win].reshape(n_full, win)
+    # einsum nevytváří dočasnou kopii x*x přes celou nahrávku
+    rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / win)
+    peak = np.maximum(frames.max(axis=1), -frames.min(axis=1)) if n_full else np.zeros(0, dtype=np.float32)
+    if n % win:
+        tail = mono[n_full * win:]
+        rms = np.append(rms, np.sqrt(np.dot(tail, tail) / tail.shape[0]))
+        peak = np.append(peak, np.abs(tail).max())
+    return rms, peak, win
+
+def voice_runs(active, min_frames):
+    """Souvislé úseky aktivních oken jako pole [[začátek, konec), ...]; kratší než min_frames se zahodí."""
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) >= max(1, min_frames)
+    return np.column_stack((starts[keep], ends[keep]))
+
+def detect_voice_bounds(data, samplerate, threshold_pct, window_ms=TRIM_WINDOW_MS, min_voice_ms=TRIM_MIN_VOICE_MS,
+                        hangover_ms=TRIM_HANGOVER_MS, pad_ms=TRIM_PAD_MS):
+    """Najde začátek a konec řeči podle RMS po oknech.
+
+    Okno je aktivní, pokud jeho RMS přesáhne `threshold_pct` z maximální
+    amplitudy nahrávky. Vrací (start, end) ve vzorcích (end exkluzivní),
+    nebo None, pokud v nahrávce žádná řeč není.
+    """
+    rms, peak, win = frame_levels(data, samplerate, window_ms)
+    if rms.shape[0] == 0:
+        return None
+    max_amp = float(peak.max())
+    if not np.isfinite(max_amp):
+        max_amp = float(np.nanmax(np.where(np.isfinite(peak), peak, 0.0)))
+    threshold = threshold_pct * max(1e-6, max_amp)
+    runs = voice_runs(rms > threshold, int(round(min_voice_ms / float(window_ms))))
+    if runs.shape[0] == 0:
+        return None
+    n = data.shape[0]
+    start = max(0, int(runs[0, 0]) * win - int(samplerate * pad_ms / 1000.0))
+    end = min(n, int(runs[-1, 1]) * win + int(samplerate * hangover_ms / 1000.0))
+    return start, end
+
+# Relace (jedna dlouhá nahrávka všech zastávek): práh řeči (dBFS) a ticho,
+# které odděluje dvě hlášení (ms)
+SESSION_THRESHOLD_DB = -40.0
+SESSION_GAP_MS = 700
+
+class SegmentDetector:
+    """Průběžné (streamové) hledání jednotlivých promluv v dlouhé nahrávce.
+
+    `feed()` přijímá libovolně dlouhé bloky vzorků, RMS po oknech počítá
+    vektorově a mezi voláními si drží jen neúplné okno a rozpracovaný segment,
+    takže paměť nezávisí na délce relace. Segment končí, jakmile po řeči
+    následuje alespoň `gap_ms` ticha; segmenty s méně než `min_voice_ms` řeči
+    (lupnutí, nádech) se zahodí. Hotové segmenty jsou v `segments` jako
+    (start, end) ve vzorcích.
+    """
+
+    def __init__(self, samplerate, threshold_db=SESSION_THRESHOLD_DB, window_ms=TRIM_WINDOW_MS,
+                 min_voice_ms=TRIM_MIN_VOICE_MS, gap_ms=SESSION_GAP_MS):
+        self.win = max(1, int(samplerate * window_ms / 1000.0))
+        self.threshold = 10.0 ** (threshold_db / 20.0)
+        self.min_frames = max(1, int(round(min_voice_ms / float(window_ms))))
+        self.gap_frames = max(1, int(round(gap_ms / float(window_ms))))
+        self.segments = []
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._frame = 0           # index prvního okna dalšího bloku
+        self._seg_start = None    # první aktivní okno rozpracovaného segmentu
+        self._seg_end = None      # konec posledního aktivního úseku (okno, exkluzivně)
+        self._voiced = 0
+
+    def feed(self, block):
+        mono = block if block.ndim == 1 else block[:, 0]
+        if self._carry.shape[0]:
+            mono = np.concatenate((self._carry, mono))
+        win = self.win
+        n_full = mono.shape[0] // win
+        self._carry = mono[n_full * win:].copy()
+        if n_full:
+            frames = mono[:n_full * win].reshape(n_full, win)
+            rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / win)
+            for run_start, run_end in voice_runs(rms > self.threshold, 1):
+                self._add_run(self._frame + int(run_start), self._frame + int(run_end))
+            self._frame += n_full
+        if self._seg_start is not None and self._frame - self._seg_end >= self.gap_frames:
+            self._close()
+
+    def _add_run(self, start, end):
+        if self._seg_start is not None and start - self._seg_end < self.gap_frames:
+            self._seg_end = end
+            self._voiced += end - start
+            return
+        self._close()
+        self._seg_start, self._seg_end, self._voiced = start, end, end - start
+
+    def _close(self):
+        if self._seg_start is not None and self._voiced >= self.min_frames:
+            self.segments.append((self._seg_start * self.win, self._seg_end * self.win))
+        self._seg_start = self._seg_end = None
+        self._voiced = 0
+
+    def finish(self):
+        """Uzavře rozpracovaný segment na konci nahrávky a vrátí všechny segmenty."""
+        self._close()
+        return self.segments
+
+
+def numpy_to_segment(data, samplerate, channels=1):
+    # očekává float32 [-1,1]
+    if AudioSegment is None:
+        raise RuntimeError("Chybí pydub. Nainstalujte: pip install pydub (a mít ffmpeg v PATH)")
+    # Převod na 16-bit PCM
+    audio = (np.clip(data, -1.0, 1.0) * 32767).astype(np.int16)
+    return AudioSegment(
+        audio.tobytes(),
+        frame_rate=samplerate,
+        sample_width=2,
+        channels=channels,
+    )
+
+
+def export_clip(data, samplerate, out_path, gain_db=0.0, channels=1):
+    """Uloží výřez nahrávky do MP3 (volá ffmpeg, vhodné pro pracovní vlákno)."""
+    seg = numpy_to_segment(data, samplerate, channels)
+    if gain_db:
+        seg = seg + gain_db
+    seg.export(out_path, format="mp3")
+    return out_path
+
+
+def reencode_file(src, gain_db=0.0):
+    """Překóduje existující klip do MP3 (stejný název, přípona .mp3) s volitelným ziskem."""
+    if AudioSegment is None:
+        raise RuntimeError("Chybí pydub. Nainstalujte: pip install pydub (a mít ffmpeg v PATH)")
+    seg = AudioSegment.from_file(src)
+    if gain_db:
+        seg = seg + gain_db
+    out_path = os.path.splitext(src)[0] + ".mp3"
+    # přes dočasný soubor, protože zdrojem může být právě cílové MP3
+    tmp_path = out_path + ".tmp"
+    seg.export(tmp_path, format="mp3")
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class ExportQueue:
+    """Fronta exportů zpracovávaná na pozadí.
+
+    Kódování do MP3 obstarává ffmpeg v samostatném procesu, takže vlákna
+    ThreadPoolExecutoru škálují s počtem jader. UI se na průběh ptá přes
+    `progress()` z periodického `after()`; hotovou dávku vyzvedne `take_results()`.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 2
+        self._pool = None
+        self._jobs = []
+        # úklid, který musí počkat na doběhnutí dávky (např. smazání nahrávky, ze které se exportuje)
+        self._deferred = []
+
+    def submit(self, label, fn, *args):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mhdhk-export")
+        future = self._pool.submit(fn, *args)
+        self._jobs.append((label, future))
+        return future
+
+    def progress(self):
+        """(hotovo, celkem) v aktuální dávce."""
+        return sum(1 for _, f in self._jobs if f.done()), len(self._jobs)
+
+    @property
+    def busy(self):
+        return any(not f.done() for _, f in self._jobs)
+
+    def take_results(self):
+        """Po dokončení dávky vrátí [(popis, výjimka nebo None)] a dávku uzavře; jinak None."""
+        if not self._jobs or self.busy:
+            return None
+        results = [(label, f.exception()) for label, f in self._jobs]
+        self._jobs = []
+        self._run_deferred()
+        return results
+
+    def when_idle(self, fn):
+        """Zavolá `fn()` po dokončení aktuální dávky (z take_results), nebo hned, pokud nic neběží."""
+        if self.busy:
+            self._deferred.append(fn)
+        else:
+            fn()
+
+    def _run_deferred(self):
+        deferred, self._deferred = self._deferred, []
+        for fn in deferred:
+            try:
+                fn()
+            except Exception as e:
+                _log(f"Export cleanup failed: {e}")
+
+    def shutdown(self, cancel_pending=False):
+        """Počká na exporty ve frontě; s `cancel_pending` dokončí jen rozběhnuté a čekající zruší."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=cancel_pending)
+            self._pool = None
+        self._run_deferred()
+
+
+class SessionWindow(tk.Toplevel):
+    """Nahrání všech zastávek v jedné relaci a automatické rozdělení na klipy.
+
+    Mluvčí čte zastávky v pořadí podle seznamu; promluvy se hledají průběžně
+    (SegmentDetector) a přiřazují se klíčům v tomtéž pořadí. Po kontrole se
+    všechny klipy exportují paralelně do audio/stops.
+    """
+
+    def __init__(self, master, keys, exports):
+        super().__init__(master)
+        self.title(f"{APP_TITLE} – relace")
+        self.resizable(False, False)
+        self.keys = list(keys)
+        self.recorder = Recorder()
+        self.detector = None
+        self.take = None
+        self.segments = []
+        self._fed = 0
+        self._timer = None
+        self.exports = exports
+        self._take_path = None
+        self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def _build_ui(self):
+        main = ttk.Frame(self, padding=(15, 10, 15, 10))
+        main.grid(row=0, column=0, sticky="nsew")
+        ttk.Label(main, text="Čtěte zastávky v uvedeném pořadí, mezi hlášeními udělejte krátkou pauzu.").grid(
+            row=0, column=0, columnspan=4, sticky="w")
+        self.tree = ttk.Treeview(main, columns=("key", "start", "length"), show="headings", height=16)
+        self.tree.heading("key", text="Zastávka")
+        self.tree.heading("start", text="Začátek")
+        self.tree.heading("length", text="Délka")
+        self.tree.column("key", width=220)
+        self.tree.column("start", width=90, anchor="e")
+        self.tree.column("length", width=90, anchor="e")
+        self.tree.grid(row=1, column=0, columnspan=4, pady=(8, 0), sticky="nsew")
+        self.btn_rec = ttk.Button(main, text="● Nahrávat relaci", command=self.on_record)
+        self.btn_rec.grid(row=2, column=0, pady=(10, 0), sticky="w")
+        self.btn_stop = ttk.Button(main, text="■ Stop", command=self.on_stop)
+        self.btn_stop.grid(row=2, column=1, pady=(10, 0), sticky="w")
+        self.level_meter = LevelMeter(main)
+        self.level_meter.grid(row=2, column=2, columnspan=2, pady=(10, 0), sticky="e")
+        self.btn_play = ttk.Button(main, text="▶ Přehrát", command=self.on_play_selected)
+        self.btn_play.grid(row=3, column=0, pady=(5, 0), sticky="w")
+        self.btn_merge = ttk.Button(main, text="Sloučit s dalším", command=self.on_merge_selected)
+        self.btn_merge.grid(row=3, column=1, pady=(5, 0), sticky="w")
+        self.btn_drop = ttk.Button(main, text="Smazat segment", command=self.on_drop_selected)
+        self.btn_drop.grid(row=3, column=2, pady=(5, 0), sticky="w")
+        self.btn_export = ttk.Button(main, text="Exportovat vše", command=self.on_export_all)
+        self.btn_export.grid(row=3, column=3, pady=(5, 0), sticky="e")
+        self.info_label = ttk.Label(main, text=f"Připraveno ({len(self.keys)} zastávek)", foreground="#666")
+        self.info_label.grid(row=4, column=0, columnspan=4, pady=(10, 0), sticky="w")
+        self._refresh_tree()
+
+    def _refresh_tree(self):
+        sr = self.recorder.samplerate
+        self.tree.delete(*self.tree.get_children())
+        for i, key in enumerate(self.keys):
+            if i < len(self.segments):
+                start, end = self.segments[i]
+                self.tree.insert("", "end", iid=str(i), values=(key, f"{start / sr:.2f} s", f"{(end - start) / sr:.2f} s"))
+            else:
+                self.tree.insert("", "end", iid=str(i), values=(key, "–", "–"))
+        for i in range(len(self.keys), len(self.segments)):
+            start, end = self.segments[i]
+            self.tree.insert("", "end", iid=str(i), values=("(navíc)", f"{start / sr:.2f} s", f"{(end - start) / sr:.2f} s"))
+        if len(self.segments) < len(self.keys):
+            # zvýrazni zastávku, kterou má mluvčí číst
+            self.tree.selection_set(str(len(self.segments)))
+            self.tree.see(str(len(self.segments)))
+
+    def _selected_index(self):
+        sel = self.tree.selection()
+        return int(sel[0]) if sel else None
+
+    @safe_action
+    def on_record(self):
+        if sd is None or np is None:
+            messagebox.showerror("Chybí závislosti", "Knihovna sounddevice není dostupná. Nainstalujte: pip install sounddevice", parent=self)
+            return
+        if self.recorder._recording:
+            return
+        self.take = None
+        # předchozí relaci můžou ještě číst běžící exporty; smaže se, až fronta doběhne
+        self._discard_take()
+        # dlouhou relaci nahráváme přímo na disk, v paměti zůstává jen obálka a stav detektoru
+        self._take_path = new_take_path("session")
+        self.recorder.start(self._take_path)
+        self.detector = SegmentDetector(self.recorder.samplerate)
+        self.segments = []
+        self._fed = 0
+        self.info_label.config(text="Nahrávám relaci…")
+        self._refresh_tree()
+        self._timer = self.after(100, self._tick)
+        self.level_meter.run(self.recorder)
+
+    def _feed_detector(self):
+        # detektoru se předávají jen nově nahrané vzorky
+        buf = self.recorder.buffer
+        if buf is None or self.detector is None:
+            return
+        length = buf.length
+        if length > self._fed:
+            self.detector.feed(buf.read(self._fed, length))
+            self._fed = length
+
+    def _tick(self):
+        self._timer = None
+        if not self.recorder._recording:
+            return
+        found = len(self.detector.segments)
+        self._feed_detector()
+        if len(self.detector.segments) != found:
+            self.segments = list(self.detector.segments)
+            self._refresh_tree()
+        self._timer = self.after(100, self._tick)
+
+    @safe_action
+    def on_stop(self):
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+            self._timer = None
+        if not self.recorder._recording:
+            return
+        self._feed_detector()
+        self.take = self.recorder.stop()
+        self.segments = list(self.detector.finish()) if self.detector is not None else []
+        self._refresh_tree()
+        if len(self.segments) != len(self.keys):
+            self.info_label.config(text=f"Nalezeno {len(self.segments)} promluv pro {len(self.keys)} zastávek – zkontrolujte přiřazení.")
+        else:
+            self.info_label.config(text=f"Nalezeno {len(self.segments)} promluv. Zkontrolujte a exportujte.")
+
+    def _clip(self, i):
+        # výřez segmentu s okrajem před začátkem a dozněním za koncem
+        sr = self.recorder.samplerate
+        start, end = self.segments[i]
+        start = max(0, start - int(sr * TRIM_PAD_MS / 1000.0))
+        end = min(self.take.shape[0], end + int(sr * TRIM_HANGOVER_MS / 1000.0))
+        return self.take[start:end]
+
+    @safe_action
+    def on_play_selected(self):
+        i = self._selected_index()
+        if self.take is None or i is None or i >= len(self.segments) or sd is None:
+            return
+        sd.stop()
+        sd.play(self._clip(i), self.recorder.samplerate)
+
+    @safe_action
+    def on_merge_selected(self):
+        i = self._selected_index()
+        if self.take is None or i is None or i + 1 >= len(self.segments):
+            return
+        self.segments[i] = (self.segments[i][0], self.segments[i + 1][1])
+        del self.segments[i + 1]
+        self._refresh_tree()
+        self.tree.selection_set(str(i))
+
+    @safe_action
+    def on_drop_selected(self):
+        i = self._selected_index()
+        if self.take is None or i is None or i >= len(self.segments):
+            return
+        del self.segments[i]
+        self._refresh_tree()
+
+    @safe_action
+    def on_export_all(self):
+        if self.take is None or not self.segments:
+            messagebox.showinfo("Export", "Nejprve nahrajte relaci.", parent=self)
+            return
+        count = min(len(self.keys), len(self.segments))
+        os.makedirs(STOPS_AUDIO_DIR, exist_ok=True)
+        jobs = [(self._clip(i), os.path.join(STOPS_AUDIO_DIR, f"{self.keys[i]}.mp3")) for i in range(count)]
+        existing = sum(1 for _, path in jobs if os.path.exists(path))
+        if existing and not messagebox.askyesno("Soubory existují", f"{existing} z {count} souborů už existuje. Přepsat?", parent=self):
+            return
+        sr = self.recorder.samplerate
+        for clip, path in jobs:
+            self.exports.submit(os.path.basename(path), export_clip, clip, sr, path)
+        # průběh a chyby hlásí hlavní okno, které frontu sleduje
+        self.master.watch_exports()
+        self.info_label.config(text=f"Export {count} klipů do {STOPS_AUDIO_DIR} běží na pozadí…")
+
+    def on_close(self):
+        if self._timer is not None:
+            try:
+                self.after_cancel(self._timer)
+            except Exception:
+                pass
+        try:
+            self.recorder.stop()
+        except Exception:
+            pass
+        self.take = None
+        self._discard_take()
+        self.destroy()
+
+    def _discard_take(self):
+        # exporty z relace dostaly úseky memory-mapy souboru; smaže se, až fronta doběhne
+        path, self._take_path = self._take_path, None
+        if path:
+            self.exports.when_idle(lambda: remove_take(path))
+
 
 class RecordWindow(tk.Tk):
     def __init__(self):
         super().__init__()
+        _start_event_log()
         # na Windows nastavíme AppUserModelID, aby se taskbar správně pároval s ikonou
         if sys.platform == 'win32':
             try:
@@ -158,6 +1324,9 @@ class RecordWindow(tk.Tk):
         self.category_var = tk.StringVar(value="sys")
         self.filename_var = tk.StringVar(value="")
         self.volume_var = tk.IntVar(value=100)  # 0-200 %
+        # nahrávat rovnou do souboru na disk (pro dlouhé nahrávky, přežije pád aplikace)
+        self.to_disk_var = tk.BooleanVar(value=False)
+        self._take_path = None
 
         # automatická aktualizace comboboxu při změně kategorie
         try:
@@ -170,23 +1339,33 @@ class RecordWindow(tk.Tk):
             pass
 
         self.recorder = Recorder()
-        self.preview_data = None  # numpy float32
+        self.exports = ExportQueue()
+        self._export_timer = None
+        self._closing = False
+        self.edits = None  # EditList nad aktuální nahrávkou
+        self.preview_data = None  # numpy float32 (render aktuálního stavu úprav)
+        self._selection = None  # (začátek, konec) výběru ve vzorcích
+        self._sel_anchor = None
         self.preview_segment = None  # pydub.AudioSegment
         self.is_playing = False
-        self.play_thread = None
         self.silence_threshold_var = tk.IntVar(value=3)  # % z max amplitudy
         self.play_pos_ms = 0
         self.play_duration_ms = 0
-        self._play_start_monotonic = None
         self._recording_timer = None
         self._play_stream = None
-        self._play_index = 0
-        self._playback_obj = None
         self._last_stop_time = 0.0
         self._shutting_down_playback = False
-        self._shutting_down_playback = False
+        # Waveform: pyramida špiček aktuálních dat, výřez (zoom/posun) a cache sloupců
+        self._pyramid = None
+        self._pyramid_src = None
+        self._view_start = 0
+        self._view_len = 0  # 0 = celá nahrávka
+        self._wave_cols = None
+        self._drag_x = None
 
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(200, self._offer_take_recovery)
 
     def _build_ui(self):
         main = ttk.Frame(self, padding=(20, 15, 20, 15))
@@ -236,18 +1415,32 @@ class RecordWindow(tk.Tk):
         self.btn_preview.grid(row=0, column=2, padx=(0, 5))
         self.btn_clear = ttk.Button(btn_frame, text="✖ Smazat náhled", command=self.on_clear_preview)
         self.btn_clear.grid(row=0, column=3, padx=(0, 5))
+        ttk.Checkbutton(btn_frame, text="Nahrávat na disk", variable=self.to_disk_var).grid(row=0, column=4, padx=(5, 0))
 
         # Waveform + ořez ticha
         wf_frame = ttk.LabelFrame(main, text="Waveform")
         wf_frame.grid(row=4, column=0, columnspan=3, pady=(15, 0), sticky="ew")
         self.waveform_canvas = tk.Canvas(wf_frame, width=600, height=120, bg="#f7f7f7", highlightthickness=1, highlightbackground="#ccc")
         self.waveform_canvas.grid(row=0, column=0, columnspan=3, padx=5, pady=5)
+        # Zoom kolečkem myši (kolem kurzoru), posun tažením, dvojklik = celá nahrávka
+        self.waveform_canvas.bind("<MouseWheel>", lambda e: self._on_wave_zoom(e.x, 1 if e.delta > 0 else -1))
+        self.waveform_canvas.bind("<Button-4>", lambda e: self._on_wave_zoom(e.x, 1))
+        self.waveform_canvas.bind("<Button-5>", lambda e: self._on_wave_zoom(e.x, -1))
+        self.waveform_canvas.bind("<ButtonPress-1>", self._on_wave_drag_start)
+        self.waveform_canvas.bind("<B1-Motion>", self._on_wave_drag)
+        self.waveform_canvas.bind("<Double-Button-1>", lambda e: self._reset_wave_view())
+        # Shift + tažení = výběr úseku pro vystřižení
+        self.waveform_canvas.bind("<Shift-ButtonPress-1>", self._on_select_start)
+        self.waveform_canvas.bind("<Shift-B1-Motion>", self._on_select_drag)
         # Časová informace a playhead
         info_frame = ttk.Frame(wf_frame)
         info_frame.grid(row=1, column=0, columnspan=3, sticky="ew", padx=5)
         self.time_label = ttk.Label(info_frame, text="00:00 / 00:00")
         self.time_label.grid(row=0, column=0, sticky="w")
-        # Playhead je vykreslován v _draw_waveform/_update_playhead
+        info_frame.columnconfigure(1, weight=1)
+        self.level_meter = LevelMeter(info_frame)
+        self.level_meter.grid(row=0, column=1, sticky="e")
+        # Playhead je samostatná položka plátna posouvaná v _move_playhead
         ttk.Label(wf_frame, text="Prahová hodnota ticha (%):").grid(row=2, column=0, sticky="w", padx=5)
         thr_scale = ttk.Scale(wf_frame, from_=0, to=20, orient="horizontal")
         thr_scale.set(self.silence_threshold_var.get())
@@ -255,14 +1448,34 @@ class RecordWindow(tk.Tk):
         self.thr_label = ttk.Label(wf_frame, text=f"{self.silence_threshold_var.get()} %")
         self.thr_label.grid(row=2, column=2, sticky="w")
         thr_scale.configure(command=lambda v: self._on_threshold_change(v))
+        edit_frame = ttk.Frame(wf_frame)
+        edit_frame.grid(row=3, column=0, columnspan=2, sticky="w", padx=5, pady=(5, 5))
+        self.btn_undo = ttk.Button(edit_frame, text="↶ Zpět", command=self.on_undo)
+        self.btn_undo.grid(row=0, column=0, padx=(0, 5))
+        self.btn_redo = ttk.Button(edit_frame, text="↷ Znovu", command=self.on_redo)
+        self.btn_redo.grid(row=0, column=1, padx=(0, 5))
+        self.btn_cut = ttk.Button(edit_frame, text="Vystřihnout výběr", command=self.on_cut_selection)
+        self.btn_cut.grid(row=0, column=2, padx=(0, 5))
+        self.btn_normalize = ttk.Button(edit_frame, text="Normalizovat", command=self.on_normalize)
+        self.btn_normalize.grid(row=0, column=3)
+        self._update_edit_buttons()
+        self.bind("<Control-z>", lambda e: self.on_undo())
+        self.bind("<Control-y>", lambda e: self.on_redo())
+        self.bind("<Delete>", lambda e: self.on_cut_selection())
         self.btn_trim_silence = ttk.Button(wf_frame, text="✂ Osekat ticho", command=self.on_trim_silence)
         self.btn_trim_silence.grid(row=3, column=2, sticky="e", padx=5, pady=(5, 5))
 
         # Export
         export_frame = ttk.Frame(main)
         export_frame.grid(row=5, column=0, columnspan=3, pady=(15, 0), sticky="e")
+        self.btn_session = ttk.Button(export_frame, text="Relace zastávek…", command=self.on_session)
+        self.btn_session.grid(row=0, column=0, padx=(0, 5))
+        self.btn_reencode = ttk.Button(export_frame, text="Překódovat složku…", command=self.on_reencode_dir)
+        self.btn_reencode.grid(row=0, column=1, padx=(0, 5))
         self.btn_export = ttk.Button(export_frame, text="Exportovat MP3", command=self.on_export)
-        self.btn_export.grid(row=0, column=0)
+        self.btn_export.grid(row=0, column=2)
+        self.export_label = ttk.Label(export_frame, text="", foreground="#666")
+        self.export_label.grid(row=1, column=0, columnspan=3, sticky="e")
 
         # Info
         self.info_label = ttk.Label(main, text="Připraveno", foreground="#666")
@@ -286,6 +1499,9 @@ class RecordWindow(tk.Tk):
         val = max(0, min(200, val))
         self.volume_var.set(val)
         self.vol_label.config(text=f"{val} %")
+        # běžící náhled převezme novou hlasitost v příštím bloku callbacku
+        if self._play_stream is not None:
+            self._play_stream.gain = val / 100.0
         # Aktualizuj waveform podle vizuální hlasitosti
         self._draw_waveform()
 
@@ -300,10 +1516,17 @@ class RecordWindow(tk.Tk):
             return
         try:
             self.info_label.config(text="Nahrávám…")
-            self.recorder.start()
+            # živý náhled kreslí obálku z bufferu, stará nahrávka se zahazuje
+            self._set_take(None)
+            self._pyramid = None
+            self._pyramid_src = None
+            self._discard_take()
+            self._take_path = new_take_path() if self.to_disk_var.get() else None
+            self.recorder.start(self._take_path)
             _log("Record started")
             # živý update vizuálu při nahrávání
             self._schedule_recording_update()
+            self.level_meter.run(self.recorder)
             # během nahrávání povolit pouze Stop
             try:
                 self.btn_rec.state(["disabled"])
@@ -357,8 +1580,7 @@ class RecordWindow(tk.Tk):
             if data is None:
                 self.info_label.config(text="Bez dat – zkuste znovu.")
                 return
-            self.preview_data = data  # numpy float32 [-1,1]
-            self.preview_segment = None
+            self._set_take(data)  # numpy float32 [-1,1]
             self.info_label.config(text=f"Nahrávka připravena. Délka: {len(data)/self.recorder.samplerate:.2f} s")
             self._draw_waveform()
             # live update už zrušen výše
@@ -374,18 +1596,7 @@ class RecordWindow(tk.Tk):
             messagebox.showerror("Stop", f"Chyba při ukončení nahrávání:\n{e}")
 
     def _numpy_to_segment(self, data):
-        # očekává float32 [-1,1]
-        if AudioSegment is None:
-            raise RuntimeError("Chybí pydub. Nainstalujte: pip install pydub (a mít ffmpeg v PATH)")
-        # Převod na 16-bit PCM
-        audio = (data * 32767).astype(np.int16)
-        seg = AudioSegment(
-            audio.tobytes(),
-            frame_rate=self.recorder.samplerate,
-            sample_width=2,
-            channels=self.recorder.channels,
-        )
-        return seg
+        return numpy_to_segment(data, self.recorder.samplerate, self.recorder.channels)
 
     @safe_action
     def on_preview(self):
@@ -395,105 +1606,148 @@ class RecordWindow(tk.Tk):
         if self.is_playing:
             self.info_label.config(text="Přehrávání už běží…")
             return
+        if sd is None:
+            messagebox.showerror("Chybí závislosti", "Knihovna sounddevice není dostupná. Nainstalujte: pip install sounddevice")
+            return
+        if self.preview_data.size == 0:
+            messagebox.showinfo("Náhled", "Žádná data k přehrání.")
+            return
         try:
-            # Bezpečné přehrávání přes simpleaudio (pokud dostupné), jinak pydub.playback
-            if self.preview_data is None or (hasattr(self.preview_data, 'size') and self.preview_data.size == 0):
-                messagebox.showinfo("Náhled", "Žádná data k přehrání.")
-                return
-            # Připrav segment
-            seg = self.preview_segment or self._numpy_to_segment(self.preview_data)
-            vol = self.volume_var.get()
-            if vol == 0:
-                seg_adj = seg - 120
-            else:
-                gain_db = 20.0 * (np.log10(vol/100.0)) if np is not None else 0.0
-                seg_adj = seg + gain_db
+            player = PreviewPlayer(self.preview_data, self.recorder.samplerate, self.volume_var.get() / 100.0)
+            player.start()
+        except Exception as e:
+            _log(f"Preview error: {e}")
+            messagebox.showerror("Náhled", f"Chyba náhledu:\n{e}")
+            return
+        _log("Preview started")
+        self._play_stream = player
+        self.is_playing = True
+        self.play_pos_ms = 0
+        self.play_duration_ms = player.total_frames * 1000 // player.samplerate
+        # lock controls during playback
+        try:
+            self.btn_preview.state(["disabled"])
+            self.radio_sys.config(state='disabled')
+            self.radio_stops.config(state='disabled')
+            self.filename_combo.config(state='disabled')
+        except Exception:
+            pass
+        self.info_label.config(text="Přehrávám náhled…")
+        self.after(30, self._update_playhead)
 
-            def _play_with_simpleaudio():
-                try:
-                    raw = seg_adj.raw_data
-                    channels = seg_adj.channels
-                    sampwidth = seg_adj.sample_width
-                    fr = seg_adj.frame_rate
-                    play_obj = sa.play_buffer(raw, channels, sampwidth, fr)
-                    self._playback_obj = play_obj
-                    self.is_playing = True
-                    try:
-                        self.btn_preview.state(["disabled"])
-                    except Exception:
-                        pass
-                    _log("Preview (simpleaudio) started")
-                    play_obj.wait_done()
-                except Exception as e:
-                    _log(f"simpleaudio playback error: {e}")
-                finally:
-                    self._playback_obj = None
-                    self.is_playing = False
-                    try:
-                        # znovu povolit všechna ovládací tlačítka a volby
-                        self.btn_preview.state(["!disabled"])
-                        self.btn_rec.state(["!disabled"])
-                        self.btn_clear.state(["!disabled"])
-                        self.btn_export.state(["!disabled"])
-                        try:
-                            self.radio_sys.config(state='normal')
-                            self.radio_stops.config(state='normal')
-                            self.filename_combo.config(state='readonly')
-                        except Exception:
-                            pass
-                    except Exception:
-                        pass
+    def _set_take(self, data):
+        # nová nahrávka = nová historie úprav
+        self.edits = EditList(data) if data is not None else None
+        self._selection = None
+        self.preview_data = self.edits.render() if self.edits is not None else None
+        self.preview_segment = None
+        self._update_edit_buttons()
 
-            def _play_with_pydub():
-                try:
-                    from pydub.playback import play
-                    self.is_playing = True
-                    try:
-                        self.btn_preview.state(["disabled"])
-                    except Exception:
-                        pass
-                    _log("Preview (pydub) started")
-                    play(seg_adj)
-                except Exception as e:
-                    _log(f"pydub playback error: {e}")
-                finally:
-                    self.is_playing = False
-                    try:
-                        self.btn_preview.state(["!disabled"])
-                        self.btn_rec.state(["!disabled"])
-                        self.btn_clear.state(["!disabled"])
-                        self.btn_export.state(["!disabled"])
-                        try:
-                            self.radio_sys.config(state='normal')
-                            self.radio_stops.config(state='normal')
-                            self.filename_combo.config(state='readonly')
-                        except Exception:
-                            pass
-                    except Exception:
-                        pass
+    def _apply_edit(self, message=None):
+        # po změně seznamu úprav: nový render (ořez je jen pohled), výběr zaniká
+        self._selection = None
+        self.preview_data = self.edits.render()
+        self.preview_segment = None
+        self._update_edit_buttons()
+        if message:
+            self.info_label.config(text=message)
+        self._draw_waveform()
 
-            # lock controls during playback
-            try:
-                self.radio_sys.config(state='disabled')
-                self.radio_stops.config(state='disabled')
-                self.filename_combo.config(state='disabled')
-            except Exception:
-                pass
+    def _update_edit_buttons(self):
+        edits = self.edits
+        try:
+            self.btn_undo.state(["!disabled"] if edits is not None and edits.can_undo else ["disabled"])
+            self.btn_redo.state(["!disabled"] if edits is not None and edits.can_redo else ["disabled"])
+            self.btn_cut.state(["!disabled"] if self._selection is not None else ["disabled"])
+            self.btn_normalize.state(["!disabled"] if edits is not None else ["disabled"])
+        except Exception:
+            pass
 
-            if sa is not None:
-                self.play_thread = threading.Thread(target=_play_with_simpleaudio, daemon=True)
-            else:
-                self.play_thread = threading.Thread(target=_play_with_pydub, daemon=True)
-            self.play_thread.start()
-            self.info_label.config(text="Přehrávám náhled…")
-        except Exception as e:
-            _log(f"Preview error: {e}")
-            messagebox.showerror("Náhled", f"Chyba náhledu:\n{e}")
+    def _editing_blocked(self):
+        return self.edits is None or self.is_playing or getattr(self.recorder, "_recording", False)
+
+    @safe_action
+    def on_undo(self):
+        if self._editing_blocked() or not self.edits.undo():
+            return
+        self._apply_edit(f"Vráceno. Délka: {self.edits.length/self.recorder.samplerate:.2f} s")
+
+    @safe_action
+    def on_redo(self):
+        if self._editing_blocked() or not self.edits.redo():
+            return
+        self._apply_edit(f"Znovu provedeno. Délka: {self.edits.length/self.recorder.samplerate:.2f} s")
+
+    @safe_action
+    def on_cut_selection(self):
+        if self._editing_blocked() or self._selection is None:
+            return
+        start, end = self._selection
+        if end - start >= self.edits.length:
+            messagebox.showinfo("Vystřihnout", "Nelze vystřihnout celou nahrávku.")
+            return
+        self.edits.cut(start, end)
+        sr = self.recorder.samplerate
+        self._apply_edit(f"Vystřiženo {(end - start)/sr:.2f} s. Nová délka: {self.edits.length/sr:.2f} s")
+
+    @safe_action
+    def on_normalize(self):
+        # zisk tak, aby špička výsledku byla -1 dBFS (s výběrem jen pro vybraný úsek)
+        if self._editing_blocked():
+            return
+        start, end = self._selection or (0, self.edits.length)
+        peak = float(np.abs(self.preview_data[start:end]).max()) if end > start else 0.0
+        if peak <= 0.0:
+            return
+        factor = 10.0 ** (-1.0 / 20.0) / peak
+        self.edits.gain(factor, start, end)
+        self._apply_edit(f"Normalizováno ({20.0*np.log10(factor):+.1f} dB)")
+
+    def _x_to_sample(self, x):
+        w = int(self.waveform_canvas.cget("width"))
+        start, end = self._visible_range()
+        return int(max(0, min(end, start + (end - start) * (x / float(w)))))
+
+    def _on_select_start(self, event):
+        if self._ensure_pyramid() is None:
+            return
+        self._sel_anchor = self._x_to_sample(event.x)
+        self._selection = None
+        self._draw_selection()
+
+    def _on_select_drag(self, event):
+        if self._sel_anchor is None or self._pyramid is None:
+            return
+        pos = self._x_to_sample(event.x)
+        lo, hi = min(pos, self._sel_anchor), max(pos, self._sel_anchor)
+        self._selection = (lo, hi) if hi > lo else None
+        self._draw_selection()
+        sr = self.recorder.samplerate
+        if self._selection is not None:
+            self.info_label.config(text=f"Výběr {lo/sr:.2f} – {hi/sr:.2f} s (Delete = vystřihnout)")
+
+    def _draw_selection(self):
+        canvas = self.waveform_canvas
+        canvas.delete("selection")
+        self._update_edit_buttons()
+        if self._selection is None or self._pyramid is None:
+            return
+        w = int(canvas.cget("width"))
+        h = int(canvas.cget("height"))
+        start, end = self._visible_range()
+        span = max(1, end - start)
+        x0 = max(0, (self._selection[0] - start) * w / span)
+        x1 = min(w, (self._selection[1] - start) * w / span)
+        if x1 > x0:
+            canvas.create_rectangle(x0, 0, x1, h, fill="#fde2e4", outline="", tags="selection")
+            canvas.tag_lower("selection")
 
     @safe_action
     def on_clear_preview(self):
-        self.preview_data = None
-        self.preview_segment = None
+        self._set_take(None)
+        self._pyramid = None
+        self._pyramid_src = None
+        self._discard_take()
         self.info_label.config(text="Náhled smazán. Připraveno.")
         # Smazat waveform
         try:
@@ -536,51 +1790,159 @@ class RecordWindow(tk.Tk):
             if not messagebox.askyesno("Soubor existuje", f"Soubor {name}.mp3 už existuje. Chcete ho přepsat?"):
                 self.info_label.config(text="Export zrušen – soubor existuje.")
                 return
-        try:
-            seg = self.preview_segment or self._numpy_to_segment(self.preview_data)
-            # hlasitost (0 % = úplné ztišení)
-            vol = self.volume_var.get()
-            if vol == 0:
-                seg_adj = seg - 120
+        if AudioSegment is None:
+            messagebox.showerror("Export", "Chybí pydub, pro export MP3 nainstalujte: pip install pydub a mějte ffmpeg v PATH")
+            return
+        # kódování běží na pozadí; úpravy nahrávky vytvářejí nová pole, předaná data se tedy nezmění
+        self.exports.submit(f"{name}.mp3", export_clip, self.preview_data, self.recorder.samplerate, out_path,
+                            self._gain_db(), self.recorder.channels)
+        self.info_label.config(text=f"Exportuji na pozadí: {out_path}")
+        self.watch_exports()
+
+    def _gain_db(self):
+        # hlasitost (0 % = úplné ztišení)
+        vol = self.volume_var.get()
+        if vol == 0:
+            return -120.0
+        return 20.0 * (np.log10(vol/100.0)) if np is not None else 0.0
+
+    @safe_action
+    def on_reencode_dir(self):
+        if AudioSegment is None:
+            messagebox.showerror("Překódování", "Chybí pydub, nainstalujte: pip install pydub a mějte ffmpeg v PATH")
+            return
+        folder = filedialog.askdirectory(initialdir=AUDIO_DIR, title="Složka s klipy k překódování")
+        if not folder:
+            return
+        # u dvojic name.wav + name.mp3 je zdrojem kvalitnější WAV
+        sources = {}
+        for fname in sorted(os.listdir(folder)):
+            base, ext = os.path.splitext(fname)
+            ext = ext.lower()
+            if ext in (".wav", ".mp3") and (base not in sources or ext == ".wav"):
+                sources[base] = os.path.join(folder, fname)
+        if not sources:
+            messagebox.showinfo("Překódování", "Ve složce nejsou žádné klipy MP3/WAV.")
+            return
+        gain_db = self._gain_db()
+        if not messagebox.askyesno("Překódování", f"Překódovat {len(sources)} klipů do MP3 (zisk {gain_db:+.1f} dB)?\n"
+                                                  "Stávající MP3 soubory budou přepsány."):
+            return
+        for base, src in sources.items():
+            self.exports.submit(f"{base}.mp3", reencode_file, src, gain_db)
+        self.watch_exports()
+
+    def watch_exports(self):
+        """Sleduje frontu exportů a průběžně hlásí stav (bez blokování UI)."""
+        if self._export_timer is not None:
+            return
+        def _tick():
+            self._export_timer = None
+            done, total = self.exports.progress()
+            results = self.exports.take_results()
+            if results is None:
+                self.export_label.config(text=f"Export: {done}/{total}")
+                self._export_timer = self.after(100, _tick)
+                return
+            errors = [(label, e) for label, e in results if e is not None]
+            if errors:
+                _log(f"Export errors: {errors}")
+                self.export_label.config(text=f"Export: {total - len(errors)}/{total}, chyb: {len(errors)}")
+                label, e = errors[0]
+                messagebox.showerror("Export", f"{len(errors)} souborů se nepodařilo exportovat.\n{label}: {e}")
             else:
-                gain_db = 20.0 * (np.log10(vol/100.0)) if np is not None else 0.0
-                seg_adj = seg + gain_db
-            # export do MP3
-            if AudioSegment is None:
-                raise RuntimeError("Chybí pydub, pro export MP3 nainstalujte: pip install pydub a mějte ffmpeg v PATH")
-            seg_adj.export(out_path, format="mp3")
-            self.info_label.config(text=f"Exportováno: {out_path}")
-            messagebox.showinfo("Export", f"Uloženo do:\n{out_path}")
-            # Po exportu zajistit, že UI je odemčeno
-            try:
-                self.btn_rec.state(["!disabled"])
-                self.btn_preview.state(["!disabled"])
-                self.btn_clear.state(["!disabled"])
-                self.btn_export.state(["!disabled"])
-                try:
-                    self.radio_sys.config(state='normal')
-                    self.radio_stops.config(state='normal')
-                    self.filename_combo.config(state='readonly')
-                except Exception:
-                    pass
-            except Exception:
-                pass
-        except Exception as e:
-            messagebox.showerror("Export", f"Export se nezdařil:\n{e}")
+                self.export_label.config(text=f"Exportováno souborů: {total}")
+                self.info_label.config(text=f"Export dokončen ({total})")
+        self._export_timer = self.after(100, _tick)
+
+    def _offer_take_recovery(self):
+        # Nahrávky na disku, které zůstaly po pádu (proces, který je zapisoval, už neběží).
+        # Maže se jen nahrávka, kterou uživatel odmítne; ostatní zůstanou pro příští spuštění.
+        for path in orphaned_takes():
             try:
-                # i při chybě se snažíme UI odemknout
-                self.btn_rec.state(["!disabled"])
-                self.btn_preview.state(["!disabled"])
-                self.btn_clear.state(["!disabled"])
-                self.btn_export.state(["!disabled"])
-                try:
-                    self.radio_sys.config(state='normal')
-                    self.radio_stops.config(state='normal')
-                    self.filename_combo.config(state='readonly')
-                except Exception:
-                    pass
-            except Exception:
-                pass
+                data, sr = load_take(path)
+            except Exception as e:
+                _log(f"Take recovery failed for {path}: {e}")
+                continue
+            if data is None:
+                # prázdný soubor (pád před prvním blokem) neobsahuje nic k obnovení
+                remove_take(path)
+                continue
+            stamp = time.strftime("%d.%m. %H:%M", time.localtime(os.path.getmtime(path)))
+            answer = messagebox.askyesnocancel(
+                "Obnovit nahrávku",
+                f"Byla nalezena neuložená nahrávka z {stamp} ({len(data)/sr:.1f} s).\n"
+                "Ano = načíst do náhledu, Ne = smazat, Zrušit = ponechat na disku.")
+            if answer is None:
+                del data
+                continue
+            if not answer:
+                del data
+                remove_take(path)
+                continue
+            self.recorder.samplerate = sr
+            self._set_take(data)
+            self._take_path = path
+            self.info_label.config(text=f"Obnovena nahrávka. Délka: {len(data)/sr:.2f} s")
+            self._draw_waveform()
+            return
+
+    def on_close(self):
+        if self._closing:
+            return
+        cancel = False
+        if self.exports.busy:
+            done, total = self.exports.progress()
+            answer = messagebox.askyesnocancel(
+                "Export běží",
+                f"Export ještě neskončil ({done}/{total}).\n"
+                "Ano = dokončit export a pak zavřít, Ne = zrušit zbývající exporty a zavřít, Zrušit = nezavírat.")
+            if answer is None:
+                return
+            if answer:
+                self._closing = True
+                self.info_label.config(text="Dokončuji export, okno se pak zavře…")
+                self._close_when_exported()
+                return
+            _log(f"Export cancelled on close: {total - done} of {total} pending")
+            cancel = True
+        self._close(cancel)
+
+    def _close_when_exported(self):
+        if self.exports.busy:
+            self.after(200, self._close_when_exported)
+            return
+        self._close()
+
+    def _close(self, cancel_exports=False):
+        self._closing = True
+        try:
+            self.recorder.stop()
+        except Exception:
+            pass
+        self._set_take(None)
+        self._pyramid = None
+        self._pyramid_src = None
+        self._discard_take()
+        self.exports.shutdown(cancel_pending=cancel_exports)
+        self.destroy()
+
+    def _discard_take(self):
+        # EditList.render() předává exportům úseky memory-mapy nahrávky; smaže se, až fronta doběhne
+        path, self._take_path = self._take_path, None
+        if path:
+            self.exports.when_idle(lambda: remove_take(path))
+
+    @safe_action
+    def on_session(self):
+        if getattr(self.recorder, "_recording", False):
+            self.info_label.config(text="Nejprve ukončete nahrávání.")
+            return
+        keys = self._get_stop_names()
+        if not keys:
+            messagebox.showinfo("Relace", "V adresáři 'lines' nebyly nalezeny žádné zastávky.")
+            return
+        SessionWindow(self, keys, self.exports)
 
     def _load_stop_names(self):
         # Načti unikátní audio klíče ze všech JSON v adresáři lines
@@ -673,42 +2035,82 @@ class RecordWindow(tk.Tk):
         self.silence_threshold_var.set(val)
         self.thr_label.config(text=f"{val} %")
 
+    def _ensure_pyramid(self):
+        # pyramida se staví jen při změně dat (ne při změně hlasitosti či posunu playheadu)
+        data = self.preview_data
+        if data is None:
+            self._pyramid = None
+            self._pyramid_src = None
+            return None
+        if self._pyramid_src is not data:
+            self._pyramid = PeakPyramid(data)
+            self._pyramid_src = data
+            self._view_start = 0
+            self._view_len = 0
+            self._wave_cols = None
+        return self._pyramid
+
+    def _visible_range(self):
+        total = self._pyramid.samples if self._pyramid is not None else 0
+        length = self._view_len or total
+        start = max(0, min(self._view_start, total - length))
+        return start, start + length
+
     def _draw_waveform(self):
-        # Jednoduché vykreslení waveformu na Canvas
+        # Vykreslení waveformu jako jedné lomené čáry min/max z pyramidy špiček
         if self.preview_data is None or np is None:
             return
-        w = int(self.waveform_canvas.cget("width"))
-        h = int(self.waveform_canvas.cget("height"))
-        self.waveform_canvas.delete("all")
-        self.waveform_canvas.create_line(0, h//2, w, h//2, fill="#ddd")
-        data = self.preview_data
-        # Vizuální zesílení dle hlasitosti slideru (lineární faktor)
-        vis_gain = max(0.0, float(self.volume_var.get()) / 100.0)
-        # downsample pro rychlé vykreslení
-        samples = data.shape[0]
+        pyramid = self._ensure_pyramid()
+        canvas = self.waveform_canvas
+        w = int(canvas.cget("width"))
+        h = int(canvas.cget("height"))
+        canvas.delete("wave")
+        canvas.delete("axis")
+        samples = pyramid.samples
         if samples <= 0:
             return
-        step = max(1, samples // w)
-        # vytvoř páry (x, y)
-        points = []
-        for i in range(0, samples, step):
-            x = i // step
-            # podpora víc kanálů => vezmi první kanál
-            sample = float(data[i]) if data.ndim == 1 else float(data[i, 0])
-            sample *= vis_gain
-            y = h//2 - int(sample * (h//2 - 4))
-            points.append((x, y))
-        # nakresli polyline
-        for i in range(1, len(points)):
-            x1, y1 = points[i-1]
-            x2, y2 = points[i]
-            self.waveform_canvas.create_line(x1, y1, x2, y2, fill="#2c7be5")
-        # Playhead
-        if self.play_duration_ms > 0 and self.is_playing:
-            pos_px = min(w-1, int((self.play_pos_ms / self.play_duration_ms) * w))
-            self.waveform_canvas.create_line(pos_px, 0, pos_px, h, fill="#e83e8c")
+        canvas.create_line(0, h//2, w, h//2, fill="#ddd", tags="axis")
+        start, end = self._visible_range()
+        key = (start, end, w)
+        if self._wave_cols is None or self._wave_cols[0] != key:
+            self._wave_cols = (key,) + pyramid.columns(start, end, w)
+        _, col_max, col_min = self._wave_cols
+        n = col_max.shape[0]
+        if n:
+            # Vizuální zesílení dle hlasitosti slideru (lineární faktor)
+            vis_gain = max(0.0, float(self.volume_var.get()) / 100.0)
+            amp = (h//2 - 4) * vis_gain
+            xs = np.repeat(np.arange(n, dtype=np.float32) * (w / float(n)), 2)
+            ys = np.empty(2 * n, dtype=np.float32)
+            ys[0::2] = h//2 - np.clip(col_max, -1.0, 1.0) * amp
+            ys[1::2] = h//2 - np.clip(col_min, -1.0, 1.0) * amp
+            coords = np.column_stack((xs, ys)).ravel().tolist()
+            canvas.create_line(*coords, fill="#2c7be5", tags="wave")
+        self._draw_selection()
+        self._move_playhead()
+
+    def _move_playhead(self):
+        # Playhead je samostatná položka plátna, jen se posouvá (waveform se nepřekresluje)
+        canvas = self.waveform_canvas
+        w = int(canvas.cget("width"))
+        h = int(canvas.cget("height"))
+        total_samples = self._pyramid.samples if self._pyramid is not None else 0
+        sr = self.recorder.samplerate
+        if self.play_duration_ms > 0 and self.is_playing and total_samples:
+            start, end = self._visible_range()
+            pos = self.play_pos_ms / 1000.0 * sr
+            pos_px = int((pos - start) / max(1, end - start) * w)
+            if not canvas.find_withtag("playhead"):
+                canvas.create_line(0, 0, 0, h, fill="#e83e8c", tags="playhead")
+            if 0 <= pos_px < w:
+                canvas.coords("playhead", pos_px, 0, pos_px, h)
+            else:
+                canvas.coords("playhead", -10, 0, -10, h)
+            canvas.tag_raise("playhead")
+        else:
+            canvas.delete("playhead")
         # Časový text
-        total_sec = samples / self.recorder.samplerate
+        total_sec = total_samples / sr
         cur_sec = (self.play_pos_ms/1000.0) if self.is_playing else total_sec
         def fmt(s):
             m = int(s//60)
@@ -716,60 +2118,105 @@ class RecordWindow(tk.Tk):
             return f"{m:02d}:{ss:02d}"
         self.time_label.config(text=f"{fmt(cur_sec)} / {fmt(total_sec)}")
 
+    def _on_wave_zoom(self, x, direction):
+        if self._ensure_pyramid() is None:
+            return
+        w = int(self.waveform_canvas.cget("width"))
+        total = self._pyramid.samples
+        start, end = self._visible_range()
+        length = end - start
+        anchor = start + length * (x / float(w))
+        new_len = int(length / 2) if direction > 0 else int(length * 2)
+        new_len = max(min(total, w), min(total, new_len))
+        self._view_len = 0 if new_len >= total else new_len
+        self._view_start = int(max(0, min(total - new_len, anchor - new_len * (x / float(w)))))
+        self._draw_waveform()
+
+    def _on_wave_drag_start(self, event):
+        self._drag_x = event.x
+
+    def _on_wave_drag(self, event):
+        if self._ensure_pyramid() is None or self._drag_x is None or not self._view_len:
+            return
+        w = int(self.waveform_canvas.cget("width"))
+        shift = int((self._drag_x - event.x) * self._view_len / float(w))
+        self._drag_x = event.x
+        if shift:
+            total = self._pyramid.samples
+            self._view_start = max(0, min(total - self._view_len, self._view_start + shift))
+            self._draw_waveform()
+
+    def _reset_wave_view(self):
+        self._view_start = 0
+        self._view_len = 0
+        self._draw_waveform()
+
+    def _draw_live_overview(self, overview, samples):
+        # Živý náhled během nahrávání: jedna lomená čára min/max po sloupcích
+        w = int(self.waveform_canvas.cget("width"))
+        h = int(self.waveform_canvas.cget("height"))
+        self.waveform_canvas.delete("all")
+        self.waveform_canvas.create_line(0, h//2, w, h//2, fill="#ddd", tags="axis")
+        n = overview.count
+        if n:
+            vis_gain = max(0.0, float(self.volume_var.get()) / 100.0)
+            amp = (h//2 - 4) * vis_gain
+            xs = np.repeat(np.arange(n, dtype=np.float32), 2)
+            ys = np.empty(2 * n, dtype=np.float32)
+            ys[0::2] = h//2 - np.clip(overview.col_max[:n], -1.0, 1.0) * amp
+            ys[1::2] = h//2 - np.clip(overview.col_min[:n], -1.0, 1.0) * amp
+            coords = np.column_stack((xs, ys)).ravel().tolist()
+            if len(coords) < 4:
+                coords += coords
+            self.waveform_canvas.create_line(*coords, fill="#2c7be5", tags="wave")
+        total_sec = samples / self.recorder.samplerate
+        self.time_label.config(text=f"{int(total_sec//60):02d}:{int(total_sec%60):02d}")
+
     def _update_playhead(self):
-        # aktualizace playheadu podle stream pozice
-        if not self.is_playing:
-            # ukončení: dočistit tlačítko a stream
-            try:
-                self.btn_preview.state(["!disabled"])  # znovu povolit
-            except Exception:
-                pass
-            try:
-                preview_len = self.preview_data.shape[0] if self.preview_data is not None else 0
-            except Exception:
-                preview_len = 0
-            if self._play_stream is not None and self._play_index >= preview_len:
-                try:
-                    self._shutting_down_playback = True
-                    self._play_stream.stop()
-                    import time as _t
-                    _t.sleep(0.05)
-                    self._play_stream.close()
-                except Exception:
-                    pass
-                self._play_stream = None
-                self._shutting_down_playback = False
+        # pozice playheadu podle počítadla snímků streamu (ne podle hodin UI)
+        player = self._play_stream
+        if player is None or not self.is_playing:
+            self._finish_preview()
             return
-        # Pokud právě vypínáme playback, neredrawuj (stabilita)
+        self.play_pos_ms = player.position * 1000 // player.samplerate
         if not self._shutting_down_playback:
             try:
-                self._draw_waveform()
+                self._move_playhead()
             except Exception as e:
                 _log(f"Draw waveform error: {e}")
-        if self.play_pos_ms < self.play_duration_ms:
-            self.after(50, self._update_playhead)
+        if player.finished:
+            self._finish_preview()
         else:
-            # konec přehrávání
-            self.is_playing = False
+            self.after(30, self._update_playhead)
+
+    def _finish_preview(self):
+        # konec přehrávání: uvolnit stream a odemknout ovládání
+        player = self._play_stream
+        if player is not None:
             try:
-                self.btn_preview.state(["!disabled"])  # znovu povolit
+                self._shutting_down_playback = True
+                player.stop()
+                player.close()
             except Exception:
                 pass
-            if self._play_stream is not None:
-                try:
-                    self._shutting_down_playback = True
-                    self._play_stream.stop()
-                    import time as _t
-                    _t.sleep(0.05)
-                    self._play_stream.close()
-                except Exception:
-                    pass
-                self._play_stream = None
-                self._shutting_down_playback = False
+            self._play_stream = None
+            self._shutting_down_playback = False
+        self.is_playing = False
+        try:
+            self.btn_preview.state(["!disabled"])
+            self.radio_sys.config(state='normal')
+            self.radio_stops.config(state='normal')
+            self.filename_combo.config(state='readonly')
+        except Exception:
+            pass
+        try:
+            self._move_playhead()
+        except Exception:
+            pass
 
     @safe_action
     def on_trim_silence(self):
-        # Ořízne ticho z počátku a konce podle prahu
+        # Ořízne ticho z počátku a konce podle RMS po oknech (viz detect_voice_bounds)
         if self.preview_data is None or np is None:
             messagebox.showinfo("Ořez ticha", "Nejprve něco nahrajte.")
             return
@@ -793,44 +2240,56 @@ class RecordWindow(tk.Tk):
                     pass
 
             data = self.preview_data
+            sr = self.recorder.samplerate
             thr_pct = self.silence_threshold_var.get() / 100.0
-            # Ošetři NaN/Inf a prázdná data
-            try:
-                max_amp = float(np.max(np.abs(data)))
-            except Exception:
-                max_amp = 0.0
-            if not np.isfinite(max_amp):
-                max_amp = 0.0
-            max_amp = max(1e-6, max_amp)
-            threshold = thr_pct * max_amp
-            # najdi první index > threshold
-            idx_start = 0
-            try:
-                while idx_start < len(data) and abs(float(data[idx_start] if data.ndim == 1 else data[idx_start, 0])) <= threshold:
-                    idx_start += 1
-            except Exception:
-                idx_start = 0
-            # najdi poslední index > threshold
-            idx_end = len(data) - 1
+            if data.shape[0] / float(sr) <= TRIM_WORKER_SEC:
+                self._apply_trim(data, detect_voice_bounds(data, sr, thr_pct))
+                return
+            # dlouhá nahrávka: detekce v pracovním vlákně, UI si výsledek vyzvedne přes after()
+            result = {}
+            def _work():
+                try:
+                    result["bounds"] = detect_voice_bounds(data, sr, thr_pct)
+                except Exception as e:
+                    result["error"] = e
+            worker = threading.Thread(target=_work, daemon=True)
             try:
-                while idx_end > idx_start and abs(float(data[idx_end] if data.ndim == 1 else data[idx_end, 0])) <= threshold:
-                    idx_end -= 1
+                self.btn_trim_silence.state(["disabled"])
             except Exception:
-                idx_end = len(data) - 1
-            if idx_end <= idx_start:
-                messagebox.showinfo("Ořez ticha", "Celá nahrávka je tichá podle zvoleného prahu.")
-                return
-            trimmed = data[idx_start:idx_end+1]
-            if trimmed is None or (hasattr(trimmed, 'size') and trimmed.size == 0):
-                messagebox.showinfo("Ořez ticha", "Po ořezu nezbyla žádná nahrávka.")
-                return
-            self.preview_data = trimmed
-            self.preview_segment = None  # re-generovat při dalším přehrání/exportu
-            self.info_label.config(text=f"Oříznuto ticho. Nová délka: {len(trimmed)/self.recorder.samplerate:.2f} s")
-            self._draw_waveform()
+                pass
+            self.info_label.config(text="Hledám ticho…")
+            worker.start()
+            def _poll():
+                if worker.is_alive():
+                    self.after(30, _poll)
+                    return
+                try:
+                    self.btn_trim_silence.state(["!disabled"])
+                except Exception:
+                    pass
+                if "error" in result:
+                    messagebox.showerror("Ořez ticha", f"Nepodařilo se oříznout ticho:\n{result['error']}")
+                elif self.preview_data is data:
+                    # mezitím se nahrávka nezměnila
+                    self._apply_trim(data, result.get("bounds"))
+            self.after(30, _poll)
         except Exception as e:
             messagebox.showerror("Ořez ticha", f"Nepodařilo se oříznout ticho:\n{e}")
 
+    def _apply_trim(self, data, bounds):
+        if bounds is None:
+            messagebox.showinfo("Ořez ticha", "Celá nahrávka je tichá podle zvoleného prahu.")
+            return
+        idx_start, idx_end = bounds
+        if idx_end <= idx_start:
+            messagebox.showinfo("Ořez ticha", "Po ořezu nezbyla žádná nahrávka.")
+            return
+        sr = self.recorder.samplerate
+        # ořez je jen nový úsek v seznamu úprav (pohled do původních dat)
+        self.edits.trim(idx_start, idx_end)
+        self._apply_edit(f"Oříznuto ticho ({idx_start*1000//sr} – {idx_end*1000//sr} ms). "
+                         f"Nová délka: {(idx_end - idx_start)/sr:.2f} s")
+
     def _schedule_recording_update(self):
         # periodicky překreslí waveform podle aktuálně nahraných dat
         try:
@@ -838,20 +2297,15 @@ class RecordWindow(tk.Tk):
                 self.after_cancel(self._recording_timer)
         except Exception:
             pass
+        overview = LiveOverview(int(self.waveform_canvas.cget("width")))
         def _tick():
-            if self.recorder._recording and self.recorder._frames:
+            buf = self.recorder.buffer
+            if self.recorder._recording and buf is not None and buf.length:
                 try:
-                    # sloučit jen poslední část pro výkon
-                    last = self.recorder._frames[-1]
-                    if isinstance(last, np.ndarray):
-                        # ukázat celková data pro lepší kontext
-                        try:
-                            data = np.concatenate(self.recorder._frames, axis=0)
-                            self.preview_data = data
-                            self.preview_segment = None
-                        except Exception:
-                            pass
-                    self._draw_waveform()
+                    # do přehledu se započítají jen nové body obálky
+                    env_max, env_min = buf.envelope()
+                    overview.update(env_max, env_min)
+                    self._draw_live_overview(overview, buf.length)
                 except Exception:
                     pass
             if self.recorder._recording:
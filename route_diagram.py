@@ -0,0 +1,120 @@
+"""Celotrasové schéma linky pro vnitřní displej vozu.
+
+Zastávky aktuálního směru se skládají do sloupců shora dolů a sloupce zleva
+doprava; co se nevejde na jednu obrazovku, pokračuje na další stránce.
+Zobrazuje se stránka s aktuální zastávkou.
+
+Stránka se vykreslí celá (osa, značky, názvy) jen jednou – poprvé, když je
+potřeba – a dál se drží v paměti. Při posunu `gui_stop_index` se překreslí
+pouze značky zastávek, jejichž stav se změnil (projeto / aktuální / před
+námi): výřez kolem značky se ořízne klipem, smaže a dokreslí se osa a nová
+značka. Cena snímku tak nezávisí na počtu zastávek a dlouhé linky (80+
+zastávek) stojí stejně jako krátké.
+"""
+import pygame
+
+# barvy ve stejné paletě jako panel v main.py
+BG_COLOR = (255, 255, 255)
+LINE_COLOR = (200, 0, 0)
+TEXT_COLOR = (0, 0, 0)
+PASSED_COLOR = (170, 170, 170)
+FUTURE_COLOR = (0, 0, 0)
+CURRENT_COLOR = (200, 0, 0)
+
+
+class RouteDiagram:
+    """Schéma jednoho směru v obdélníku `area` daného rozvržení (`layout.PanelLayout`)."""
+
+    def __init__(self, layout, stop_names, area):
+        self.layout = layout
+        self.names = list(stop_names)
+        self.area = pygame.Rect(area)
+        v = layout.v
+        self.row_h = max(1, v(44))
+        self.marker_r = max(2, v(10))
+        self.current_r = max(3, v(17))
+        self.line_w = max(1, v(6))
+        label_gap = v(16)
+        min_col_w = max(1, v(300))
+
+        self.per_col = max(1, self.area.h // self.row_h)
+        self.cols_per_page = max(1, self.area.w // min_col_w)
+        self.per_page = self.per_col * self.cols_per_page
+        self.pages = max(1, -(-len(self.names) // self.per_page))
+        col_w = self.area.w // self.cols_per_page
+        self.label_dx = self.current_r + label_gap
+        self.label_max_w = max(1, col_w - self.label_dx - v(16))
+
+        # poloha každé zastávky na své stránce: (stránka, x osy, y středu značky)
+        self.positions = []
+        for i in range(len(self.names)):
+            page, rest = divmod(i, self.per_page)
+            col, row = divmod(rest, self.per_col)
+            self.positions.append((page, col * col_w + self.current_r + v(8), row * self.row_h + self.row_h // 2))
+
+        self.current = 0
+        self._pages = {}
+
+    def page_of(self, index):
+        if not self.names:
+            return 0
+        return self.positions[min(max(index, 0), len(self.names) - 1)][0]
+
+    def _column_span(self, i):
+        """Svislý úsek osy ve sloupci zastávky i (od první po poslední značku sloupce)."""
+        first = i - (i % self.per_page) % self.per_col
+        last = min(first + self.per_col, (self.positions[i][0] + 1) * self.per_page, len(self.names)) - 1
+        return self.positions[first][2], self.positions[last][2]
+
+    def _draw_marker(self, surf, i):
+        _, x, y = self.positions[i]
+        if i == self.current:
+            pygame.draw.circle(surf, CURRENT_COLOR, (x, y), self.current_r)
+            pygame.draw.circle(surf, TEXT_COLOR, (x, y), self.current_r, max(1, self.line_w // 2))
+        else:
+            pygame.draw.circle(surf, PASSED_COLOR if i < self.current else FUTURE_COLOR, (x, y), self.marker_r)
+
+    def _redraw_markers(self, surf, indices):
+        r = self.current_r + 1
+        for i in indices:
+            _, x, y = self.positions[i]
+            cell = pygame.Rect(x - r, y - r, 2 * r, 2 * r)
+            surf.set_clip(cell)
+            surf.fill(BG_COLOR, cell)
+            top, bottom = self._column_span(i)
+            pygame.draw.line(surf, LINE_COLOR, (x, top), (x, bottom), self.line_w)
+            self._draw_marker(surf, i)
+        surf.set_clip(None)
+
+    def _render_page(self, page):
+        surf = self.layout.surface(self.area.size)
+        surf.fill(BG_COLOR)
+        start = page * self.per_page
+        end = min(start + self.per_page, len(self.names))
+        for first in range(start, end, self.per_col):
+            top, bottom = self._column_span(first)
+            x = self.positions[first][1]
+            pygame.draw.line(surf, LINE_COLOR, (x, top), (x, bottom), self.line_w)
+        for i in range(start, end):
+            _, x, y = self.positions[i]
+            self._draw_marker(surf, i)
+            lbl = self.layout.fit_text("diagram", self.names[i], TEXT_COLOR, self.label_max_w)
+            surf.blit(lbl, (x + self.label_dx, y - lbl.get_height() // 2))
+        return surf
+
+    def set_current(self, index):
+        """Posune aktuální zastávku; na vykreslených stránkách přebarví jen změněné značky."""
+        index = min(max(index, 0), max(len(self.names) - 1, 0))
+        if index == self.current:
+            return
+        changed = range(min(index, self.current), max(index, self.current) + 1)
+        self.current = index
+        for page, surf in self._pages.items():
+            self._redraw_markers(surf, [i for i in changed if self.positions[i][0] == page])
+
+    def page_surface(self, page):
+        """Stránka schématu (vykreslí se při prvním použití, pak se jen přebarvují značky)."""
+        surf = self._pages.get(page)
+        if surf is None:
+            surf = self._pages[page] = self._render_page(page)
+        return surf
@@ -0,0 +1,249 @@
+"""Mapové zobrazení linky podle geometrie trasy.
+
+Definice linky v `lines/<id>.json` obsahuje jen jízdní doby. Volitelně může
+vedle ležet `lines/<id>.geojson` (WGS84) s geometrií:
+
+    - LineString s vlastností `"from": i` = úsek trasy ze zastávky i do i+1
+      ve směru TAM (úseků je o jeden méně než zastávek),
+    - ostatní LineString/MultiLineString/Polygon = podkladová data mapy
+      (vlastnost `"kind"`: street, rail, water, park; jinak street).
+
+Souřadnice se jednou promítnou do metrů (rovnoběžková projekce kolem středu
+trasy) a pro každý směr se předpočítá kumulativní délka oblouku po
+vrcholech a poloha zastávek na oblouku. Poloha vozu z `bus_abs_pos` se pak
+hledá dvakrát přes `bisect` (úsek mezi zastávkami podle času, vrchol podle
+délky oblouku) a lineárně interpoluje – O(log n) i pro tisíce vrcholů.
+
+Mapa se kreslí z dlaždic (TILE_PX × TILE_PX) pevného měřítka. Dlaždice se
+vykreslí z vektorových dat jen při prvním zobrazení (prvky se vybírají přes
+mřížkový index dlaždic) a drží se v LRU cache; snímek je tak jen pár blitů,
+značka vozu a popisky blízkých zastávek.
+"""
+import bisect
+import json
+import math
+import os
+from collections import OrderedDict
+
+import pygame
+
+TILE_PX = 256
+# kolik dlaždic se drží v paměti (při 256 px a 32 bitech ~64 MB)
+TILE_CACHE_MAX = 256
+# měřítko mapy při návrhovém rozlišení 1280×720 (m na pixel)
+METERS_PER_PX = 2.0
+# trasa se do indexu dlaždic dělí na kousky po tolika vrcholech, aby dlaždice kreslila jen svůj kus
+ROUTE_CHUNK = 64
+
+LAND_COLOR = (242, 239, 233)
+ROUTE_COLOR = (200, 0, 0)
+STOP_COLOR = (0, 0, 0)
+VEHICLE_COLOR = (240, 210, 0)
+VEHICLE_BORDER = (0, 0, 0)
+# styl podkladu: druh -> (barva, šířka čáry v px; 0 = vyplněný polygon)
+FEATURE_STYLES = {
+    "street": ((255, 255, 255), 6),
+    "rail": ((120, 120, 120), 2),
+    "water": ((170, 205, 235), 0),
+    "park": ((200, 230, 190), 0),
+}
+
+
+def _project(coords, lon0, lat0):
+    kx = 111320.0 * math.cos(math.radians(lat0))
+    ky = 110540.0
+    return [((lon - lon0) * kx, (lat0 - lat) * ky) for lon, lat in coords]
+
+
+class RoutePath:
+    """Lomená čára jednoho směru s kumulativní délkou oblouku a polohou zastávek."""
+
+    def __init__(self, points, stop_arc):
+        self.xs = [p[0] for p in points]
+        self.ys = [p[1] for p in points]
+        self.cum = [0.0]
+        for i in range(1, len(points)):
+            self.cum.append(self.cum[-1] + math.hypot(self.xs[i] - self.xs[i - 1], self.ys[i] - self.ys[i - 1]))
+        self.length = self.cum[-1]
+        self.stop_arc = stop_arc
+
+    def point_at(self, s):
+        """Bod (x, y) ve vzdálenosti s metrů od začátku po trase."""
+        cum = self.cum
+        k = min(max(bisect.bisect_right(cum, s) - 1, 0), len(cum) - 2)
+        seg = cum[k + 1] - cum[k]
+        f = (s - cum[k]) / seg if seg > 0 else 0.0
+        f = min(max(f, 0.0), 1.0)
+        return self.xs[k] + (self.xs[k + 1] - self.xs[k]) * f, self.ys[k] + (self.ys[k + 1] - self.ys[k]) * f
+
+    def locate(self, stop_times, t):
+        """Poloha vozu v čase t (s od začátku směru); `stop_times` = časy zastávek (`dist`)."""
+        n = min(len(stop_times), len(self.stop_arc))
+        if n < 2:
+            return self.point_at(0.0)
+        i = min(max(bisect.bisect_right(stop_times, t, 0, n) - 1, 0), n - 2)
+        leg = stop_times[i + 1] - stop_times[i]
+        f = (t - stop_times[i]) / leg if leg > 0 else 0.0
+        f = min(max(f, 0.0), 1.0)
+        return self.point_at(self.stop_arc[i] + (self.stop_arc[i + 1] - self.stop_arc[i]) * f)
+
+
+class RouteGeometry:
+    """Geometrie linky v metrech: trasa (oba směry) a podkladové prvky mapy."""
+
+    def __init__(self, data, stop_count=None):
+        segments = {}
+        background = []
+        raw_features = data.get("features", []) if data.get("type") == "FeatureCollection" else [data]
+        for feature in raw_features:
+            geom = feature.get("geometry") or {}
+            props = feature.get("properties") or {}
+            if geom.get("type") == "LineString" and "from" in props:
+                segments[int(props["from"])] = geom["coordinates"]
+            elif geom.get("type") in ("LineString", "MultiLineString", "Polygon"):
+                background.append((props.get("kind", "street"), geom))
+        if not segments:
+            raise ValueError("geometrie neobsahuje žádný úsek trasy (LineString s vlastností 'from')")
+        count = max(segments) + 1
+        missing = [i for i in range(count) if i not in segments]
+        if missing:
+            raise ValueError(f"chybí úseky trasy {missing}")
+        if stop_count is not None and count != stop_count - 1:
+            raise ValueError(f"{count} úseků trasy neodpovídá {stop_count} zastávkám")
+
+        all_coords = [c for i in range(count) for c in segments[i]]
+        lon0 = sum(c[0] for c in all_coords) / len(all_coords)
+        lat0 = sum(c[1] for c in all_coords) / len(all_coords)
+
+        # trasa TAM: úseky za sebou (společné vrcholy na zastávkách jen jednou)
+        points = []
+        stop_vertex = [0]
+        for i in range(count):
+            pts = _project(segments[i], lon0, lat0)
+            if points and pts and pts[0] == points[-1]:
+                pts = pts[1:]
+            points.extend(pts)
+            stop_vertex.append(len(points) - 1)
+        tam = RoutePath(points, [])
+        tam.stop_arc = [tam.cum[v] for v in stop_vertex]
+        zpet = RoutePath(points[::-1], [tam.length - s for s in reversed(tam.stop_arc)])
+        self.paths = {True: tam, False: zpet}
+        self.stops = [(tam.xs[v], tam.ys[v]) for v in stop_vertex]
+
+        # podkladové prvky: [(druh, [[(x, y), ...], ...], vyplnit, bbox)]
+        self.features = []
+        for kind, geom in background:
+            if geom["type"] == "LineString":
+                parts, fill = [geom["coordinates"]], False
+            elif geom["type"] == "MultiLineString":
+                parts, fill = geom["coordinates"], False
+            else:
+                parts, fill = geom["coordinates"][:1], True
+            parts = [_project(p, lon0, lat0) for p in parts if len(p) >= 2]
+            if parts:
+                self.features.append((kind, parts, fill, _bbox([pt for p in parts for pt in p])))
+        for i in range(0, max(len(points) - 1, 1), ROUTE_CHUNK):
+            chunk = points[i:i + ROUTE_CHUNK + 1]
+            self.features.append(("route", [chunk], False, _bbox(chunk)))
+
+    @classmethod
+    def load(cls, path, stop_count=None):
+        """Načte geometrii z GeoJSON; vrátí None, pokud soubor neexistuje."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), stop_count)
+
+
+def _bbox(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+class MapRenderer:
+    """Dlaždicová mapa geometrie v daném rozvržení (`layout.PanelLayout`)."""
+
+    def __init__(self, geometry, layout):
+        self.geometry = geometry
+        self.layout = layout
+        # stejná plocha mapy na 720p i ve 4K: měřítko roste s rozlišením
+        self.m_per_px = METERS_PER_PX / layout.scale
+        self.tile_m = TILE_PX * self.m_per_px
+        self.route_w = max(2, layout.v(8))
+        self.stop_r = max(2, layout.v(7))
+        self.vehicle_r = max(4, layout.v(14))
+        self._tiles = OrderedDict()
+        # mřížkový index: dlaždice -> indexy prvků, jejichž bbox do ní zasahuje (okraj = šířka čáry)
+        self._index = {}
+        margin = max(self.route_w, max(w for _, w in FEATURE_STYLES.values())) * self.m_per_px
+        for n, (_, _, _, (x0, y0, x1, y1)) in enumerate(geometry.features):
+            for tx in range(int(math.floor((x0 - margin) / self.tile_m)), int(math.floor((x1 + margin) / self.tile_m)) + 1):
+                for ty in range(int(math.floor((y0 - margin) / self.tile_m)), int(math.floor((y1 + margin) / self.tile_m)) + 1):
+                    self._index.setdefault((tx, ty), []).append(n)
+
+    def _render_tile(self, tx, ty):
+        surf = self.layout.surface((TILE_PX, TILE_PX))
+        surf.fill(LAND_COLOR)
+        ox, oy = tx * self.tile_m, ty * self.tile_m
+        k = 1.0 / self.m_per_px
+        for n in self._index.get((tx, ty), ()):
+            kind, parts, fill, _ = self.geometry.features[n]
+            if kind == "route":
+                color, width = ROUTE_COLOR, self.route_w
+            else:
+                color, width = FEATURE_STYLES.get(kind, FEATURE_STYLES["street"])
+                width = max(1, self.layout.v(width)) if width else 0
+            for part in parts:
+                pts = [((x - ox) * k, (y - oy) * k) for x, y in part]
+                if fill and len(pts) >= 3:
+                    pygame.draw.polygon(surf, color, pts)
+                elif width <= 2:
+                    pygame.draw.aalines(surf, color, False, pts)
+                else:
+                    pygame.draw.lines(surf, color, False, pts, width)
+        return surf
+
+    def tile(self, tx, ty):
+        key = (tx, ty)
+        surf = self._tiles.get(key)
+        if surf is None:
+            surf = self._tiles[key] = self._render_tile(tx, ty)
+            if len(self._tiles) > TILE_CACHE_MAX:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(key)
+        return surf
+
+    def draw(self, screen, area, smer_tam, stop_times, t, stop_names, current_index):
+        """Vykreslí výřez mapy se středem na voze do obdélníku `area` a vrátí polohu vozu (m)."""
+        path = self.geometry.paths[smer_tam]
+        vx, vy = path.locate(stop_times, t)
+        # levý horní roh výřezu ve světových pixelech (celé pixely, aby dlaždice lícovaly)
+        left = int(round(vx / self.m_per_px)) - area.w // 2
+        top = int(round(vy / self.m_per_px)) - area.h // 2
+        prev_clip = screen.get_clip()
+        screen.set_clip(area)
+        for ty in range(top // TILE_PX, (top + area.h) // TILE_PX + 1):
+            for tx in range(left // TILE_PX, (left + area.w) // TILE_PX + 1):
+                screen.blit(self.tile(tx, ty), (area.x + tx * TILE_PX - left, area.y + ty * TILE_PX - top))
+
+        # zastávky a popisky jen ve výřezu (pořadí podle směru)
+        stops = self.geometry.stops if smer_tam else self.geometry.stops[::-1]
+        view = area.inflate(self.layout.v(200), self.layout.v(40))
+        for i, (sx, sy) in enumerate(stops):
+            px = area.x + int(round(sx / self.m_per_px)) - left
+            py = area.y + int(round(sy / self.m_per_px)) - top
+            if not view.collidepoint(px, py):
+                continue
+            pygame.draw.circle(screen, LAND_COLOR if i < current_index else STOP_COLOR, (px, py), self.stop_r)
+            pygame.draw.circle(screen, STOP_COLOR, (px, py), self.stop_r, max(1, self.stop_r // 3))
+            if i < len(stop_names):
+                lbl = self.layout.text("map", stop_names[i], STOP_COLOR)
+                screen.blit(lbl, (px + self.stop_r * 2, py - lbl.get_height() // 2))
+
+        center = (area.x + area.w // 2, area.y + area.h // 2)
+        pygame.draw.circle(screen, VEHICLE_COLOR, center, self.vehicle_r)
+        pygame.draw.circle(screen, VEHICLE_BORDER, center, self.vehicle_r, max(1, self.vehicle_r // 4))
+        screen.set_clip(prev_clip)
+        return vx, vy
@@ -0,0 +1,268 @@
+"""Škálovací report: cena simulátoru a nahrávače podle velikosti vstupu.
+
+Pro každou velikost syntetické linky (synthetic.py, počet zastávek) změří
+načtení definice, paměť trasy (tracemalloc: co zůstane po načtení a stavbě
+trasy a špička během nich), ustálený snímek panelu a celotrasového schématu,
+otočku na konečné (nový směr, jízdní řád, poruchy a první snímek s novou
+trasou) a hodinu simulované fyziky. Pro každou délku syntetické nahrávky
+změří záznam přes audio callback včetně živého přehledu waveformu (tik
+každých LIVE_TICK_SEC zvuku jako v okně nahrávače), špičku paměti záznamu,
+`Recorder.stop` se zápisem na disk, pyramidu špiček a detekci řeči.
+
+Časy se měří stejně jako v benchmarks.py (medián z `repeat` běhů). Pod
+každou tabulkou je exponent růstu – sklon přímky proložené body
+log(cena) ~ log(velikost): ~0 konstantní, ~1 lineární, ~2 kvadratická cena.
+Sloupec s exponentem nad SUPERLINEAR_EXPONENT je označený ⚠️.
+
+    python scaling.py [--stops=100,1000,10000,30000] [--takes=10,60,300,600] [--repeat=3]
+                      [--out=scaling_report.md] [--size=1280x720]
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("MHD_HK_EVENT_LOG", "")
+os.environ.setdefault("MHD_HK_LOG_ECHO", "0")
+
+import numpy as np
+import pygame
+
+import main
+from benchmarks import (Case, PHYSICS_DT, WAVEFORM_WIDTH, armed_recorder, callback_blocks, feed_recorder,
+                        format_time, machine_info, measure)
+from headless import SimClock
+from main import BusSimulatorSimpleLine
+from synthetic import TAKE_SAMPLERATE, synthetic_line, synthetic_take, write_line
+
+DEFAULT_STOPS = (100, 1000, 10000, 30000)
+DEFAULT_TAKES = (10, 60, 300, 600)
+DEFAULT_REPEAT = 3
+REPORT_PATH = "scaling_report.md"
+SUPERLINEAR_EXPONENT = 1.2
+# okno nahrávače obnovuje živý přehled každých 100 ms
+LIVE_TICK_SEC = 0.1
+
+
+def growth_exponent(sizes, costs):
+    """Sklon log(cena) ~ log(velikost) metodou nejmenších čtverců; None pro méně než dva kladné body."""
+    points = [(s, c) for s, c in zip(sizes, costs) if s > 0 and c and c > 0]
+    if len(points) < 2:
+        return None
+    x = np.log([p[0] for p in points])
+    y = np.log([p[1] for p in points])
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def format_mb(value):
+    return f"{value / 1e6:.2f} MB"
+
+
+def _place(sim, index):
+    """Vůz stojí na zastávce `index` aktuálního směru."""
+    index = min(index, len(sim.stops) - 1)
+    sim.stop_index = sim.gui_stop_index = index
+    sim.bus_abs_pos = sim.leg_start_pos = sim.stops[index]["dist"]
+    sim.state = "STOPPED"
+    sim.timer = 0.0
+
+
+def measure_line(count, work_dir, repeat=DEFAULT_REPEAT, size=None, seed=0):
+    """Vrátí {sloupec: hodnota} pro syntetickou linku s `count` zastávkami."""
+    data = synthetic_line(count, seed=seed)
+    write_line(data, work_dir)
+    line_id = data["id"]
+    clock = SimClock()
+    sim = BusSimulatorSimpleLine(line_id=line_id, direction="tam", telemetry="", control="", profile="",
+                                 cprofile="", mjpeg="", headless=True, clock=clock, size=size, hot_reload=False)
+    sim.scroll_sec = 0
+    try:
+        tracemalloc.start()
+        _, sim.trasa_segmenty = main.load_line_definition(line_id)
+        sim.set_direction(True)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        def draw_view(view):
+            def run(_):
+                sim.view = view
+                sim.draw()
+            return run
+
+        def turnaround(_):
+            # to, co update_physics dělá na konečné, a první snímek s novou trasou
+            sim.set_direction(not sim.smer_tam)
+            _place(sim, 0)
+            sim._generate_scheduled_breaks()
+            sim.view = "panel"
+            sim.draw()
+
+        def physics_hour(_):
+            for _ in range(int(3600 / PHYSICS_DT)):
+                sim.update_physics(PHYSICS_DT)
+                clock.elapsed += PHYSICS_DT
+
+        row = {"load": measure(Case("load", "", lambda _: main.load_line_definition(line_id)), repeat)["median"],
+               "memory": retained, "memory_peak": peak}
+        _place(sim, count // 2)
+        row["frame_panel"] = measure(Case("draw[panel]", "", draw_view("panel")), repeat)["median"]
+        row["frame_route"] = measure(Case("draw[route]", "", draw_view("route")), repeat)["median"]
+        row["turnaround"] = measure(Case("turnaround", "", turnaround), repeat)["median"]
+        row["physics"] = measure(Case("update_physics", "", physics_hour, setup=lambda: _place(sim, 0)),
+                                 repeat)["median"]
+    finally:
+        sim.log.close()
+    return row
+
+
+def measure_take(seconds, repeat=DEFAULT_REPEAT, seed=0):
+    """Vrátí {sloupec: hodnota} pro syntetickou nahrávku dlouhou `seconds`."""
+    import record
+    take = synthetic_take(seconds, seed=seed)
+    blocks = callback_blocks(take)
+    tick_blocks = max(1, int(LIVE_TICK_SEC * TAKE_SAMPLERATE) // blocks[0].shape[0])
+    paths = []
+
+    def capture(state):
+        # záznam s živým přehledem: callback a po každém tiku nové body obálky do přehledu
+        rec, overview = state
+        for i, block in enumerate(blocks):
+            rec._callback(block, block.shape[0], None, None)
+            if i % tick_blocks == tick_blocks - 1:
+                overview.update(*rec.buffer.envelope())
+
+    def capture_setup():
+        return armed_recorder(), record.LiveOverview(WAVEFORM_WIDTH)
+
+    def disk_setup():
+        path = record.new_take_path("scaling")
+        paths.append(path)
+        rec = armed_recorder(path)
+        feed_recorder(rec, blocks)
+        return rec
+
+    def waveform(_):
+        record.PeakPyramid(take).columns(0, take.shape[0], WAVEFORM_WIDTH)
+
+    try:
+        tracemalloc.start()
+        state = capture_setup()
+        capture(state)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        state = None
+        capture_time = measure(Case("capture", "", capture, setup=capture_setup), repeat)["median"]
+        row = {"capture": capture_time, "capture_per_sec": capture_time / seconds, "capture_peak": peak}
+        row["stop_disk"] = measure(Case("Recorder.stop[disk]", "", lambda rec: rec.stop(), setup=disk_setup),
+                                   repeat)["median"]
+        row["pyramid"] = measure(Case("PeakPyramid", "", waveform), repeat)["median"]
+        row["trim"] = measure(Case("detect_voice_bounds", "",
+                                   lambda _: record.detect_voice_bounds(take, TAKE_SAMPLERATE, 0.05)), repeat)["median"]
+    finally:
+        for path in paths:
+            record.remove_take(path)
+    return row
+
+
+# (klíč, záhlaví, formát hodnoty); exponent se počítá pro každý sloupec
+LINE_COLUMNS = [
+    ("load", "načtení", format_time),
+    ("memory", "paměť trasy", format_mb),
+    ("memory_peak", "špička paměti", format_mb),
+    ("frame_panel", "snímek (panel)", format_time),
+    ("frame_route", "snímek (trasa)", format_time),
+    ("turnaround", "otočka", format_time),
+    ("physics", "fyzika / sim. h", format_time),
+]
+TAKE_COLUMNS = [
+    ("capture", "záznam + přehled", format_time),
+    ("capture_per_sec", "záznam / s zvuku", format_time),
+    ("capture_peak", "špička paměti", format_mb),
+    ("stop_disk", "Recorder.stop[disk]", format_time),
+    ("pyramid", "pyramida špiček", format_time),
+    ("trim", "detekce řeči", format_time),
+]
+
+
+def table(size_header, sizes, rows, columns):
+    """Markdown tabulka cena × velikost s řádkem exponentů růstu."""
+    lines = ["| " + " | ".join([size_header] + [title for _, title, _ in columns]) + " |",
+             "|" + "---:|" * (len(columns) + 1)]
+    for size, row in zip(sizes, rows):
+        lines.append("| " + " | ".join([f"{size:g}"] + [fmt(row[key]) for key, _, fmt in columns]) + " |")
+    exponents = []
+    for key, _, _ in columns:
+        k = growth_exponent(sizes, [row[key] for row in rows])
+        if k is None:
+            exponents.append("-")
+        elif k > SUPERLINEAR_EXPONENT:
+            exponents.append(f"⚠️ {k:.2f}")
+        else:
+            exponents.append(f"{k:.2f}")
+    lines.append("| " + " | ".join(["exponent"] + exponents) + " |")
+    return "\n".join(lines)
+
+
+def run(stops=DEFAULT_STOPS, takes=DEFAULT_TAKES, repeat=DEFAULT_REPEAT, size=None):
+    """Změří všechny velikosti a vrátí text reportu (Markdown)."""
+    work_dir = tempfile.mkdtemp(prefix="mhdhk_scaling_")
+    lines_dir = main.LINES_DIR
+    # syntetické linky se načítají z dočasného adresáře, ne z lines/
+    main.LINES_DIR = work_dir
+    line_rows = []
+    try:
+        for count in stops:
+            started = time.perf_counter()
+            line_rows.append(measure_line(count, work_dir, repeat, size))
+            print(f"  linka {count} zastávek: {time.perf_counter() - started:.1f} s")
+    finally:
+        main.LINES_DIR = lines_dir
+        shutil.rmtree(work_dir, ignore_errors=True)
+    take_rows = []
+    for seconds in takes:
+        started = time.perf_counter()
+        take_rows.append(measure_take(seconds, repeat))
+        print(f"  nahrávka {seconds} s: {time.perf_counter() - started:.1f} s")
+
+    info = machine_info()
+    return "\n".join([
+        "# Škálovací report",
+        "",
+        f"{datetime.datetime.now().isoformat(timespec='seconds')}, {info['machine']}, {info['platform']}, "
+        f"Python {info['python']}, pygame {info['pygame']}, NumPy {info['numpy']}; medián z {repeat} běhů.",
+        "",
+        "Exponent = sklon log(cena) ~ log(velikost): ~0 konstantní, ~1 lineární, ~2 kvadratická cena; "
+        f"⚠️ nad {SUPERLINEAR_EXPONENT}.",
+        "",
+        "## Linky",
+        "",
+        table("zastávek", stops, line_rows, LINE_COLUMNS),
+        "",
+        "## Nahrávky",
+        "",
+        table("délka (s)", takes, take_rows, TAKE_COLUMNS),
+        "",
+    ])
+
+
+if __name__ == "__main__":
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            options[key] = value or "1"
+    stops = [int(x) for x in options.get("stops", "").split(",") if x] or DEFAULT_STOPS
+    takes = [float(x) for x in options.get("takes", "").split(",") if x] or DEFAULT_TAKES
+    out_path = options.get("out", REPORT_PATH)
+    started = time.perf_counter()
+    report = run(stops, takes, repeat=int(options.get("repeat", DEFAULT_REPEAT)), size=options.get("size"))
+    pygame.quit()
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(report)
+    print(f"Report uložen do {out_path} za {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,121 @@
+"""Syntetické linky a nahrávky pro zátěžové a škálovací testy.
+
+Linka má stejný formát jako `lines/<id>.json`, jen libovolně mnoho
+zastávek (stovky až desetitisíce), dlouhé názvy plné diakritiky a jiných
+písem a husté časy příjezdu (desetiny minuty). Klipy zastávek (`audio`)
+neexistují, simulátor je tiše přeskočí. Nahrávka je mono float32 se šumem
+v tichu a „slabikami“ (tón s obálkou a šumem), takže ji detekce řeči
+i ořez ticha zpracují jako skutečné hlášení.
+
+Vše je deterministické podle `seed`:
+
+    python synthetic.py line <počet zastávek> [--id=syn<počet>] [--out=lines] [--gap=0.5] [--seed=0]
+    python synthetic.py take <sekundy> [--out=take.wav] [--samplerate=44100] [--seed=0]
+"""
+import json
+import os
+import random
+import sys
+import wave
+
+import numpy as np
+
+TAKE_SAMPLERATE = 44100
+# průměrný rozestup zastávek (min); skutečný je náhodný mezi 20 % a 180 % průměru
+DEFAULT_GAP_MIN = 0.5
+
+NAME_PREFIXES = ["Náměstí", "Třída", "Nábřeží", "Sídliště", "Nádraží", "Křižovatka", "Průmyslová zóna",
+                 "Zdravotní středisko", "Obchodní centrum", "Základní škola", "Točna", "U"]
+NAME_WORDS = ["Žižkových sadů", "Čtyřlístku", "Příčná", "Ďáblická", "Ústřední", "Šťastného", "Řezníčkova",
+              "Úžlabina", "Dělnických domků", "Kněžské louky", "Hřbitovní", "Těšnovského mostu",
+              "Svatého Václava", "Pražské předměstí", "Nového Hradce Králové", "Kukleny", "Slezské předměstí",
+              "Łódzka", "Hauptstraße", "Ελληνικής Δημοκρατίας", "Вокзальная", "駅前通り", "Ångström"]
+NAME_SUFFIXES = ["", "", "", "– točna", "(na znamení)", "– u hřbitova", "sever", "jih", "I", "II",
+                 "– nástupiště č. 3", "(výluka)"]
+
+
+def stop_name(rng, words=(2, 5)):
+    """Dlouhý název zastávky: předpona, několik slov a občas přípona."""
+    parts = [rng.choice(NAME_PREFIXES)]
+    parts += rng.sample(NAME_WORDS, rng.randint(*words))
+    suffix = rng.choice(NAME_SUFFIXES)
+    if suffix:
+        parts.append(suffix)
+    return " ".join(parts)
+
+
+def synthetic_line(stops, line_id=None, gap=DEFAULT_GAP_MIN, seed=0):
+    """Definice linky (slovník ve formátu `lines/<id>.json`) s `stops` zastávkami."""
+    rng = random.Random(seed)
+    line_id = line_id or f"syn{stops}"
+    minute = 0.0
+    out = []
+    for i in range(stops):
+        if i:
+            minute += rng.uniform(0.2 * gap, 1.8 * gap)
+        out.append({"name": stop_name(rng), "distance": round(minute, 2), "audio": f"{line_id}_{i:05d}"})
+    return {
+        "id": line_id,
+        "vehicle": "bus",
+        "description": f"{out[0]['name']} > {out[-1]['name']}".upper() if out else "",
+        "stops": out,
+    }
+
+
+def write_line(data, out_dir):
+    """Uloží definici linky do `<out_dir>/<id>.json` a vrátí cestu."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{data['id']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def synthetic_take(seconds, samplerate=TAKE_SAMPLERATE, seed=0):
+    """Mono float32 nahrávka: ticho se šumem, slabiky (tón + šum s obálkou) a ticho na konci."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * samplerate)
+    data = rng.normal(0.0, 0.002, n).astype(np.float32)
+    lead = min(n // 4, int(0.5 * samplerate))
+    t = np.arange(n - 2 * lead, dtype=np.float32) / samplerate
+    # ~4 slabiky za sekundu, základní tón kolem 140 Hz
+    envelope = np.clip(np.sin(2 * np.pi * 4.0 * t), 0.0, None) ** 2
+    voice = 0.5 * np.sin(2 * np.pi * 140.0 * t) + 0.15 * rng.normal(0.0, 1.0, t.shape[0])
+    data[lead:n - lead] += (envelope * voice).astype(np.float32)
+    return np.clip(data, -1.0, 1.0)
+
+
+def write_take(data, path, samplerate=TAKE_SAMPLERATE):
+    """Uloží nahrávku jako 16bitový PCM WAV (přehraje ho i pygame.mixer)."""
+    pcm = (np.clip(data, -1.0, 1.0) * 32767.0).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(samplerate)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+if __name__ == "__main__":
+    args = []
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            options[key] = value or "1"
+        else:
+            args.append(arg)
+    if len(args) != 2 or args[0] not in ("line", "take"):
+        print(__doc__.strip().splitlines()[-2].strip())
+        print(__doc__.strip().splitlines()[-1].strip())
+        sys.exit(2)
+    seed = int(options.get("seed", 0))
+    if args[0] == "line":
+        count = max(2, int(args[1]))
+        data = synthetic_line(count, options.get("id"), gap=float(options.get("gap", DEFAULT_GAP_MIN)), seed=seed)
+        path = write_line(data, options.get("out", "lines"))
+        print(f"Uložena linka {data['id']} ({count} zastávek, {data['stops'][-1]['distance']:.0f} min) do {path}")
+    else:
+        samplerate = int(options.get("samplerate", TAKE_SAMPLERATE))
+        path = write_take(synthetic_take(float(args[1]), samplerate, seed), options.get("out", "take.wav"), samplerate)
+        print(f"Uložena nahrávka {float(args[1]):.1f} s do {path}")
@@ -0,0 +1,194 @@
+"""Telemetrie panelu ve sdílené paměti pro externí displeje.
+
+Simulátor zapisuje stav panelu (aktuální zastávka, plánovaný čas, stav vozu,
+důvod poruchy) do bloku `multiprocessing.shared_memory` s pevným rozložením.
+Čtenáři na stejném stroji blok jen namapují a čtou přímo z paměti – bez
+zámků, bez syscallů a bez serializace.
+
+Konzistenci zajišťuje sekvenční čítač (seqlock): zapisovatel před zápisem
+nastaví lichou hodnotu a po zápisu sudou. Čtenář přečte čítač, zkopíruje
+záznam a čítač přečte znovu; pokud byl lichý nebo se mezitím změnil, čtení
+zopakuje.
+
+Rozložení bloku (little-endian):
+
+    offset  typ        pole
+    0       char[4]    magic "MHDT"
+    4       uint16     verze rozložení
+    8       uint64     seq (sudé = konzistentní záznam)
+    16      int32      gui_stop_index
+    20      int32      stop_index
+    24      int32      počet zastávek ve směru
+    28      uint8      smer_tam (1 = TAM)
+    29      uint8      porucha aktivní
+    32      float64    bus_abs_pos (s)
+    40      int64      čas zápisu (time.time_ns)
+    48      char[8]    číslo linky (UTF-8, doplněno nulami)
+    56      char[96]   název zastávky zobrazené na panelu
+    152     char[8]    plánovaný čas příjezdu (sched_str)
+    160     char[16]   stav vozu (DRIVING, DOORS_OPEN, ...)
+    176     char[32]   důvod poruchy
+"""
+import os
+import struct
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+DEFAULT_NAME = "mhdhk_panel"
+MAGIC = b"MHDT"
+LAYOUT_VERSION = 1
+
+HEADER_FORMAT = "<4sHxx"
+SEQ_FORMAT = "<Q"
+SEQ_OFFSET = 8
+PAYLOAD_FORMAT = "<iiiBBxxdq8s96s8s16s32s"
+PAYLOAD_OFFSET = 16
+BLOCK_SIZE = PAYLOAD_OFFSET + struct.calcsize(PAYLOAD_FORMAT)
+
+TelemetrySnapshot = namedtuple("TelemetrySnapshot", [
+    "seq", "gui_stop_index", "stop_index", "stop_count", "smer_tam",
+    "break_active", "bus_abs_pos", "timestamp_ns", "line_id", "stop_name",
+    "sched_str", "state", "break_reason",
+])
+
+
+def _encode(text, size):
+    # Ořízne UTF-8 na daný počet bajtů tak, aby nerozdělil vícebajtový znak.
+    raw = (text or "").encode("utf-8")
+    if len(raw) <= size:
+        return raw
+    return raw[:size].decode("utf-8", "ignore").encode("utf-8")
+
+
+def _decode(raw):
+    return raw.split(b"\0", 1)[0].decode("utf-8", "ignore")
+
+
+def _attach(name):
+    # Čtenář nesmí blok při svém ukončení odregistrovat/smazat (resource_tracker
+    # na POSIXu jinak sdílenou paměť uklidí i za zapisovatele).
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return shm
+
+
+class TelemetryPublisher:
+    """Zapisovatel telemetrie; vlastní blok sdílené paměti."""
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        reused = False
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=BLOCK_SIZE)
+        except FileExistsError:
+            # pozůstatek po pádu předchozí instance – použijeme ho znovu
+            self._shm = shared_memory.SharedMemory(name=name)
+            if self._shm.size < BLOCK_SIZE:
+                self._shm.close()
+                raise
+            reused = True
+        self._buf = self._shm.buf
+        # čtenáři pozůstatku mohou dál sledovat seq: pokračuje se od něj (zaokrouhleno na sudé), nikdy zpět
+        seq = struct.unpack_from(SEQ_FORMAT, self._buf, SEQ_OFFSET)[0] if reused else 0
+        self._seq = (seq + 1) & ~1
+        struct.pack_into(SEQ_FORMAT, self._buf, SEQ_OFFSET, self._seq)
+        struct.pack_into(HEADER_FORMAT, self._buf, 0, MAGIC, LAYOUT_VERSION)
+
+    def publish(self, gui_stop_index, stop_index, stop_count, smer_tam, break_active,
+                bus_abs_pos, line_id, stop_name, sched_str, state, break_reason):
+        if self._buf is None:
+            return
+        buf = self._buf
+        seq = self._seq + 1
+        struct.pack_into(SEQ_FORMAT, buf, SEQ_OFFSET, seq)  # liché = probíhá zápis
+        struct.pack_into(
+            PAYLOAD_FORMAT, buf, PAYLOAD_OFFSET,
+            int(gui_stop_index), int(stop_index), int(stop_count),
+            1 if smer_tam else 0, 1 if break_active else 0,
+            float(bus_abs_pos), time.time_ns(),
+            _encode(str(line_id), 8), _encode(stop_name, 96), _encode(sched_str, 8),
+            _encode(state, 16), _encode(break_reason, 32),
+        )
+        self._seq = seq + 1
+        struct.pack_into(SEQ_FORMAT, buf, SEQ_OFFSET, self._seq)
+
+    def close(self):
+        if self._buf is None:
+            return
+        self._buf.release()
+        self._buf = None
+        try:
+            self._shm.close()
+        finally:
+            try:
+                self._shm.unlink()
+            except Exception:
+                pass
+
+
+class TelemetryReader:
+    """Čtenář telemetrie. `read()` vrací konzistentní snapshot nebo None."""
+
+    def __init__(self, name=DEFAULT_NAME):
+        self._shm = _attach(name)
+        self._buf = self._shm.buf
+        magic, version = struct.unpack_from(HEADER_FORMAT, self._buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self.close()
+            raise ValueError(f"Neznámý formát telemetrie ({magic!r}, verze {version})")
+
+    @property
+    def seq(self):
+        return struct.unpack_from(SEQ_FORMAT, self._buf, SEQ_OFFSET)[0]
+
+    def read(self, retries=100):
+        buf = self._buf
+        for _ in range(retries):
+            seq1 = struct.unpack_from(SEQ_FORMAT, buf, SEQ_OFFSET)[0]
+            if seq1 & 1:
+                continue
+            fields = struct.unpack_from(PAYLOAD_FORMAT, buf, PAYLOAD_OFFSET)
+            if struct.unpack_from(SEQ_FORMAT, buf, SEQ_OFFSET)[0] != seq1:
+                continue
+            (gui_idx, stop_idx, count, smer, broken, pos, ts,
+             line_id, stop_name, sched, state, reason) = fields
+            return TelemetrySnapshot(
+                seq1, gui_idx, stop_idx, count, bool(smer), bool(broken), pos, ts,
+                _decode(line_id), _decode(stop_name), _decode(sched), _decode(state), _decode(reason),
+            )
+        return None
+
+    def close(self):
+        if self._buf is None:
+            return
+        self._buf.release()
+        self._buf = None
+        self._shm.close()
+
+
+if __name__ == "__main__":
+    # Jednoduchý čtenář pro ladění: vypisuje každou změnu stavu panelu.
+    import sys
+    reader = TelemetryReader(sys.argv[1] if len(sys.argv) >= 2 else DEFAULT_NAME)
+    last_seq = None
+    try:
+        while True:
+            if reader.seq != last_seq:
+                snap = reader.read()
+                if snap is not None:
+                    last_seq = snap.seq
+                    print(snap)
+            time.sleep(0.001)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
@@ -0,0 +1,50 @@
+"""Testy nahrávače bez zvukového zařízení a bez okna.
+
+    python -m unittest test_record
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+import record
+
+
+class DiskCaptureSinkTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="mhdhk_test_")
+        self.sink = record.DiskCaptureSink(os.path.join(self.dir, "take_1.wav"), 44100)
+
+    def tearDown(self):
+        self.sink.finish()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_read_while_writing(self):
+        # čtení jako v SessionWindow._feed_detector, zatímco zapisovací vlákno připojuje bloky
+        block = np.full((512, 1), 0.5, dtype=np.float32)
+
+        def feed():
+            for _ in range(2000):
+                self.sink.write(block)
+                time.sleep(0.0002)
+
+        writer = threading.Thread(target=feed)
+        writer.start()
+        reads = 0
+        try:
+            while writer.is_alive() or reads == 0:
+                data = self.sink.read(0, self.sink.length)
+                self.assertTrue((data == 0.5).all())
+                reads += 1
+        finally:
+            writer.join()
+        data = self.sink.finish()
+        self.assertEqual(data.shape[0], 2000 * 512)
+
+
+if __name__ == "__main__":
+    unittest.main()
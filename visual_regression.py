@@ -0,0 +1,140 @@
+"""Regresní test vzhledu panelu proti uloženým referenčním snímkům.
+
+Pro každou linku v `lines/`, oba směry a každou zastávku se panel vykreslí
+bez okna (viz headless.py) se simulovanými hodinami a porovná s PNG
+v `golden/`. Pixely se porovnávají vektorově přes `pygame.surfarray` a
+NumPy: rozdíl se počítá v jasu (váhy BT.601), aby drobné barevné odchylky
+vyhlazování písma nepřevážily, a pixel se počítá jako změněný až nad
+tolerancí. Snímek neprojde, pokud je změněných pixelů víc než `max_ratio`.
+Pro neúspěšné snímky se do `visual_diff/` uloží teplotní mapa (ztmavená
+reference, změny červeně) a aktuální vykreslení.
+
+Referenční snímky závisí na dostupných fontech; vytvářejí se a porovnávají
+na stejném stroji (build serveru):
+
+    python visual_regression.py [--update] [--lines=2,3] [--golden=golden] [--out=visual_diff]
+                                [--tol=24] [--max-ratio=0.0005]
+"""
+import glob
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("MHD_HK_EVENT_LOG", "")
+os.environ.setdefault("MHD_HK_LOG_ECHO", "0")
+
+import numpy as np
+import pygame
+
+from headless import SimClock
+from main import BusSimulatorSimpleLine, LINES_DIR
+
+GOLDEN_DIR = "golden"
+DIFF_DIR = "visual_diff"
+# rozdíl jasu (0–255), od kterého je pixel změněný, a povolený podíl změněných pixelů
+DEFAULT_TOLERANCE = 24
+DEFAULT_MAX_RATIO = 0.0005
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def line_ids():
+    return sorted((os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(LINES_DIR, "*.json"))),
+                  key=lambda x: (len(x), x))
+
+
+def render_panels(line_id):
+    """Vrátí [(název snímku, pole pixelů (w, h, 3))] pro oba směry a všechny zastávky linky."""
+    sim = BusSimulatorSimpleLine(line_id=line_id, direction="tam", telemetry="", control="", profile="",
+                                 cprofile="", mjpeg="", headless=True, clock=SimClock(), hot_reload=False)
+    # statické snímky: seznam zastávek bez animace posunu
+    sim.scroll_sec = 0
+    frames = []
+    try:
+        for smer_tam, direction in ((True, "tam"), (False, "zpet")):
+            sim.set_direction(smer_tam)
+            for i, stop in enumerate(sim.stops):
+                sim.stop_index = i
+                sim.gui_stop_index = i
+                sim.bus_abs_pos = stop["dist"]
+                sim.state = "STOPPED"
+                sim.draw()
+                frames.append((f"{line_id}_{direction}_{i:03d}.png", pygame.surfarray.array3d(sim.screen)))
+    finally:
+        sim.log.close()
+    return frames
+
+
+def compare(actual, golden, tolerance=DEFAULT_TOLERANCE):
+    """Vrátí (podíl změněných pixelů, mapa rozdílu jasu (w, h) jako float32)."""
+    if actual.shape != golden.shape:
+        return 1.0, None
+    diff = np.abs(actual.astype(np.int16) - golden.astype(np.int16)).astype(np.float32) @ LUMA
+    changed = np.count_nonzero(diff > tolerance)
+    return changed / float(diff.size), diff
+
+
+def heatmap(golden, diff, tolerance=DEFAULT_TOLERANCE):
+    """Ztmavená šedá reference s rozdíly nad tolerancí v červené (intenzita = velikost rozdílu)."""
+    gray = (golden.astype(np.float32) @ LUMA) * 0.35
+    out = np.repeat(gray[:, :, None], 3, axis=2)
+    mask = diff > tolerance
+    out[mask, 0] = 255.0
+    out[mask, 1] = np.clip(255.0 - diff[mask] * 2.0, 0.0, 255.0) * 0.5
+    out[mask, 2] = 0.0
+    return out.astype(np.uint8)
+
+
+def run(lines=None, golden_dir=GOLDEN_DIR, out_dir=DIFF_DIR, update=False,
+        tolerance=DEFAULT_TOLERANCE, max_ratio=DEFAULT_MAX_RATIO):
+    """Porovná (nebo s `update` přepíše) referenční snímky; vrátí seznam chyb [(snímek, popis)]."""
+    os.makedirs(golden_dir, exist_ok=True)
+    failures = []
+    checked = 0
+    for line_id in lines or line_ids():
+        for name, pixels in render_panels(line_id):
+            checked += 1
+            golden_path = os.path.join(golden_dir, name)
+            if update:
+                pygame.image.save(pygame.surfarray.make_surface(pixels), golden_path)
+                continue
+            if not os.path.exists(golden_path):
+                failures.append((name, "chybí referenční snímek"))
+                continue
+            golden = pygame.surfarray.array3d(pygame.image.load(golden_path))
+            ratio, diff = compare(pixels, golden, tolerance)
+            if ratio <= max_ratio:
+                continue
+            os.makedirs(out_dir, exist_ok=True)
+            base = os.path.splitext(name)[0]
+            pygame.image.save(pygame.surfarray.make_surface(pixels), os.path.join(out_dir, f"{base}_actual.png"))
+            if diff is None:
+                failures.append((name, f"jiný rozměr {pixels.shape[:2]} oproti {golden.shape[:2]}"))
+                continue
+            pygame.image.save(pygame.surfarray.make_surface(heatmap(golden, diff, tolerance)),
+                              os.path.join(out_dir, f"{base}_diff.png"))
+            failures.append((name, f"změněno {ratio * 100:.3f} % pixelů (max. rozdíl jasu {diff.max():.0f})"))
+    return checked, failures
+
+
+if __name__ == "__main__":
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            options[key] = value or "1"
+    lines = [x for x in options.get("lines", "").split(",") if x] or None
+    started = time.perf_counter()
+    checked, failures = run(lines, golden_dir=options.get("golden", GOLDEN_DIR), out_dir=options.get("out", DIFF_DIR),
+                            update="update" in options, tolerance=float(options.get("tol", DEFAULT_TOLERANCE)),
+                            max_ratio=float(options.get("max-ratio", DEFAULT_MAX_RATIO)))
+    elapsed = time.perf_counter() - started
+    pygame.quit()
+    if "update" in options:
+        print(f"Uloženo {checked} referenčních snímků do {options.get('golden', GOLDEN_DIR)} za {elapsed:.1f} s")
+        sys.exit(0)
+    for name, reason in failures:
+        print(f"❌ {name}: {reason}")
+    print(f"Zkontrolováno {checked} snímků za {elapsed:.1f} s, chyb: {len(failures)}")
+    sys.exit(1 if failures else 0)
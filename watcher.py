@@ -0,0 +1,156 @@
+"""Sledování změn souborů pro načtení za běhu (hot reload).
+
+Sleduje jen zadané adresáře (bez zanoření), ne celý strom projektu. Na
+Linuxu používá inotify přes ctypes – jádro hlásí přímo jméno změněného
+souboru (zápis dokončen, přejmenování na cílové jméno, smazání), takže se
+nic neprochází. Jinde (nebo když inotify není k dispozici) se jednou za
+POLL_SEC porovnají mtime a velikosti položek sledovaných adresářů.
+
+Změny se ukládají do fronty (`collections.deque`) z vlákna sledování;
+hlavní smyčka je vybírá přes `drain()` stejně jako příkazy řídicího
+serveru. Soubor se ohlásí až po SETTLE_SEC bez dalších změn, aby se
+nenačítal napůl zapsaný (editory i export zapisují po částech), a více
+událostí téhož souboru se sloučí do jedné.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+POLL_SEC = 1.0
+SETTLE_SEC = 0.25
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify():
+    """Vrátí (libc, fd) pro inotify, nebo None, pokud není k dispozici."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    return libc, fd
+
+
+class FileWatcher:
+    def __init__(self, dirs, suffixes=None, poll=False):
+        self.dirs = [os.path.abspath(d) for d in dirs if os.path.isdir(d)]
+        self.suffixes = tuple(suffixes) if suffixes else None
+        self.mode = None
+        self._force_poll = poll
+        self._events = deque()
+        # cesta -> čas poslední změny; jen pro hlavní smyčku (drain), vlákno sem nepíše
+        self._settling = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+
+    @property
+    def pending(self):
+        return bool(self._events) or bool(self._settling)
+
+    def _wanted(self, name):
+        return self.suffixes is None or name.endswith(self.suffixes)
+
+    def start(self):
+        inotify = None if self._force_poll else _inotify()
+        if inotify is not None:
+            libc, fd = inotify
+            self._wd = {}
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+            for d in self.dirs:
+                wd = libc.inotify_add_watch(fd, os.fsencode(d), mask)
+                if wd >= 0:
+                    self._wd[wd] = d
+            self._fd = fd
+            self.mode = "inotify"
+            target = self._run_inotify
+        else:
+            self.mode = "poll"
+            self._snapshot = {d: self._scan(d) for d in self.dirs}
+            target = self._run_poll
+        self._thread = threading.Thread(target=target, name="mhdhk-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run_inotify(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], POLL_SEC)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                break
+            now = time.monotonic()
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(sys.getfilesystemencoding(), "replace")
+                offset += length
+                if name and wd in self._wd and self._wanted(name):
+                    self._events.append((now, os.path.join(self._wd[wd], name)))
+
+    def _scan(self, d):
+        entries = {}
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    if self._wanted(entry.name) and entry.is_file():
+                        st = entry.stat()
+                        entries[entry.name] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return entries
+
+    def _run_poll(self):
+        while not self._stop.wait(POLL_SEC):
+            for d in self.dirs:
+                current = self._scan(d)
+                previous = self._snapshot[d]
+                if current == previous:
+                    continue
+                now = time.monotonic()
+                for name in set(current) | set(previous):
+                    if current.get(name) != previous.get(name):
+                        self._events.append((now, os.path.join(d, name)))
+                self._snapshot[d] = current
+
+    def drain(self, callback):
+        """Zavolá `callback(cesta)` pro soubory, které se SETTLE_SEC nezměnily; volá hlavní smyčka."""
+        while self._events:
+            t, path = self._events.popleft()
+            self._settling[path] = t
+        now = time.monotonic()
+        for path, t in list(self._settling.items()):
+            if now - t >= SETTLE_SEC:
+                del self._settling[path]
+                callback(path)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=POLL_SEC * 2)
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None